@@ -1,11 +1,13 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 """
-Add Zaytoon logo to top of all PDF maps
+Add Zaytoon logo to top of all PDF maps, then optimise them for web viewing
 Requires: pip install pillow pypdf
+Optional: pikepdf or the qpdf CLI for linearised ("fast web view") output
 """
 
 import os
+import shutil
 import sys
 from pathlib import Path
 import subprocess
@@ -27,6 +29,50 @@ try:
 except ImportError:
     HAS_PYPDF = False
 
+try:
+    import pikepdf
+    HAS_PIKEPDF = True
+except ImportError:
+    HAS_PIKEPDF = False
+
+# One logo overlay per page size, shared by every page and every PDF in this run
+_logo_overlays = {}
+
+def get_logo_overlay(logo_img, page_width, page_height):
+    """Build (once) a single-page PDF holding the logo for this page size"""
+    key = (round(page_width, 2), round(page_height, 2))
+    if key in _logo_overlays:
+        return _logo_overlays[key]
+
+    # Calculate logo dimensions (very small - 4% of page height)
+    logo_height = page_height * 0.04  # 4% of page height
+    aspect_ratio = logo_img.width / logo_img.height
+    logo_width = logo_height * aspect_ratio
+
+    # Maximum width check
+    max_logo_width = page_width * 0.25  # Max 25% of page width
+    if logo_width > max_logo_width:
+        logo_width = max_logo_width
+        logo_height = logo_width / aspect_ratio
+
+    # Create logo overlay
+    packet = io.BytesIO()
+    can = canvas.Canvas(packet, pagesize=(page_width, page_height))
+
+    # Position logo at very top left corner
+    x_pos = 20  # 20 points from left edge
+    y_pos = page_height - logo_height - 5  # 5 points from top edge
+
+    can.drawImage(ImageReader(logo_img), x_pos, y_pos,
+                 width=logo_width, height=logo_height,
+                 preserveAspectRatio=True, mask='auto')
+    can.save()
+
+    # Move to beginning of StringIO buffer
+    packet.seek(0)
+    _logo_overlays[key] = PdfReader(packet).pages[0]
+    return _logo_overlays[key]
+
 def add_logo_with_pypdf(logo_path, pdf_path, output_path):
     """Use PyPDF to add logo overlay to existing PDF"""
     try:
@@ -41,41 +87,20 @@ def add_logo_with_pypdf(logo_path, pdf_path, output_path):
         first_page = reader.pages[0]
         page_width = float(first_page.mediabox.width)
         page_height = float(first_page.mediabox.height)
-        
-        # Calculate logo dimensions (very small - 4% of page height)
-        logo_height = page_height * 0.04  # 4% of page height
-        aspect_ratio = logo_img.width / logo_img.height
-        logo_width = logo_height * aspect_ratio
-        
-        # Maximum width check
-        max_logo_width = page_width * 0.25  # Max 25% of page width
-        if logo_width > max_logo_width:
-            logo_width = max_logo_width
-            logo_height = logo_width / aspect_ratio
-        
-        # Create logo overlay
-        packet = io.BytesIO()
-        can = canvas.Canvas(packet, pagesize=(page_width, page_height))
-        
-        # Position logo at very top left corner
-        x_pos = 20  # 20 points from left edge
-        y_pos = page_height - logo_height - 5  # 5 points from top edge
-        
-        can.drawImage(ImageReader(logo_img), x_pos, y_pos, 
-                     width=logo_width, height=logo_height, 
-                     preserveAspectRatio=True, mask='auto')
-        can.save()
-        
-        # Move to beginning of StringIO buffer
-        packet.seek(0)
-        logo_pdf = PdfReader(packet)
+        logo_page = get_logo_overlay(logo_img, page_width, page_height)
         
         # Merge logo with each page
         for page_num in range(len(reader.pages)):
             page = reader.pages[page_num]
-            page.merge_page(logo_pdf.pages[0])
+            page.merge_page(logo_page)
             writer.add_page(page)
         
+        # Deflate content streams and keep a single copy of the logo image XObject
+        for page in writer.pages:
+            page.compress_content_streams()
+        if hasattr(writer, "compress_identical_objects"):  # pypdf >= 4.3
+            writer.compress_identical_objects()
+        
         # Write output
         with open(output_path, 'wb') as output_file:
             writer.write(output_file)
@@ -85,6 +110,41 @@ def add_logo_with_pypdf(logo_path, pdf_path, output_path):
         print(f"  Error: {e}")
         return False
 
+def linearize_pdf(pdf_path):
+    """
+    Rewrite a PDF in place as linearised ("fast web view") with compressed object
+    streams, so a range-capable viewer can show page 1 before the whole file arrives.
+    The /ID is derived from the content, so identical input gives identical bytes
+    (content-hash ETags, the output manifest and thumbnail reuse rely on that).
+    Returns the tool used, or None if neither pikepdf nor qpdf is available.
+    """
+    tmp_path = pdf_path.parent / f"{pdf_path.stem}_temp_linear.pdf"
+    try:
+        if HAS_PIKEPDF:
+            with pikepdf.open(pdf_path) as pdf:
+                pdf.save(tmp_path, linearize=True, compress_streams=True,
+                         object_stream_mode=pikepdf.ObjectStreamMode.generate,
+                         recompress_flate=True, deterministic_id=True)
+            tool = "pikepdf"
+        elif shutil.which("qpdf"):
+            result = subprocess.run(
+                ["qpdf", "--linearize", "--deterministic-id", "--object-streams=generate", "--compress-streams=y",
+                 "--recompress-flate", str(pdf_path), str(tmp_path)],
+                capture_output=True, text=True)
+            # Exit code 3 means "succeeded with warnings"
+            if result.returncode not in (0, 3):
+                raise RuntimeError(result.stderr.strip() or f"qpdf exited with {result.returncode}")
+            tool = "qpdf"
+        else:
+            return None
+        tmp_path.replace(pdf_path)
+        return tool
+    except Exception as e:
+        print(f"(linearise failed: {e})", end=" ")
+        if tmp_path.exists():
+            tmp_path.unlink()
+        return None
+
 def check_imagemagick():
     """Check if ImageMagick is installed"""
     try:
@@ -151,6 +211,7 @@ def main():
     print(f"✓ ImageMagick installed: {has_imagemagick}")
     print(f"✓ GhostScript installed: {has_ghostscript}")
     print(f"✓ PyPDF available: {HAS_PYPDF}")
+    print(f"✓ Linearisation: {'pikepdf' if HAS_PIKEPDF else 'qpdf' if shutil.which('qpdf') else 'unavailable (install pikepdf or qpdf)'}")
     
     if not has_imagemagick and not has_ghostscript and not HAS_PYPDF:
         print("\n⚠ No PDF processing tools found!")
@@ -176,7 +237,11 @@ def main():
             if add_logo_with_pypdf(logo_path, pdf_path, output_path):
                 # Replace original with logo version
                 output_path.replace(pdf_path)
-                print("✓")
+                size_before = pdf_path.stat().st_size
+                if linearize_pdf(pdf_path):
+                    print(f"✓ (linearised, {size_before // 1024} KB -> {pdf_path.stat().st_size // 1024} KB)")
+                else:
+                    print("✓")
             else:
                 # Clean up temp file if it exists
                 if output_path.exists():
@@ -190,7 +255,11 @@ def main():
             if add_logo_with_imagemagick(logo_path, pdf_path, output_path):
                 # Replace original with logo version
                 output_path.replace(pdf_path)
-                print("✓")
+                size_before = pdf_path.stat().st_size
+                if linearize_pdf(pdf_path):
+                    print(f"✓ (linearised, {size_before // 1024} KB -> {pdf_path.stat().st_size // 1024} KB)")
+                else:
+                    print("✓")
             else:
                 # Clean up temp file if it exists
                 if output_path.exists():
@@ -0,0 +1,268 @@
+"""
+Label anchors and extents for the GeoJSON layers, written to geojson/anchors.json.
+
+For every thana, district and region feature: bbox, area (km²), area-weighted
+centroid and a label point (pole of inaccessibility: the interior point farthest
+from the boundary, found with the polylabel grid search). The map pages place
+labels and zoom from this file instead of scanning geometry in the browser.
+
+Anchors depend only on a feature's geometry, so they are cached by a geometry
+key. Thana and district geometry never changes; a region's MultiPolygon is the
+union of its districts' polygons, so its key changes exactly when its membership
+does and only those regions are recomputed after a save. Each entry stores its
+key, which lets a fresh process reuse anchors.json instead of starting cold.
+
+A region is not dissolved, so boundary edges shared by two of its polygons are
+dropped before the label search (an edge seen an even number of times is
+interior, as in region_stats), and long boundaries are thinned to at most
+MAX_LABEL_SEGMENTS segments: a label only needs to be well inside, not exact.
+"""
+
+import hashlib
+import heapq
+import json
+import math
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from geometry import geometry_area_km2, geometry_bbox, iter_polygons
+
+ANCHORS_NAME = "anchors.json"
+LAYER_NAMES = ("thanas", "districts", "regions")
+MAX_LABEL_SEGMENTS = 200
+# Label search stops when no cell can beat the best point by more than this share of the feature size
+LABEL_PRECISION = 0.03
+COORD_DIGITS = 6
+EDGE_DIGITS = 7
+
+Segment = Tuple[float, float, float, float, float]  # x1, y1, dx, dy, 1 / length² in the label plane
+
+_lock = threading.Lock()
+_cache: Dict[str, Dict[str, Any]] = {}
+_MAX_CACHED = 5000
+
+
+def geometry_key(geometry: Dict[str, Any]) -> str:
+    """Short hash of each ring's size and three of its vertices (cheap; no full coordinate scan)."""
+    digest = hashlib.sha1()
+    for polygon in iter_polygons(geometry):
+        for ring in polygon:
+            # Neighbouring thanas can start at the same vertex with the same count, so
+            # the first vertex alone is not enough
+            sample = (ring[0], ring[1], ring[len(ring) // 2]) if len(ring) > 1 else tuple(ring)
+            digest.update(repr((len(ring), sample)).encode("utf-8"))
+        digest.update(b"\x1e")
+    return digest.hexdigest()[:16]
+
+
+def _centroid(geometry: Dict[str, Any]) -> Optional[Tuple[float, float]]:
+    """Area-weighted centroid in lon/lat (holes subtract)."""
+    total = cx = cy = 0.0
+    for polygon in iter_polygons(geometry):
+        for n, ring in enumerate(polygon):
+            a = sx = sy = 0.0
+            for i in range(len(ring)):
+                x1, y1 = ring[i - 1][0], ring[i - 1][1]
+                x2, y2 = ring[i][0], ring[i][1]
+                cross = x1 * y2 - x2 * y1
+                a += cross
+                sx += (x1 + x2) * cross
+                sy += (y1 + y2) * cross
+            if not a:
+                continue
+            # Orientation varies between sources: outer rings add, holes subtract
+            sign = 1.0 if n == 0 else -1.0
+            weight = sign * abs(a) / 2.0
+            total += weight
+            cx += weight * sx / (3.0 * a)
+            cy += weight * sy / (3.0 * a)
+    if total <= 0:
+        return None
+    return cx / total, cy / total
+
+
+def _boundary_segments(geometry: Dict[str, Any], kx: float) -> List[Segment]:
+    """Outline of the feature as segments in the label plane (x = lon * kx, y = lat), thinned."""
+    rings = [ring for polygon in iter_polygons(geometry) for ring in polygon if len(ring) > 1]
+
+    def edge_key(a: Sequence[float], b: Sequence[float]) -> Tuple:
+        p = (round(a[0], EDGE_DIGITS), round(a[1], EDGE_DIGITS))
+        q = (round(b[0], EDGE_DIGITS), round(b[1], EDGE_DIGITS))
+        return (p, q) if p < q else (q, p)
+
+    counts: Counter = Counter()
+    for ring in rings:
+        counts.update(edge_key(ring[i - 1], ring[i]) for i in range(1, len(ring)))
+    boundary_edges = sum(n for n in counts.values() if n % 2)
+    step = max(1, math.ceil(boundary_edges / MAX_LABEL_SEGMENTS))
+
+    segments: List[Segment] = []
+    for ring in rings:
+        # Walk runs of boundary edges, keeping every step-th vertex and the run ends
+        run: List[Sequence[float]] = []
+        for i in range(1, len(ring) + 1):
+            on_boundary = i < len(ring) and counts[edge_key(ring[i - 1], ring[i])] % 2 == 1
+            if on_boundary:
+                if not run:
+                    run.append(ring[i - 1])
+                run.append(ring[i])
+                continue
+            if run:
+                kept = run[::step]
+                if kept[-1] is not run[-1]:
+                    kept.append(run[-1])
+                for a, b in zip(kept, kept[1:]):
+                    dx, dy = (b[0] - a[0]) * kx, b[1] - a[1]
+                    if dx or dy:
+                        segments.append((a[0] * kx, a[1], dx, dy, 1.0 / (dx * dx + dy * dy)))
+                run = []
+    return segments
+
+
+def _signed_distance(x: float, y: float, segments: List[Segment]) -> float:
+    """Distance to the outline, positive inside (even-odd over the same segments), negative outside."""
+    inside = False
+    best = math.inf
+    for x1, y1, dx, dy, inv_len2 in segments:
+        if (y1 > y) != (y1 + dy > y) and x < dx * (y - y1) / dy + x1:
+            inside = not inside
+        t = ((x - x1) * dx + (y - y1) * dy) * inv_len2
+        if t <= 0:
+            px, py = x1 - x, y1 - y
+        elif t >= 1:
+            px, py = x1 + dx - x, y1 + dy - y
+        else:
+            px, py = x1 + t * dx - x, y1 + t * dy - y
+        d = px * px + py * py
+        if d < best:
+            best = d
+    best = math.sqrt(best)
+    return best if inside else -best
+
+
+def _label_point(segments: List[Segment], bbox: Tuple[float, float, float, float],
+                 start: Optional[Tuple[float, float]]) -> Optional[Tuple[float, float]]:
+    """Pole of inaccessibility (polylabel): best-first search over a quadtree of cells."""
+    min_x, min_y, max_x, max_y = bbox
+    width, height = max_x - min_x, max_y - min_y
+    size = min(width, height)
+    if not segments or size <= 0:
+        return None
+    precision = max(width, height) * LABEL_PRECISION
+
+    queue: List[Tuple[float, float, float, float, float]] = []  # (-potential, distance, x, y, half size)
+
+    def push(x: float, y: float, h: float) -> None:
+        d = _signed_distance(x, y, segments)
+        heapq.heappush(queue, (-(d + h * math.sqrt(2)), d, x, y, h))
+
+    h = size / 2
+    x = min_x
+    while x < max_x:
+        y = min_y
+        while y < max_y:
+            push(x + h, y + h, h)
+            y += size
+        x += size
+
+    candidates = [((min_x + max_x) / 2, (min_y + max_y) / 2)] + ([start] if start else [])
+    best_d, best_x, best_y = max((_signed_distance(cx, cy, segments), cx, cy) for cx, cy in candidates)
+    while queue:
+        neg_potential, d, x, y, h = heapq.heappop(queue)
+        if d > best_d:
+            best_d, best_x, best_y = d, x, y
+        if -neg_potential - best_d <= precision:
+            continue
+        h /= 2
+        for ox in (-h, h):
+            for oy in (-h, h):
+                push(x + ox, y + oy, h)
+    return best_x, best_y
+
+
+def compute_anchor(geometry: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """bbox, area_km2, centroid and label ([lon, lat]) of a Polygon/MultiPolygon; None if empty."""
+    try:
+        bbox = geometry_bbox(geometry)
+    except ValueError:
+        return None
+    centroid = _centroid(geometry)
+    kx = math.cos(math.radians((bbox[1] + bbox[3]) / 2))
+    segments = _boundary_segments(geometry, kx)
+    label = _label_point(segments, (bbox[0] * kx, bbox[1], bbox[2] * kx, bbox[3]),
+                         (centroid[0] * kx, centroid[1]) if centroid else None)
+    label = (label[0] / kx, label[1]) if label else centroid
+
+    def point(p: Optional[Tuple[float, float]]) -> Optional[List[float]]:
+        return [round(p[0], COORD_DIGITS), round(p[1], COORD_DIGITS)] if p else None
+
+    return {
+        "bbox": [round(v, COORD_DIGITS) for v in bbox],
+        "area_km2": round(geometry_area_km2(geometry), 2),
+        "centroid": point(centroid),
+        "label": point(label),
+    }
+
+
+def layer_anchors(features: List[Dict[str, Any]], id_fields: Sequence[str]) -> Tuple[Dict[str, Any], int]:
+    """{feature id -> anchor (with its geometry key)} for a layer, and how many were computed."""
+    out: Dict[str, Any] = {}
+    computed = 0
+    for feature in features:
+        props = feature.get("properties") or {}
+        fid = "/".join(str(props.get(field, "")) for field in id_fields)
+        if fid in out:
+            continue  # duplicated feature; the first one wins, as in the geometry store
+        geometry = feature.get("geometry") or {}
+        key = geometry_key(geometry)
+        with _lock:
+            anchor = _cache.get(key)
+        if anchor is None:
+            anchor = compute_anchor(geometry)
+            if anchor is None:
+                continue
+            anchor = dict(anchor, key=key)
+            computed += 1
+            with _lock:
+                if len(_cache) >= _MAX_CACHED:
+                    _cache.clear()
+                _cache[key] = anchor
+        out[fid] = anchor
+    return out, computed
+
+
+_seeded: set = set()
+
+
+def seed_from_file(path: Path) -> int:
+    """Fill the cache from an existing anchors.json (entries carry their geometry key), once per file."""
+    if path in _seeded:
+        return 0
+    _seeded.add(path)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return 0
+    count = 0
+    with _lock:
+        for name in LAYER_NAMES:
+            for anchor in (data.get(name) or {}).values():
+                if isinstance(anchor, dict) and anchor.get("key"):
+                    _cache.setdefault(anchor["key"], anchor)
+                    count += 1
+    return count
+
+
+def build_anchors(layers: Dict[str, List[Dict[str, Any]]],
+                  id_fields: Dict[str, Sequence[str]]) -> Tuple[Dict[str, Any], int]:
+    """The anchors.json document for the given {layer name -> features}, and the number computed."""
+    doc: Dict[str, Any] = {"version": 1}
+    computed = 0
+    for name in LAYER_NAMES:
+        if name in layers:
+            doc[name], n = layer_anchors(layers[name], id_fields.get(name, ()))
+            computed += n
+    return doc, computed
@@ -7,22 +7,36 @@ import subprocess
 import sys
 import io
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from datetime import datetime
 from functools import wraps
 import threading
+import time
 
-import pandas as pd
-from flask import Flask, jsonify, request, send_from_directory, Response, session, redirect, url_for, render_template_string
+_IMPORT_STARTED = time.perf_counter()  # start-up profile: time spent importing this module
+
+from flask import Flask, jsonify, request, send_from_directory, Response, session, redirect, url_for, render_template_string, stream_with_context
+from werkzeug.security import safe_join
 
 # Try to import Python GeoJSON generator (available for Render fallback)
 try:
-    from geojson_generator import generate_geojson_from_csv
+    from geojson_generator import generate_geojson_from_csv, write_stats
     GEOJSON_GENERATOR_AVAILABLE = True
 except ImportError:
     GEOJSON_GENERATOR_AVAILABLE = False
     def generate_geojson_from_csv(*args, **kwargs):
         return False
+    def write_stats(*args, **kwargs):
+        return None
+
+import metrics
+from output_manifest import MANIFEST_NAME, write_manifest
+from app_logging import clear_log_files, configure_logging, follow_log, log_event, tail_log
+from spatial_index import annotate_csv, load_thana_index
+from rebalance import LEVELS, METRICS, load_current, propose_for_csv, read_weights_csv
+from what_if import evaluate_scenarios
+from name_index import load_name_index, read_name_rows
+from startup_cache import warm
 
 
 BASE_DIR = Path(__file__).resolve().parent
@@ -30,27 +44,57 @@ OUTPUT_DIR = BASE_DIR / "outputs"
 OUTPUT_DIR.mkdir(exist_ok=True)
 LOG_FILE = BASE_DIR / "app_debug.log"
 PROGRESS_FILE = BASE_DIR / ".progress"
+THANAS_GEOJSON = BASE_DIR / "geojson" / "thanas.geojson"
+STATS_FILE = BASE_DIR / "geojson" / "stats.json"
+MANIFEST_FILE = OUTPUT_DIR / MANIFEST_NAME
+# Also write compact .vgeo sidecars for the map pages on every GeoJSON update
+GEOJSON_COMPACT = os.environ.get("GEOJSON_COMPACT", "0") == "1"
+# Load testing: fake_renderer.py stands in for R and the post-render scripts (see loadtest.py)
+FAKE_RENDER_SECONDS = float(os.environ.get("VDB_FAKE_RENDER_SECONDS", "0") or 0)
+# Run after a successful R render, each with its own timeout in seconds. Thumbnails
+# rasterise every PDF (~74): ~14 s with PyMuPDF, allow for the slower pdftoppm fallback
+POST_RENDER_SCRIPTS = [
+    ("add_logo_to_pdfs.py", 120),
+    ("add_logo_to_pngs.py", 60),
+    ("tile_pyramid.py", 120),
+    ("thumbnails.py", 300),
+]
+MAX_LOCATE_POINTS = 50000
+MAX_REBALANCE_ITERATIONS = 500000
+MAX_WHAT_IF_SCENARIOS = 500
+MAX_NAME_RESULTS = 50
+MAX_NAME_CHECK_ROWS = 100000
+ASSIGN_CSV_CHUNK_ROWS = 5000
+MAX_LOG_TAIL_LINES = 5000
+MAX_LOG_FOLLOW_SECONDS = 300
+# Load layers, snapshot, stats and manifest in a background thread at start-up (see /ready)
+WARM_ON_START = os.environ.get("WARM_ON_START", "1") == "1"
 
 # Global state for progress tracking
 current_progress = {"regions": 0, "districts": 0, "total_regions": 10, "total_districts": 64, "status": "idle"}
 
-# Background task concurrency locks
+# Background task concurrency locks. Under gthread workers requests run in parallel
+# threads: _render_state_lock guards the two flags below, map_generation_lock is held
+# by the one pipeline thread, assignment_lock serialises saves (CSV + GeoJSON writes)
 map_generation_lock = threading.Lock()
+_render_state_lock = threading.Lock()
+assignment_lock = threading.Lock()
 needs_regeneration = False
+render_active = False  # a background_map_generation thread is running or starting
+# Seconds a Rscript --version probe result is reused (saves used to probe every time)
+R_PROBE_TTL = float(os.environ.get("R_PROBE_TTL", "300"))
+_r_probe: Tuple[float, Optional[str]] = (0.0, None)
 
-# Set up logging
-def log_debug(message: str) -> None:
-    """Log debug message to both console and file"""
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    log_msg = f"[{timestamp}] {message}"
-    print(log_msg, file=sys.stderr)
-    try:
-        with open(LOG_FILE, "a", encoding="utf-8") as f:
-            f.write(log_msg + "\n")
-    except:
-        pass
+# Set up logging (queue-backed, rotating; see app_logging.py)
+configure_logging(LOG_FILE)
 
-app = Flask(__name__, static_folder="outputs", static_url_path="/outputs")
+
+def log_debug(message: str, level: Optional[int] = None, **fields: Any) -> None:
+    """Log debug message to both console and file without blocking the caller"""
+    log_event(message, level, **fields)
+
+# outputs/ is served by serve_output() (strong ETags, range requests) rather than the static route
+app = Flask(__name__, static_folder=None)
 app.secret_key = os.environ.get('SECRET_KEY', 'zaytoon-map-secret-key-2024-local-dev')
 
 # Simple user credentials (in production, use a database with hashed passwords)
@@ -69,10 +113,32 @@ def login_required(f):
     return decorated_function
 
 
+def holds_lock(lock: Any) -> Callable:
+    """Decorator: run the view with `lock` held, so concurrent request threads take turns."""
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            with lock:
+                return f(*args, **kwargs)
+        return decorated_function
+    return decorator
+
+
+# Per-route latency/bytes/status metrics; SLOW_REQUEST_MS > 0 also samples stacks of slow requests
+SLOW_REQUEST_MS = float(os.environ.get("SLOW_REQUEST_MS", "0"))
+app.wsgi_app = metrics.RequestMetricsMiddleware(app.wsgi_app, SLOW_REQUEST_MS or None)
+
+
+@app.before_request
+def label_request_route():
+    """Label the request for metrics by its URL rule, not the raw path."""
+    request.environ["vdb.route"] = request.url_rule.rule if request.url_rule else "unmatched"
+
+
 @app.after_request
 def add_header(response):
-    """Add headers to disable caching for map images, GeoJSON, and CSV."""
-    no_cache_paths = ('/outputs/', '/geojson/', '/region_swapped_data.csv')
+    """Add headers to disable caching for GeoJSON and CSV (outputs revalidate by ETag instead)."""
+    no_cache_paths = ('/geojson/', '/region_swapped_data.csv')
     if any(request.path.startswith(p) or request.path == p for p in no_cache_paths):
         response.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate, max-age=0'
         response.headers['Pragma'] = 'no-cache'
@@ -80,16 +146,6 @@ def add_header(response):
     return response
 
 
-def normalize_thana_name(thana: str) -> str:
-    """Preserve correct spellings for known thanas."""
-    corrections = {
-        "Jessore Sadar": "Kotwali",
-        "Dualatpur": "Daulatpur",
-        "Nowabganj": "Nawabganj",
-    }
-    return corrections.get(thana, thana)
-
-
 @app.route("/")
 def index() -> Any:
     """Main dashboard - requires login."""
@@ -147,19 +203,92 @@ def interactive_map_fullscreen() -> Any:
     return send_from_directory(BASE_DIR, "interactive-map-fullscreen.html")
 
 
+@app.route("/map/zoom")
+def zoom_viewer() -> Any:
+    return send_from_directory(BASE_DIR, "zoom-viewer.html")
+
+
+@app.route("/tiles/<path:filename>")
+def serve_tile(filename: str) -> Any:
+    """Serve Deep Zoom descriptors and tiles built by tile_pyramid.py.
+
+    Unchanged tiles are never rewritten, so the mtime-based ETag stays valid across renders.
+    """
+    mimetype = "application/xml" if filename.endswith(".dzi") else None
+    response = send_from_directory(OUTPUT_DIR / "tiles", filename, mimetype=mimetype, conditional=True)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+@app.route("/thumbs/<path:filename>")
+def serve_thumbnail(filename: str) -> Any:
+    """Serve thumbnails, previews and sprites; names are content hashes, so they never change."""
+    response = send_from_directory(OUTPUT_DIR / "thumbs", filename, conditional=True)
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
+
+@app.route("/api/thumbnails", methods=["GET"])
+def list_thumbnails() -> Any:
+    """Thumbnail/preview/sprite listing for region and district maps (?kind=region|district)."""
+    index = _read_json_cached(OUTPUT_DIR / "thumbs" / "index.json")
+    if not index:
+        return jsonify({"success": False, "message": "Thumbnails not generated yet"}), 404
+
+    kind = request.args.get("kind")
+    if kind and kind not in index["kinds"]:
+        return jsonify({"success": False, "message": f"Unknown kind: {kind}"}), 404
+
+    etag = index["etag"] + (f"-{kind}" if kind else "")
+    not_modified = _not_modified(etag)
+    if not_modified is not None:
+        return not_modified
+
+    payload = {"kind": kind, **index["kinds"][kind]} if kind else {"kinds": index["kinds"]}
+    response = jsonify({**payload, "thumbs_url": "/thumbs/"})
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
 @app.route("/geojson/<path:filename>")
 def geojson_files(filename: str) -> Any:
     """Serve GeoJSON files with no-cache headers so map always reflects latest changes."""
-    response = send_from_directory(BASE_DIR / "geojson", filename)
+    geojson_dir = BASE_DIR / "geojson"
+    if filename.endswith(".vgeo"):
+        # A compact sidecar older than its layer (e.g. after the R pass) is stale;
+        # 404 so the page falls back to the .geojson
+        sidecar = geojson_dir / filename
+        layer = sidecar.with_suffix(".geojson")
+        if not sidecar.exists() or (layer.exists() and layer.stat().st_mtime_ns > sidecar.stat().st_mtime_ns):
+            return jsonify({"error": "Compact layer not available"}), 404
+        response = send_from_directory(geojson_dir, filename, mimetype="application/octet-stream")
+    else:
+        response = send_from_directory(geojson_dir, filename)
     response.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate, max-age=0'
     response.headers['Pragma'] = 'no-cache'
     response.headers['Expires'] = '-1'
     return response
 
 
+def _pipeline_progress() -> Optional[Dict[str, Any]]:
+    """Stage timings of the running (or last finished) pipeline run for /progress."""
+    run = metrics.current_run()
+    if run is None:
+        past = metrics.history()
+        run = past[-1] if past else None
+    if run is None:
+        return None
+    run = dict(run)  # the history entry itself is shared with /metrics/pipeline
+    spans = run.pop("spans", [])
+    run["recent_spans"] = spans[-5:]
+    return run
+
+
 @app.route("/progress")
 def get_progress() -> Any:
     """Return current map generation progress."""
+    pipeline = _pipeline_progress()
     try:
         if PROGRESS_FILE.exists():
             # Try multiple times in case file is being written
@@ -170,6 +299,7 @@ def get_progress() -> Any:
                         content = f.read().strip()
                         if content:
                             data = json.loads(content)
+                            data["pipeline"] = pipeline
                             return jsonify(data)
                     break  # Success, exit the loop
                 except (IOError, json.JSONDecodeError) as e:
@@ -182,11 +312,30 @@ def get_progress() -> Any:
                         raise
     except Exception as e:
         log_debug(f"Error reading progress file: {e}")
-    return jsonify(current_progress)
+    return jsonify({**current_progress, "pipeline": pipeline})
+
+
+@app.route("/metrics")
+def prometheus_metrics() -> Any:
+    """Prometheus text-format metrics (pipeline stages, per-route request latency/bytes/status)."""
+    return Response(metrics.render_prometheus(), mimetype="text/plain; version=0.0.4")
+
+
+@app.route("/metrics/slow")
+def slow_request_profiles() -> Any:
+    """Folded stack samples of the most recent requests slower than SLOW_REQUEST_MS."""
+    return jsonify({"threshold_ms": SLOW_REQUEST_MS or None, "requests": metrics.slow_requests()})
+
+
+@app.route("/metrics/pipeline")
+def pipeline_history() -> Any:
+    """Current pipeline run and the rolling history of finished runs, with every span."""
+    return jsonify({"current": metrics.current_run(), "history": metrics.history()})
 
 
 @app.route("/generate", methods=["POST"])
 @login_required
+@holds_lock(assignment_lock)
 def generate() -> Any:
     try:
         log_debug("=" * 70)
@@ -200,35 +349,14 @@ def generate() -> Any:
         log_debug(f"Received {len(payload)} records from client")
         csv_path = BASE_DIR / "region_swapped_data.csv"
         
-        # Load existing CSV to preserve spellings and corrections
-        existing_data = {}
-        try:
-            with csv_path.open("r", encoding="utf-8") as f:
-                lines = f.readlines()
-                for line in lines[1:]:  # Skip header
-                    parts = line.strip().split(",")
-                    if len(parts) >= 3:
-                        region, district, thana = parts[0], parts[1], parts[2]
-                        existing_data[(district.strip(), thana.strip())] = (region.strip(), district.strip(), thana.strip())
-            log_debug(f"Loaded {len(existing_data)} existing records from CSV")
-        except FileNotFoundError:
-            log_debug("WARNING: CSV file not found, starting fresh")
-
-        # Build new data, preserving spellings from existing CSV
+        # Canonical spellings (the original CSV's) for whatever the client sent
+        names = load_name_index(BASE_DIR)
         output_rows = []
         for row in payload:
             region = row.get("region", "").strip()
             district = row.get("district", "").strip()
-            thana = row.get("thana", "").strip()
-            
-            # Check if this (district, thana) exists in original - use original spelling
-            key = (district, thana)
-            if key in existing_data:
-                _, _, original_thana = existing_data[key]
-                thana = original_thana  # Use original spelling
-            else:
-                # Apply corrections if not found
-                thana = normalize_thana_name(thana)
+            thana = names.canonical_thana(row.get("thana", ""), district)
+            district = names.canonical_district(district) or district
             
             if region and district and thana:
                 output_rows.append((region, district, thana))
@@ -250,40 +378,25 @@ def generate() -> Any:
         geojson_ok = False
         if GEOJSON_GENERATOR_AVAILABLE:
             try:
-                geojson_ok = generate_geojson_from_csv(BASE_DIR)
+                geojson_ok = generate_geojson_from_csv(BASE_DIR, compact=GEOJSON_COMPACT)
                 log_debug("[OK] Python GeoJSON update successful" if geojson_ok else "[WARN] Python GeoJSON update failed")
             except Exception as e:
                 log_debug(f"[WARN] Python GeoJSON error: {e}")
 
         # STEP 3: Attempt R map generation in background
-        r_available = False
-        try:
-            r_check = subprocess.run(
-                ["Rscript", "--version"],
-                capture_output=True, text=True, timeout=5, check=False
-            )
-            r_available = r_check.returncode == 0
-            if r_available:
-                log_debug(f"R available: {r_check.stderr.strip()[:100]}")
-        except Exception:
-            r_available = False
+        r_banner = r_version()
+        r_available = r_banner is not None
+        if r_available:
+            log_debug(f"R available: {r_banner[:100]}")
 
         if r_available:
-            global needs_regeneration
-            if map_generation_lock.locked():
+            if request_render():
                 log_debug("[WARN] Map generation already in progress. Queuing new changes.")
-                needs_regeneration = True
                 map_message = "Data saved. Re-generation queued in background."
-                background_processing = True
             else:
                 log_debug("[OK] R is available, spawning background map generation thread")
-                # Start background thread
-                thread = threading.Thread(target=background_map_generation)
-                thread.daemon = True
-                thread.start()
-                
                 map_message = "Data saved. Map generation started in background."
-                background_processing = True
+            background_processing = True
         else:
             map_message = "Map PDF generation requires R (not available). Assignments saved."
             background_processing = False
@@ -313,9 +426,77 @@ def generate() -> Any:
         return jsonify({"success": False, "message": str(exc)}), 500
 
 
+def _output_bytes_since(since: float) -> int:
+    """Bytes of output files modified since a time.time() timestamp."""
+    total = 0
+    for path in OUTPUT_DIR.rglob("*"):
+        try:
+            st = path.stat()
+        except OSError:
+            continue
+        if st.st_mtime >= since and path.is_file():
+            total += st.st_size
+    return total
+
+
+def r_version(fresh: bool = False) -> Optional[str]:
+    """
+    R's version banner if Rscript runs, else None. The fake renderer counts as R.
+    The probe costs an R start-up, so its result is reused for R_PROBE_TTL seconds.
+    """
+    global _r_probe
+    if FAKE_RENDER_SECONDS > 0:
+        return f"fake renderer ({FAKE_RENDER_SECONDS:g}s per run)"
+    checked_at, banner = _r_probe
+    if not fresh and checked_at and time.monotonic() - checked_at < R_PROBE_TTL:
+        return banner
+    try:
+        r_check = subprocess.run(["Rscript", "--version"], capture_output=True, text=True, timeout=5, check=False)
+        banner = (r_check.stderr.strip() or r_check.stdout.strip() or "R") if r_check.returncode == 0 else None
+    except Exception:
+        banner = None
+    _r_probe = (time.monotonic(), banner)
+    return banner
+
+
+def request_render() -> bool:
+    """
+    Start the background pipeline, or flag a re-run if one is already active.
+    Returns True when the request was queued behind a running pipeline.
+    """
+    global needs_regeneration, render_active
+    with _render_state_lock:
+        if render_active:
+            needs_regeneration = True
+            return True
+        render_active = True
+    thread = threading.Thread(target=background_map_generation, name="map-generation", daemon=True)
+    thread.start()
+    return False
+
+
+def pipeline_command(script_name: str) -> List[str]:
+    """Command line for one pipeline script, or fake_renderer.py standing in for it."""
+    if FAKE_RENDER_SECONDS > 0:
+        return [sys.executable, str(BASE_DIR / "fake_renderer.py"), script_name, str(FAKE_RENDER_SECONDS)]
+    if script_name.endswith(".R"):
+        return ["Rscript", script_name]
+    return [sys.executable, str(BASE_DIR / script_name)]
+
+
 def background_map_generation():
     """Run R script and branding in a background thread to prevent HTTP 502 timeouts"""
-    global needs_regeneration
+    global render_active
+    try:
+        _map_generation_loop()
+    except BaseException:
+        with _render_state_lock:
+            render_active = False
+        raise
+
+
+def _map_generation_loop() -> None:
+    global needs_regeneration, render_active
     
     # Block other threads from entering
     with map_generation_lock:
@@ -323,56 +504,77 @@ def background_map_generation():
             # We reset the dirty flag at the beginning of the loop.
             # If the frontend triggers a new save while we are looping,
             # this flag will be flipped back to True by the web endpoint.
-            needs_regeneration = False
+            with _render_state_lock:
+                needs_regeneration = False
             
+            render_version = current_assignment_version()
+            run = metrics.start_run(render_version)
+            run_status = "error"
+
+            def on_r_line(line: str, elapsed: float) -> None:
+                span = metrics.parse_span_line(line)
+                if span is None:
+                    return
+                stage = span.pop("stage", "r_unknown")
+                ms = span.pop("ms", 0.0)
+                if stage == "r_libraries":
+                    # Time from spawn to the script's first statement
+                    run.add_span("r_startup", max(0.0, elapsed * 1000 - ms))
+                run.add_span(stage, ms, map_name=span.pop("map", None),
+                             bytes_written=span.pop("bytes", None), **span)
+                run.stage = stage
+
             try:
-                log_debug("[BACKGROUND] Starting map generation loop iteration")
+                log_debug("[BACKGROUND] Starting map generation loop iteration", assignment_version=render_version)
                 progress_data = {"regions": 0, "districts": 0, "total_regions": 10, "total_districts": 64, "status": "generating"}
                 with open(PROGRESS_FILE, 'w', encoding='utf-8') as f:
                     json.dump(progress_data, f)
 
-                r_result = subprocess.run(
-                    ["Rscript", "generate_map_from_swaps.R"],
-                    cwd=str(BASE_DIR),
-                    capture_output=True, text=True, check=False, timeout=300
-                )
-                log_debug(f"[BACKGROUND] R script return code: {r_result.returncode}")
+                with run.span("r_script") as r_span:
+                    r_rc, r_output, r_span["peak_rss_bytes"], _ = metrics.run_measured(
+                        pipeline_command("generate_map_from_swaps.R"), str(BASE_DIR), 300, on_r_line)
+                    r_span["rc"] = r_rc
+                log_debug("[BACKGROUND] R script finished", rc=r_rc, peak_rss_mb=(r_span["peak_rss_bytes"] or 0) // 2**20)
                 
-                if r_result.returncode == 0:
+                if r_rc == 0:
                     log_debug("[BACKGROUND] R map generation successful")
-                    try:
-                        python_exe = sys.executable
-                        for script_name in ["add_logo_to_pdfs.py", "add_logo_to_pngs.py"]:
-                            script = BASE_DIR / script_name
-                            if script.exists():
-                                logo_result = subprocess.run(
-                                    [python_exe, str(script)],
-                                    cwd=str(BASE_DIR), capture_output=True,
-                                    text=True, check=False, timeout=60
-                                )
-                                log_debug(f"[BACKGROUND] {script_name} rc={logo_result.returncode}")
-                        log_debug("[BACKGROUND] Logo addition complete")
-                    except Exception as e:
-                        log_debug(f"[BACKGROUND] Logo addition error: {e}")
+                    # Each post-render step gets its own timeout, so one slow or failing
+                    # step is logged as such and does not skip the ones after it
+                    for script_name, timeout in POST_RENDER_SCRIPTS:
+                        script = BASE_DIR / script_name
+                        if not script.exists():
+                            continue
+                        started = time.time()
+                        try:
+                            with run.span(script.stem) as post_span:
+                                rc, _, post_span["peak_rss_bytes"], _ = metrics.run_measured(
+                                    pipeline_command(script_name), str(BASE_DIR), timeout)
+                                post_span["bytes"] = _output_bytes_since(started)
+                                post_span["rc"] = rc
+                            log_debug("[BACKGROUND] Post-render script finished", script=script_name, rc=rc)
+                        except subprocess.TimeoutExpired:
+                            log_debug(f"[BACKGROUND] {script_name} timed out after {timeout}s", script=script_name)
+                        except Exception as e:
+                            log_debug(f"[BACKGROUND] {script_name} error: {e}", script=script_name)
+                    log_debug("[BACKGROUND] Post-render steps complete")
                     
                     # Regenerate GeoJSON via R after successful map generation
                     try:
-                        subprocess.run(
-                            ["Rscript", "generate_geojson.R"],
-                            cwd=str(BASE_DIR), capture_output=True,
-                            text=True, check=False, timeout=60
-                        )
+                        with run.span("r_geojson") as geo_span:
+                            geo_span["rc"], _, geo_span["peak_rss_bytes"], _ = metrics.run_measured(
+                                pipeline_command("generate_geojson.R"), str(BASE_DIR), 60)
                         log_debug("[BACKGROUND] R GeoJSON regenerated")
                     except Exception:
                         pass
                     
                     # Update progress to done
                     progress_data["status"] = "done"
+                    run_status = "done"
                     with open(PROGRESS_FILE, 'w', encoding='utf-8') as f:
                         json.dump(progress_data, f)
                 else:
-                    err_snippet = (r_result.stderr or r_result.stdout or "no output")[-400:]
-                    log_debug(f"[BACKGROUND] R map generation FAILED (rc={r_result.returncode}): {err_snippet}")
+                    err_snippet = (r_output or "no output")[-400:]
+                    log_debug(f"[BACKGROUND] R map generation FAILED (rc={r_rc}): {err_snippet}")
                     # Update progress to error
                     progress_data["status"] = "error"
                     progress_data["message"] = "R map generation failed."
@@ -381,6 +583,7 @@ def background_map_generation():
 
             except subprocess.TimeoutExpired:
                 log_debug("[BACKGROUND] R script timed out after 300s")
+                run_status = "timeout"
                 try:
                     with open(PROGRESS_FILE, 'r', encoding='utf-8') as f:
                         data = json.load(f)
@@ -402,13 +605,28 @@ def background_map_generation():
                 except Exception:
                     pass
             
+            # Publish what is on disk now (failed maps keep their previous version)
+            try:
+                with run.span("manifest"):
+                    manifest = write_manifest(OUTPUT_DIR, render_version)
+                log_debug("[BACKGROUND] Output manifest written", files=manifest["count"], etag=manifest["etag"])
+            except Exception as e:
+                log_debug(f"[BACKGROUND] Manifest error: {e}")
+
+            summary = metrics.finish_run(run, run_status)
+            log_debug("[BACKGROUND] Pipeline run finished", status=run_status,
+                      seconds=round(summary["elapsed_ms"] / 1000, 1),
+                      **{stage: round(s["ms"] / 1000, 1) for stage, s in summary["stages"].items()})
+
             # If no new changes were requested while we were running, exit the loop and release the lock.
-            # Otherwise, run it again to pick up the newest CSV file!
-            if not needs_regeneration:
-                log_debug("[BACKGROUND] Queue empty. Exiting thread.")
-                break
-            else:
-                log_debug("[BACKGROUND] Queue dirty! Restarting map generation loop.")
+            # Otherwise, run it again to pick up the newest CSV file! Checked and cleared under
+            # the state lock so a save arriving right now is either seen here or starts a new thread.
+            with _render_state_lock:
+                if not needs_regeneration:
+                    render_active = False
+                    log_debug("[BACKGROUND] Queue empty. Exiting thread.")
+                    break
+            log_debug("[BACKGROUND] Queue dirty! Restarting map generation loop.")
 
 
 
@@ -429,6 +647,8 @@ def get_csv() -> Any:
 def export_comparison_csv() -> Any:
     """Export CSV with original vs current mapping comparison."""
     try:
+        import pandas as pd  # ~0.5 s to import; only this endpoint needs it, so keep it off the cold start
+
         # Read original mapping
         original_file = BASE_DIR / "District_Thana_Mapping.csv"
         current_file = BASE_DIR / "region_swapped_data.csv"
@@ -495,8 +715,320 @@ def export_comparison_csv() -> Any:
         return jsonify({'error': str(e)}), 500
 
 
+def _parse_point(item: Any) -> tuple:
+    """Accept [lon, lat] pairs or {"lat": .., "lon"/"lng": ..} objects."""
+    if isinstance(item, dict):
+        lon = item.get("lon", item.get("lng", item.get("longitude")))
+        lat = item.get("lat", item.get("latitude"))
+        return float(lon), float(lat)
+    lon, lat = item
+    return float(lon), float(lat)
+
+
+@app.route("/api/locate", methods=["POST"])
+@login_required
+def locate_points() -> Any:
+    """Batch point-in-polygon lookup: which thana/district/region contains each point."""
+    try:
+        payload = request.get_json(force=True) or {}
+        raw_points = payload.get("points") if isinstance(payload, dict) else payload
+        if not isinstance(raw_points, list) or not raw_points:
+            return jsonify({"success": False, "message": "Provide a non-empty 'points' list"}), 400
+        if len(raw_points) > MAX_LOCATE_POINTS:
+            return jsonify({"success": False, "message": f"At most {MAX_LOCATE_POINTS} points per request"}), 413
+
+        try:
+            points = [_parse_point(p) for p in raw_points]
+        except (TypeError, ValueError, KeyError) as e:
+            return jsonify({"success": False, "message": f"Invalid point: {e}"}), 400
+
+        index = load_thana_index(THANAS_GEOJSON)
+        if index is None:
+            return jsonify({"success": False, "message": "thanas.geojson not found"}), 404
+
+        results = [index.assignment(i) for i in index.locate_many(points)]
+        return jsonify({
+            "success": True,
+            "count": len(results),
+            "matched": sum(1 for r in results if r is not None),
+            "results": results,
+        })
+    except Exception as e:
+        log_debug(f"Locate error: {str(e)}")
+        return jsonify({"success": False, "message": str(e)}), 500
+
+
+@app.route("/api/thanas/bbox", methods=["GET"])
+@login_required
+def thanas_in_bbox() -> Any:
+    """List thanas whose bounding box intersects ?bbox=min_lon,min_lat,max_lon,max_lat."""
+    try:
+        bbox = tuple(float(v) for v in request.args.get("bbox", "").split(","))
+        if len(bbox) != 4:
+            raise ValueError("expected 4 numbers")
+    except ValueError as e:
+        return jsonify({"success": False, "message": f"Invalid bbox: {e}"}), 400
+
+    index = load_thana_index(THANAS_GEOJSON)
+    if index is None:
+        return jsonify({"success": False, "message": "thanas.geojson not found"}), 404
+
+    matches = [dict(index.assignment(i), bbox=index.feature_bboxes[i]) for i in index.query_bbox(bbox)]
+    return jsonify({"success": True, "count": len(matches), "thanas": matches})
+
+
+_json_file_cache: Dict[Path, tuple] = {}
+
+
+def _read_json_cached(path: Path) -> Any:
+    """Return a JSON file's contents from memory, re-reading only when its mtime changes."""
+    if not path.exists():
+        return None
+    mtime = path.stat().st_mtime_ns
+    cached = _json_file_cache.get(path)
+    if cached is None or cached[0] != mtime:
+        with open(path, "r", encoding="utf-8") as f:
+            cached = (mtime, json.load(f))
+        _json_file_cache[path] = cached
+    return cached[1]
+
+
+def _load_stats() -> Any:
+    """Return stats.json, generating it first if it does not exist yet."""
+    if not STATS_FILE.exists() and GEOJSON_GENERATOR_AVAILABLE:
+        write_stats(BASE_DIR)
+    return _read_json_cached(STATS_FILE)
+
+
+def current_assignment_version() -> Optional[str]:
+    """Assignment version of the saved CSV (as recorded by the last GeoJSON update)."""
+    try:
+        stats = _load_stats()
+    except Exception:
+        return None
+    return stats.get("version") if stats else None
+
+
+_manifest_build_lock = threading.Lock()
+_manifest_build: Dict[str, Any] = {"thread": None}
+
+
+def build_missing_manifest() -> Any:
+    """Hash outputs/ into a manifest (render versions unknown) if there is none yet."""
+    with _manifest_build_lock:
+        if not MANIFEST_FILE.exists():
+            write_manifest(OUTPUT_DIR, None)
+    return _read_json_cached(MANIFEST_FILE)
+
+
+def _load_manifest() -> Any:
+    """
+    Output manifest from memory. If it is missing, it is built in a background
+    thread (hashing every output is too slow for a request) and None is returned
+    until then; callers serve without the SHA-256 data meanwhile.
+    """
+    manifest = _read_json_cached(MANIFEST_FILE)
+    if manifest is None:
+        with _manifest_build_lock:
+            thread = _manifest_build["thread"]
+            if thread is None or not thread.is_alive():
+                thread = threading.Thread(target=build_missing_manifest, name="manifest-build", daemon=True)
+                _manifest_build["thread"] = thread
+                thread.start()
+    return manifest
+
+
+def _not_modified(etag: str) -> Any:
+    """304 response if the client already has this ETag, else None."""
+    if etag and etag in request.if_none_match:
+        return Response(status=304, headers={"ETag": f'"{etag}"'})
+    return None
+
+
+@app.route("/api/stats", methods=["GET"])
+def get_stats() -> Any:
+    """Per-region and per-district figures for the current assignment (ETag = assignment version)."""
+    try:
+        stats = _load_stats()
+        if stats is None:
+            return jsonify({"success": False, "message": "Stats not available"}), 404
+
+        etag = stats.get("version", "")
+        not_modified = _not_modified(etag)
+        if not_modified is not None:
+            return not_modified
+
+        response = jsonify(stats)
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+    except Exception as e:
+        log_debug(f"Stats error: {str(e)}")
+        return jsonify({"success": False, "message": str(e)}), 500
+
+
+@app.route("/api/rebalance", methods=["POST"])
+@login_required
+def rebalance_regions() -> Any:
+    """
+    Propose thana moves that balance regions (or districts) by thana count, area or
+    an uploaded per-thana weight, keeping every group contiguous. Nothing is saved:
+    the response lists the moves as a diff for the client to review and apply.
+
+    JSON body (or form fields plus a 'file' weights CSV with District, Thana and
+    a `weight_col` column, default "Weight"):
+        metric      "count" | "area" | "weight"       (default "count")
+        level       "region" | "district"             (default "region")
+        targets     {group: target}; other groups share the remainder equally
+        weights     {"District/Thana": number} for metric "weight"
+        max_moves   cap on the number of thanas moved
+        iterations  candidate evaluations (default 20000)
+        seed        shuffles the search order, for alternative proposals
+    """
+    upload = request.files.get("file")
+    if upload is not None:
+        options = request.form.to_dict()
+        try:
+            options["targets"] = json.loads(options["targets"]) if options.get("targets") else None
+        except ValueError:
+            return jsonify({"success": False, "message": "targets must be a JSON object"}), 400
+    else:
+        options = request.get_json(silent=True) or {}
+    if not isinstance(options, dict):
+        return jsonify({"success": False, "message": "Expected a JSON object"}), 400
+
+    try:
+        metric = options.get("metric") or ("weight" if upload is not None else "count")
+        level = options.get("level") or "region"
+        if metric not in METRICS or level not in LEVELS:
+            raise ValueError(f"metric must be one of {', '.join(METRICS)}; level one of {', '.join(LEVELS)}")
+        if upload is not None:
+            lines = io.TextIOWrapper(upload.stream, encoding="utf-8-sig", newline="")
+            weights = read_weights_csv(lines, options.get("weight_col"))
+        else:
+            weights = {tuple(key.split("/", 1)): float(value) for key, value in (options.get("weights") or {}).items()}
+        targets = options.get("targets")
+        if targets is not None and not isinstance(targets, dict):
+            raise ValueError("targets must be an object of {group: target}")
+        max_moves = options.get("max_moves")
+        result = propose_for_csv(
+            BASE_DIR, metric=metric, level=level, weights=weights,
+            targets={str(k): float(v) for k, v in (targets or {}).items()},
+            iterations=min(int(options.get("iterations") or 20000), MAX_REBALANCE_ITERATIONS),
+            max_moves=int(max_moves) if max_moves not in (None, "") else None,
+            seed=int(options.get("seed") or 0))
+    except (TypeError, ValueError) as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+    except FileNotFoundError as e:
+        return jsonify({"success": False, "message": str(e)}), 404
+    except Exception as e:
+        log_debug(f"Rebalance error: {str(e)}")
+        return jsonify({"success": False, "message": str(e)}), 500
+
+    log_debug("Rebalance proposal", metric=metric, grouping=level, moves=len(result["moves"]),
+              elapsed_ms=result["elapsed_ms"])
+    return jsonify(dict(result, success=True, version=current_assignment_version()))
+
+
+@app.route("/api/what-if", methods=["POST"])
+@login_required
+def what_if() -> Any:
+    """
+    Score candidate move sets against the current assignment without saving anything:
+    {"scenarios": [{"name": .., "moves": [{"district", "thana", "to_district"}, ...]}, ...]}.
+    Each result has the affected regions/districts with before/after thana count,
+    area and contiguity, the count/area imbalance and the outputs a save would re-render.
+    """
+    payload = request.get_json(silent=True) or {}
+    scenarios = payload.get("scenarios") if isinstance(payload, dict) else payload
+    if not isinstance(scenarios, list) or not scenarios:
+        return jsonify({"success": False, "message": "Provide a non-empty 'scenarios' list"}), 400
+    if len(scenarios) > MAX_WHAT_IF_SCENARIOS:
+        return jsonify({"success": False, "message": f"At most {MAX_WHAT_IF_SCENARIOS} scenarios per request"}), 413
+
+    try:
+        result = evaluate_scenarios(*load_current(BASE_DIR), scenarios)
+    except FileNotFoundError as e:
+        return jsonify({"success": False, "message": str(e)}), 404
+    except Exception as e:
+        log_debug(f"What-if error: {str(e)}")
+        return jsonify({"success": False, "message": str(e)}), 500
+    return jsonify(dict(result, success=True, version=current_assignment_version()))
+
+
+@app.route("/api/names/search", methods=["GET"])
+@login_required
+def search_names() -> Any:
+    """Thana typeahead: ?q=..[&district=..][&limit=..], matching canonical names and aliases."""
+    try:
+        limit = min(int(request.args.get("limit", 10)), MAX_NAME_RESULTS)
+    except ValueError:
+        return jsonify({"success": False, "message": "limit must be an integer"}), 400
+    names = load_name_index(BASE_DIR)
+    results = names.search(request.args.get("q", ""), district=request.args.get("district", ""), limit=limit)
+    return jsonify({"success": True, "count": len(results), "results": results})
+
+
+@app.route("/api/names/check", methods=["POST"])
+@login_required
+def check_names() -> Any:
+    """
+    Check district/thana names against the canonical index in one pass. Accepts a
+    multipart 'file' (CSV with District and Thana columns) or JSON
+    {"rows": [{"district", "thana"}, ...]}; returns the rows needing an alias, the
+    moved thanas and the unmatched rows with suggestions.
+    """
+    upload = request.files.get("file")
+    try:
+        if upload is not None:
+            rows = read_name_rows(io.TextIOWrapper(upload.stream, encoding="utf-8-sig", newline=""))
+        else:
+            payload = request.get_json(silent=True) or {}
+            raw = payload.get("rows") if isinstance(payload, dict) else payload
+            if not isinstance(raw, list):
+                raise ValueError("Provide a 'rows' list or a CSV file")
+            rows = [(str(r.get("district", "")), str(r.get("thana", ""))) for r in raw if isinstance(r, dict)]
+    except (ValueError, UnicodeDecodeError) as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+    if len(rows) > MAX_NAME_CHECK_ROWS:
+        return jsonify({"success": False, "message": f"At most {MAX_NAME_CHECK_ROWS} rows per request"}), 413
+
+    report = load_name_index(BASE_DIR).check_rows(rows)
+    log_debug("Name check", rows=report["rows"], unmatched=len(report["unmatched"]))
+    return jsonify(dict(report, success=True))
+
+
+@app.route("/api/assign-csv", methods=["POST"])
+@login_required
+def assign_csv() -> Any:
+    """
+    Annotate an uploaded lat/lon CSV with thana, district and region.
+    Accepts a multipart 'file' field or a raw text/csv body and streams the
+    result back chunk by chunk. Optional ?lat_col=..&lon_col=.. override
+    column detection.
+    """
+    index = load_thana_index(THANAS_GEOJSON)
+    if index is None:
+        return jsonify({"success": False, "message": "thanas.geojson not found"}), 404
+
+    upload = request.files.get("file")
+    raw = upload.stream if upload is not None else request.stream
+    lines = io.TextIOWrapper(raw, encoding="utf-8-sig", newline="")
+    try:
+        chunks = annotate_csv(lines, index, chunk_size=ASSIGN_CSV_CHUNK_ROWS,
+                              lat_col=request.args.get("lat_col"), lon_col=request.args.get("lon_col"))
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+
+    log_debug(f"Assign CSV: streaming annotated upload ({upload.filename if upload else 'raw body'})")
+    response = Response(stream_with_context(chunks), mimetype="text/csv")
+    response.headers["Content-Disposition"] = f'attachment; filename=assigned_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
+    return response
+
+
 @app.route("/reset", methods=["POST"])
 @login_required
+@holds_lock(assignment_lock)
 def reset_to_original() -> Any:
     """Reset to original map state by restoring from backup CSV."""
     try:
@@ -517,27 +1049,16 @@ def reset_to_original() -> Any:
         geojson_ok = False
         if GEOJSON_GENERATOR_AVAILABLE:
             try:
-                geojson_ok = generate_geojson_from_csv(BASE_DIR)
+                geojson_ok = generate_geojson_from_csv(BASE_DIR, compact=GEOJSON_COMPACT)
             except Exception:
                 pass
         
         # Start map generation in background
-        r_available = False
-        try:
-            r_check = subprocess.run(
-                ["Rscript", "--version"],
-                capture_output=True, text=True, timeout=5, check=False
-            )
-            r_available = r_check.returncode == 0
-        except Exception:
-            pass
+        r_available = r_version() is not None
 
         if r_available:
-            global needs_regeneration
-            if map_generation_lock.locked():
+            if request_render():
                 log_debug("[WARN] Map generation already in progress. Queuing background reset.")
-                needs_regeneration = True
-                
                 return jsonify({
                     "success": True,
                     "message": "Maps re-generation queued in the background.",
@@ -549,10 +1070,6 @@ def reset_to_original() -> Any:
                 })
             else:
                 log_debug("[OK] R is available, spawning background map generation thread for reset")
-                thread = threading.Thread(target=background_map_generation)
-                thread.daemon = True
-                thread.start()
-                
                 return jsonify({
                     "success": True,
                     "message": "Maps are being reset to original state in the background",
@@ -600,20 +1117,36 @@ def debug_csv() -> Any:
 
 @app.route("/debug/logs")
 def debug_logs() -> Any:
-    """View debug logs for troubleshooting"""
+    """
+    View debug logs for troubleshooting without loading the whole file.
+    Query params: lines (default 50), before (byte offset for paging back),
+    level (INFO/WARNING/ERROR), q (substring), follow=1 to stream new lines
+    for up to `timeout` seconds.
+    """
     try:
         if not LOG_FILE.exists():
             return jsonify({"message": "No logs yet"}), 200
-        
-        with open(LOG_FILE, "r", encoding="utf-8") as f:
-            content = f.read()
-        
-        lines = content.split("\n")
+
+        level = request.args.get("level")
+        contains = request.args.get("q")
+        if request.args.get("follow") == "1":
+            timeout = min(float(request.args.get("timeout", 60)), MAX_LOG_FOLLOW_SECONDS)
+            offset = request.args.get("offset", type=int)
+            return Response(stream_with_context(
+                follow_log(LOG_FILE, offset=offset, level=level, contains=contains, duration=timeout)),
+                mimetype="text/plain")
+
+        lines = max(1, min(request.args.get("lines", 50, type=int), MAX_LOG_TAIL_LINES))
+        result = tail_log(LOG_FILE, lines=lines, before=request.args.get("before", type=int),
+                          level=level, contains=contains)
         return jsonify({
             "file": str(LOG_FILE),
-            "total_lines": len([l for l in lines if l.strip()]),
-            "last_50_lines": lines[-50:],  # Last 50 lines
-            "full_content_length": len(content)
+            "lines": result["lines"],
+            "count": len(result["lines"]),
+            "start_offset": result["start_offset"],
+            "end_offset": result["end_offset"],
+            "more": result["truncated"],
+            "full_content_length": result["file_size"],
         })
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -623,8 +1156,7 @@ def debug_logs() -> Any:
 def debug_clear() -> Any:
     """Clear debug logs"""
     try:
-        if LOG_FILE.exists():
-            LOG_FILE.unlink()
+        if clear_log_files(LOG_FILE):
             return jsonify({"message": "Logs cleared"})
         else:
             return jsonify({"message": "No logs to clear"})
@@ -644,45 +1176,120 @@ def favicon() -> Response:
 
 @app.route("/districts/list")
 def list_districts() -> Any:
-    """List all available district maps"""
+    """List all available district maps (served from the output manifest)"""
     try:
-        districts_dir = OUTPUT_DIR / "districts"
-        if not districts_dir.exists():
-            return jsonify({"districts": [], "count": 0})
-        
-        district_files = sorted(districts_dir.glob("district_*.pdf"))
+        manifest = _load_manifest()
+        current_version = current_assignment_version()
+        if manifest is None:
+            return _list_districts_from_disk(current_version)
+        etag = f"{manifest['etag']}-{current_version}"
+        not_modified = _not_modified(etag)
+        if not_modified is not None:
+            return not_modified
+
         districts = []
-        
-        for file in district_files:
+        for entry in manifest["files"]:
+            name = entry["name"]
+            if not (name.startswith("districts/district_") and name.endswith(".pdf")):
+                continue
+            filename = name.split("/", 1)[1]
             # Extract district name from filename: district_dhaka.pdf -> Dhaka
-            district_name = file.stem.replace("district_", "").replace("_", " ").title()
+            district_name = filename[:-4].replace("district_", "").replace("_", " ").title()
+            rendered_for = entry.get("assignment_version")
             districts.append({
                 "name": district_name,
-                "filename": file.name,
-                "path": f"/outputs/districts/{file.name}",
-                "size": file.stat().st_size
+                "filename": filename,
+                "path": f"/outputs/districts/{filename}",
+                "size": entry["size"],
+                "sha256": entry["sha256"],
+                "rendered_at": entry.get("rendered_at"),
+                "assignment_version": rendered_for,
+                "stale": (rendered_for != current_version) if rendered_for and current_version else None,
             })
-        
-        return jsonify({
+
+        response = jsonify({
             "districts": districts,
-            "count": len(districts)
+            "count": len(districts),
+            "assignment_version": current_version,
         })
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
 
+def _list_districts_from_disk(current_version: Optional[str]) -> Any:
+    """/districts/list before the manifest exists: a directory listing, without hashes or ETag."""
+    districts = []
+    for path in sorted((OUTPUT_DIR / "districts").glob("district_*.pdf")):
+        districts.append({
+            "name": path.stem.replace("district_", "").replace("_", " ").title(),
+            "filename": path.name,
+            "path": f"/outputs/districts/{path.name}",
+            "size": path.stat().st_size,
+            "sha256": None,
+            "rendered_at": None,
+            "assignment_version": None,
+            "stale": None,
+        })
+    response = jsonify({"districts": districts, "count": len(districts), "assignment_version": current_version})
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+_manifest_index: Dict[str, Any] = {"etag": None, "files": {}}
+
+
+def _manifest_entry(relative_path: str) -> Optional[Dict[str, Any]]:
+    manifest = _load_manifest()
+    if not manifest:
+        return None
+    if _manifest_index.get("etag") != manifest["etag"]:
+        _manifest_index["files"] = {f["name"]: f for f in manifest["files"]}
+        _manifest_index["etag"] = manifest["etag"]
+    return _manifest_index["files"].get(relative_path)
+
+
+
+def _send_output(relative_path: str) -> Any:
+    """
+    Send a file from outputs/ with range and conditional-GET support.
+
+    The ETag is the file's SHA-256 from the output manifest (when the manifest entry
+    still matches the file on disk), so it only changes when the map content does;
+    browsers revalidate on every use (no-cache) and get a 304 for unchanged maps.
+    """
+    etag: Any = True
+    try:
+        path = safe_join(str(OUTPUT_DIR), relative_path)
+        entry = _manifest_entry(relative_path)
+        if path and entry and os.path.isfile(path):
+            st = os.stat(path)
+            if entry.get("size") == st.st_size and entry.get("mtime_ns") == st.st_mtime_ns:
+                etag = entry["sha256"]
+    except Exception as e:
+        log_debug(f"[WARN] Output manifest lookup failed for {relative_path}: {e}")
+
+    response = send_from_directory(OUTPUT_DIR, relative_path, conditional=True, etag=etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+@app.route("/outputs/<path:filename>")
+def serve_output(filename: str) -> Any:
+    """Serve rendered maps (PDF/PNG) with byte ranges, strong ETags and 304s"""
+    return _send_output(filename)
+
+
 @app.route("/outputs/districts/<filename>")
 def serve_district_map(filename: str) -> Any:
-    """Serve district map files with no-cache headers"""
+    """Serve district map files (revalidated by content hash)"""
     districts_dir = OUTPUT_DIR / "districts"
     if not districts_dir.exists():
         return jsonify({"error": "Districts directory not found"}), 404
     
-    response = send_from_directory(districts_dir, filename)
-    response.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate, post-check=0, pre-check=0, max-age=0'
-    response.headers['Pragma'] = 'no-cache'
-    response.headers['Expires'] = '-1'
-    return response
+    return _send_output(f"districts/{filename}")
 
 
 @app.route("/health")
@@ -722,18 +1329,10 @@ def diagnostics() -> Any:
     }
     
     # Check R installation
-    try:
-        r_check = subprocess.run(
-            ["Rscript", "--version"],
-            capture_output=True,
-            text=True,
-            timeout=5
-        )
-        diagnostics_info["r_installed"] = r_check.returncode == 0
-        diagnostics_info["r_version"] = r_check.stderr.strip() if r_check.returncode == 0 else "Not installed"
-    except Exception as e:
-        diagnostics_info["r_installed"] = False
-        diagnostics_info["r_error"] = str(e)
+    r_banner = r_version(fresh=True)
+    diagnostics_info["r_installed"] = r_banner is not None
+    diagnostics_info["r_version"] = r_banner or "Not installed"
+    diagnostics_info["fake_renderer"] = FAKE_RENDER_SECONDS > 0
     
     # Check Python packages
     try:
@@ -754,14 +1353,53 @@ def diagnostics() -> Any:
     except ImportError:
         diagnostics_info["reportlab_installed"] = False
     
-    # Check output files
-    output_files = list(OUTPUT_DIR.glob("*.pdf")) + list(OUTPUT_DIR.glob("*.png"))
-    diagnostics_info["output_files_count"] = len(output_files)
-    diagnostics_info["output_files"] = [f.name for f in output_files[:10]]  # First 10
+    # Check output files (from the manifest, not a directory scan)
+    try:
+        manifest = _load_manifest()
+        if manifest is None:  # still being built in the background
+            output_files = sorted(p.name for p in OUTPUT_DIR.glob("*") if p.is_file() and p.name != MANIFEST_NAME)
+        else:
+            output_files = [f["name"] for f in manifest["files"] if "/" not in f["name"]]
+        diagnostics_info["output_files_count"] = len(output_files)
+        diagnostics_info["output_files"] = output_files[:10]  # First 10
+        diagnostics_info["output_manifest"] = manifest and {
+            "generated_at": manifest.get("generated_at"),
+            "assignment_version": manifest.get("assignment_version"),
+            "current_assignment_version": current_assignment_version(),
+            "files": manifest.get("count"),
+        }
+    except Exception as e:
+        diagnostics_info["output_manifest_error"] = str(e)
     
     return jsonify(diagnostics_info)
 
 
+STARTUP: Dict[str, Any] = {"import_ms": round((time.perf_counter() - _IMPORT_STARTED) * 1000, 1), "ready": False}
+_ready = threading.Event()
+
+
+def warm_start() -> None:
+    """Pre-load what the first requests after a cold start need, then flag the app ready."""
+    profile = warm(BASE_DIR, {"stats": _load_stats, "manifest": build_missing_manifest})
+    STARTUP.update(profile, ready=True)
+    _ready.set()
+    log_debug("[STARTUP] Warm start complete", import_ms=STARTUP["import_ms"],
+              warm_ms=profile["total_ms"], snapshot=profile["snapshot"])
+
+
+@app.route("/ready")
+def ready() -> Any:
+    """Readiness probe: 503 until the start-up warm-up has finished, then the start-up profile."""
+    return jsonify(STARTUP), 200 if _ready.is_set() else 503
+
+
+if WARM_ON_START:
+    threading.Thread(target=warm_start, name="warm-start", daemon=True).start()
+else:
+    STARTUP["ready"] = True
+    _ready.set()
+
+
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 5000))
     debug_mode = os.environ.get("FLASK_ENV") == "development"
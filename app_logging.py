@@ -0,0 +1,211 @@
+"""
+Non-blocking, size-bounded debug logging for app.py.
+
+log_debug() only enqueues a LogRecord; a QueueListener thread does the console
+and file I/O, so request and worker threads never open files on the hot path.
+The file rotates by size (LOG_MAX_BYTES, LOG_BACKUP_COUNT) so app_debug.log stays
+bounded. Lines look like:
+
+    [2024-05-01 12:00:00] [INFO] message key=value key2=value2
+"""
+
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+LOGGER_NAME = "vdb"
+LOG_FORMAT = "[%(asctime)s] [%(levelname)s] %(message)s"
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+_ERROR_HINT = re.compile(r"\b(ERROR|FAILED|EXCEPTION)\b", re.IGNORECASE)
+_WARN_HINT = re.compile(r"\[WARN\]|\bWARNING\b")
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_file_handler: Optional[logging.handlers.RotatingFileHandler] = None
+
+
+class StructuredFormatter(logging.Formatter):
+    """Appends the record's structured fields as key=value pairs."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = getattr(record, "fields", None)
+        if fields:
+            line += " " + " ".join(f"{k}={v}" for k, v in fields.items())
+        return line
+
+
+def configure_logging(log_file: Path) -> logging.Logger:
+    """Set up the queue-backed logger once; later calls return the same logger."""
+    global _listener, _file_handler
+    logger = logging.getLogger(LOGGER_NAME)
+    if _listener is not None:
+        return logger
+
+    formatter = StructuredFormatter(LOG_FORMAT, DATE_FORMAT)
+    _file_handler = logging.handlers.RotatingFileHandler(
+        log_file,
+        maxBytes=int(os.environ.get("LOG_MAX_BYTES", 5 * 1024 * 1024)),
+        backupCount=int(os.environ.get("LOG_BACKUP_COUNT", 3)),
+        encoding="utf-8",
+        delay=True,
+    )
+    _file_handler.setFormatter(formatter)
+    console = logging.StreamHandler(sys.stderr)
+    console.setFormatter(formatter)
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    logger.setLevel(logging.DEBUG)
+    logger.propagate = False
+
+    _listener = logging.handlers.QueueListener(log_queue, _file_handler, console, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+    return logger
+
+
+def infer_level(message: str) -> int:
+    """Map the app's existing message conventions ('[WARN]', 'ERROR ...') to a level."""
+    if _ERROR_HINT.search(message):
+        return logging.ERROR
+    if _WARN_HINT.search(message):
+        return logging.WARNING
+    return logging.INFO
+
+
+def log_event(message: str, level: Optional[int] = None, **fields: Any) -> None:
+    """Enqueue one log line; extra keyword arguments are recorded as structured fields."""
+    logger = logging.getLogger(LOGGER_NAME)
+    logger.log(level if level is not None else infer_level(message), message,
+               extra={"fields": fields} if fields else None)
+
+
+def clear_log_files(log_file: Path) -> bool:
+    """Delete the log file and its rotated backups. Returns True if anything was removed."""
+    removed = False
+    handler = _file_handler
+    if handler is not None:
+        handler.acquire()
+    try:
+        if handler is not None and handler.stream is not None:
+            handler.stream.close()
+            handler.stream = None  # reopened lazily on the next record
+        for path in [log_file, *log_file.parent.glob(log_file.name + ".*")]:
+            if path.exists():
+                path.unlink()
+                removed = True
+    finally:
+        if handler is not None:
+            handler.release()
+    return removed
+
+
+def _line_matches(line: str, level: Optional[str], contains: Optional[str]) -> bool:
+    if level and f"[{level}]" not in line:
+        return False
+    if contains and contains.lower() not in line.lower():
+        return False
+    return True
+
+
+def tail_log(log_file: Path, lines: int = 50, before: Optional[int] = None,
+             level: Optional[str] = None, contains: Optional[str] = None,
+             block_size: int = 64 * 1024, max_scan_bytes: int = 16 * 1024 * 1024) -> Dict[str, Any]:
+    """
+    Return the last `lines` log lines matching the filters without reading the whole file.
+
+    The file is read backwards in blocks starting at byte offset `before` (default:
+    end of file). The result's `start_offset` is the offset of the earliest returned
+    line, so passing it back as `before` pages further into the past. At most
+    max_scan_bytes are scanned per call so rare filters stay cheap; `truncated` is
+    True when the scan stopped before reaching the start of the file.
+    """
+    level = level.upper() if level else None
+    size = log_file.stat().st_size
+    end = size if before is None else max(0, min(before, size))
+    matched: List[Tuple[int, str]] = []
+    scanned = 0
+    pos = end
+    carry = b""
+
+    with open(log_file, "rb") as f:
+        while pos > 0 and len(matched) < lines and scanned < max_scan_bytes:
+            read_size = min(block_size, pos)
+            pos -= read_size
+            f.seek(pos)
+            chunk = f.read(read_size) + carry
+            scanned += read_size
+            parts = chunk.split(b"\n")
+            # parts[0] may be the tail of a line that started in an earlier block
+            carry = parts[0] if pos > 0 else b""
+            complete = parts[1:] if pos > 0 else parts
+            offset = pos + len(parts[0]) + 1 if pos > 0 else 0
+            line_offsets = []
+            for raw in complete:
+                line_offsets.append((offset, raw))
+                offset += len(raw) + 1
+            for line_offset, raw in reversed(line_offsets):
+                if not raw.strip():
+                    continue
+                text = raw.decode("utf-8", errors="replace")
+                if _line_matches(text, level, contains):
+                    matched.append((line_offset, text))
+                    if len(matched) >= lines:
+                        break
+
+    matched.reverse()
+    if matched:
+        start_offset = matched[0][0]
+    else:
+        # Everything after the partially read first line has been scanned
+        start_offset = pos + len(carry) + 1 if pos > 0 else 0
+    return {
+        "lines": [text for _, text in matched],
+        "start_offset": start_offset,
+        "end_offset": end,
+        "file_size": size,
+        "truncated": start_offset > 0 and (len(matched) >= lines or scanned >= max_scan_bytes),
+    }
+
+
+def follow_log(log_file: Path, offset: Optional[int] = None, level: Optional[str] = None,
+               contains: Optional[str] = None, poll_interval: float = 0.5,
+               duration: float = 60.0) -> Iterator[str]:
+    """
+    Yield new log lines as they are written, starting at `offset` (default: end of file).
+    Handles rotation/clearing by restarting from the top of the new file. Stops after
+    `duration` seconds so a follower cannot hold a worker forever.
+    """
+    level = level.upper() if level else None
+    deadline = time.monotonic() + duration
+    pos = offset
+    pending = b""
+    while time.monotonic() < deadline:
+        try:
+            size = log_file.stat().st_size
+        except FileNotFoundError:
+            size = 0
+        if pos is None:
+            pos = size
+        if size < pos:
+            pos, pending = 0, b""  # rotated or cleared
+        if size > pos:
+            with open(log_file, "rb") as f:
+                f.seek(pos)
+                data = f.read(size - pos)
+            pos = size
+            pending += data
+            *complete, pending = pending.split(b"\n")
+            for raw in complete:
+                text = raw.decode("utf-8", errors="replace")
+                if raw.strip() and _line_matches(text, level, contains):
+                    yield text + "\n"
+        time.sleep(poll_interval)
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Benchmark GeoJSON load/save for each available JSON backend.
+
+Works on a temporary copy of geojson/ and the CSVs, so the real files are never
+touched. For every backend it times:
+  - cold load   (file parsed from disk)
+  - warm load   (parsed layer still resident, file unchanged)
+  - save        (serialise + write)
+  - generate    (full generate_geojson_from_csv, cold and with resident layers)
+
+Usage: python bench_geojson_io.py [--repeat N] [--json results.json]
+"""
+
+import argparse
+import json
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from io import StringIO
+from pathlib import Path
+
+import geojson_generator as gg
+
+BASE_DIR = Path(__file__).resolve().parent
+LAYERS = ["thanas.geojson", "districts.geojson", "regions.geojson"]
+CSV_FILES = ["region_swapped_data.csv", "region_swapped_data_original.csv"]
+
+
+def _time(fn, repeat: int) -> float:
+    """Median wall time of fn() in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def _make_workdir() -> Path:
+    work = Path(tempfile.mkdtemp(prefix="vdb_bench_"))
+    (work / "geojson").mkdir()
+    for name in LAYERS:
+        shutil.copy2(BASE_DIR / "geojson" / name, work / "geojson" / name)
+    for name in CSV_FILES:
+        if (BASE_DIR / name).exists():
+            shutil.copy2(BASE_DIR / name, work / name)
+    return work
+
+
+def bench_backend(backend: str, work: Path, repeat: int) -> dict:
+    gg.set_json_backend(backend)
+    results = {}
+    for name in LAYERS:
+        path = work / "geojson" / name
+
+        def cold_load():
+            gg._resident.clear()
+            gg.load_geojson(path)
+
+        data = gg.load_geojson(path)
+        results[name] = {
+            "bytes": path.stat().st_size,
+            "cold_load_ms": round(_time(cold_load, repeat), 2),
+            "warm_load_ms": round(_time(lambda: gg.load_geojson(path), repeat), 3),
+            "save_ms": round(_time(lambda: gg.save_geojson(path, data), repeat), 2),
+        }
+
+    def generate_cold():
+        gg._resident.clear()
+        with redirect_stdout(StringIO()):
+            gg.generate_geojson_from_csv(work)
+
+    def generate_warm():
+        with redirect_stdout(StringIO()):
+            gg.generate_geojson_from_csv(work)
+
+    generate_warm()  # prime resident layers and stats caches
+    results["generate"] = {
+        "cold_ms": round(_time(generate_cold, repeat), 1),
+        "resident_ms": round(_time(generate_warm, repeat), 1),
+    }
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", type=Path, help="write results to this file")
+    args = parser.parse_args()
+
+    work = _make_workdir()
+    try:
+        report = {backend: bench_backend(backend, work, args.repeat) for backend in gg.JSON_BACKENDS}
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+    print(f"{'backend':<8} {'layer':<18} {'bytes':>10} {'cold load':>10} {'warm load':>10} {'save':>8}")
+    for backend, results in report.items():
+        for name in LAYERS:
+            r = results[name]
+            print(f"{backend:<8} {name:<18} {r['bytes']:>10,} {r['cold_load_ms']:>8.1f}ms "
+                  f"{r['warm_load_ms']:>8.3f}ms {r['save_ms']:>6.1f}ms")
+        g = results["generate"]
+        print(f"{backend:<8} {'generate (cold)':<18} {'':>10} {g['cold_ms']:>8.1f}ms")
+        print(f"{backend:<8} {'generate (warm)':<18} {'':>10} {g['resident_ms']:>8.1f}ms")
+
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"\nResults written to {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+End-to-end benchmark of the save -> GeoJSON -> render -> brand pipeline.
+
+Runs on a temporary copy of the project (CSVs, geojson/, outputs/, scripts), so the
+real files are never touched. Synthetic move workloads are applied to the current
+assignments:
+
+  single_move     one thana moved to another region
+  ten_moves       ten thanas moved to other regions
+  district_swap   two districts in different regions swap regions
+  full_reset      POST /reset back to region_swapped_data_original.csv
+
+For each workload it times generate_geojson_from_csv, POST /generate (or /reset),
+GET /api/export-csv and, when Rscript is on PATH, the background render until it
+finishes. The logo stampers are timed as subprocesses with their peak RSS.
+Per stage it reports p50/p90/p95/max latency, throughput and peak memory
+(tracemalloc peak for in-process stages, measured in a separate untimed pass).
+
+Usage:
+    python bench_pipeline.py [--repeat N] [--json baseline.json]
+    python bench_pipeline.py --compare baseline.json [--tolerance 0.25]
+
+With --compare the exit status is 1 when any stage's p50 is slower than the
+baseline by more than the tolerance.
+"""
+
+import argparse
+import json
+import logging
+import math
+import random
+import resource
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+from io import StringIO
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+BASE_DIR = Path(__file__).resolve().parent
+COPY_GLOBS = ["*.py", "*.R", "*.csv", "*.html", "*.js", "zaytoon-logo.png"]
+COPY_DIRS = ["geojson", "outputs"]
+WORKLOADS = ["single_move", "ten_moves", "district_swap", "full_reset"]
+LOGO_SCRIPTS = ["add_logo_to_pdfs.py", "add_logo_to_pngs.py"]
+RENDER_TIMEOUT = 900
+
+Row = Tuple[str, str, str]
+
+
+def make_workdir() -> Path:
+    work = Path(tempfile.mkdtemp(prefix="vdb_pipeline_bench_"))
+    for pattern in COPY_GLOBS:
+        for path in BASE_DIR.glob(pattern):
+            shutil.copy2(path, work / path.name)
+    for name in COPY_DIRS:
+        if (BASE_DIR / name).exists():
+            shutil.copytree(BASE_DIR / name, work / name, ignore=shutil.ignore_patterns("tiles", "thumbs"))
+    return work
+
+
+def read_rows(csv_path: Path) -> List[Row]:
+    lines = csv_path.read_text(encoding="utf-8").splitlines()[1:]
+    return [tuple(p.strip() for p in line.split(",")[:3]) for line in lines if line.count(",") >= 2]
+
+
+def move_thanas(rows: List[Row], count: int, rng: random.Random) -> List[Row]:
+    regions = sorted({r for r, _, _ in rows})
+    moved = list(rows)
+    for i in rng.sample(range(len(rows)), count):
+        region, district, thana = moved[i]
+        moved[i] = (rng.choice([r for r in regions if r != region]), district, thana)
+    return moved
+
+
+def swap_districts(rows: List[Row], rng: random.Random) -> List[Row]:
+    district_region = {d: r for r, d, _ in rows}
+    a = rng.choice(sorted(district_region))
+    b = rng.choice(sorted(d for d, r in district_region.items() if r != district_region[a]))
+    ra, rb = district_region[a], district_region[b]
+    return [(rb if d == a else ra if d == b else r, d, t) for r, d, t in rows]
+
+
+def workload_rows(name: str, rows: List[Row], rng: random.Random) -> List[Row]:
+    if name == "single_move":
+        return move_thanas(rows, 1, rng)
+    if name == "ten_moves":
+        return move_thanas(rows, 10, rng)
+    if name == "district_swap":
+        return swap_districts(rows, rng)
+    return rows
+
+
+def write_rows(csv_path: Path, rows: List[Row]) -> None:
+    with csv_path.open("w", encoding="utf-8", newline="") as f:
+        f.write("Region,District,Thana\n")
+        for region, district, thana in rows:
+            f.write(f"{region},{district},{thana}\n")
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    # Nearest rank: the smallest sample with at least pct% of the samples at or below it
+    k = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[k]
+
+
+def summarise(samples: List[float], extra: Dict[str, Any]) -> Dict[str, Any]:
+    ms = [s * 1000 for s in samples]
+    return {
+        "n": len(ms),
+        "p50_ms": round(percentile(ms, 50), 2),
+        "p90_ms": round(percentile(ms, 90), 2),
+        "p95_ms": round(percentile(ms, 95), 2),
+        "max_ms": round(max(ms), 2),
+        "ops_per_s": round(len(samples) / sum(samples), 2) if sum(samples) else None,
+        **extra,
+    }
+
+
+def traced_peak_mb(fn: Callable[[], Any]) -> float:
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return round(peak / 2**20, 2)
+
+
+def run_benchmark(work: Path, repeat: int, seed: int, skip_logos: bool) -> Dict[str, Any]:
+    # Import the copies so BASE_DIR inside the app points at the work directory
+    sys.path.insert(0, str(work))
+    with redirect_stdout(StringIO()):
+        import app as vdb_app
+        import geojson_generator as gg
+        import metrics
+        from app_logging import LOGGER_NAME
+    logging.getLogger(LOGGER_NAME).setLevel(logging.ERROR)  # per-request INFO lines would swamp the table
+
+    client = vdb_app.app.test_client()
+    compact = vdb_app.GEOJSON_COMPACT  # save exactly as /generate does
+    client.post("/login", json={"username": "admin", "password": "zaytoon123"})
+    csv_path = work / "region_swapped_data.csv"
+    base_rows = read_rows(csv_path)
+    rng = random.Random(seed)
+    r_available = shutil.which("Rscript") is not None
+
+    samples: Dict[str, List[float]] = {}
+    memory: Dict[str, float] = {}
+
+    def timed(key: str, fn: Callable[[], Any]) -> Any:
+        start = time.perf_counter()
+        with redirect_stdout(StringIO()):
+            result = fn()
+        samples.setdefault(key, []).append(time.perf_counter() - start)
+        return result
+
+    def wait_for_render(key: str, runs_before: int) -> None:
+        """Record the background run's duration under `key`; nothing if it did not finish in time."""
+        deadline = time.time() + RENDER_TIMEOUT
+        while len(metrics.history()) <= runs_before and time.time() < deadline:
+            time.sleep(0.2)
+        if len(metrics.history()) > runs_before:
+            samples.setdefault(key, []).append(metrics.history()[-1]["elapsed_ms"] / 1000)
+
+    with redirect_stdout(StringIO()):
+        gg.generate_geojson_from_csv(work, compact=compact)  # resident layers, as in a running server
+
+    for name in WORKLOADS:
+        for _ in range(repeat):
+            write_rows(csv_path, base_rows)
+            rows = workload_rows(name, base_rows, rng)
+            payload = [{"region": r, "district": d, "thana": t} for r, d, t in rows]
+
+            if name != "full_reset":
+                write_rows(csv_path, rows)
+                timed(f"{name}/generate_geojson", lambda: gg.generate_geojson_from_csv(work, compact=compact))
+                write_rows(csv_path, base_rows)
+                runs_before = len(metrics.history())
+                resp = timed(f"{name}/post_generate", lambda: client.post("/generate", json=payload))
+            else:
+                runs_before = len(metrics.history())
+                resp = timed(f"{name}/post_reset", lambda: client.post("/reset"))
+            if r_available and resp.get_json().get("background"):
+                wait_for_render(f"{name}/render", runs_before)
+            timed(f"{name}/export_csv", lambda: client.get("/api/export-csv"))
+
+        # One untimed pass under tracemalloc for the in-process peak
+        rows = workload_rows(name, base_rows, rng)
+        write_rows(csv_path, rows)
+        with redirect_stdout(StringIO()):
+            memory[f"{name}/generate_geojson"] = traced_peak_mb(lambda: gg.generate_geojson_from_csv(work, compact=compact))
+            memory[f"{name}/export_csv"] = traced_peak_mb(lambda: client.get("/api/export-csv"))
+        write_rows(csv_path, base_rows)
+
+    rss: Dict[str, int] = {}
+    if not skip_logos:
+        for script in LOGO_SCRIPTS:
+            for _ in range(repeat):
+                start = time.perf_counter()
+                rc, _, peak, _ = metrics.run_measured([sys.executable, script], str(work), 600)
+                samples.setdefault(f"logo/{Path(script).stem}", []).append(time.perf_counter() - start)
+                if peak:
+                    rss[f"logo/{Path(script).stem}"] = max(rss.get(f"logo/{Path(script).stem}", 0), peak)
+                if rc != 0:
+                    print(f"[WARN] {script} exited with {rc}")
+
+    stages = {}
+    for key, values in samples.items():
+        extra: Dict[str, Any] = {}
+        if key in memory:
+            extra["peak_alloc_mb"] = memory[key]
+        if key in rss:
+            extra["peak_rss_mb"] = round(rss[key] / 2**20, 1)
+        if key.endswith("/post_generate") or key.endswith("/generate_geojson"):
+            extra["rows_per_s"] = round(len(base_rows) * len(values) / sum(values), 1)
+        stages[key] = summarise(values, extra)
+
+    return {
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "json_backend": gg.JSON_BACKEND,
+        "geojson_compact": compact,
+        "r_available": r_available,
+        "repeat": repeat,
+        "rows": len(base_rows),
+        "process_peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "stages": stages,
+    }
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    regressions = []
+    for key, stage in report["stages"].items():
+        old = baseline.get("stages", {}).get(key)
+        if not old or not old.get("p50_ms"):
+            continue
+        ratio = stage["p50_ms"] / old["p50_ms"]
+        if ratio > 1 + tolerance:
+            regressions.append(f"{key}: p50 {old['p50_ms']}ms -> {stage['p50_ms']}ms ({ratio:.2f}x)")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", type=Path, help="write results (a baseline) to this file")
+    parser.add_argument("--compare", type=Path, help="baseline JSON to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed p50 slowdown (0.25 = 25%%)")
+    parser.add_argument("--skip-logos", action="store_true", help="do not time the logo stampers")
+    args = parser.parse_args()
+
+    work = make_workdir()
+    try:
+        report = run_benchmark(work, args.repeat, args.seed, args.skip_logos)
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+    print(f"{'stage':<34} {'p50':>9} {'p90':>9} {'p95':>9} {'max':>9} {'ops/s':>8} {'memory':>10}")
+    for key, s in report["stages"].items():
+        mem = f"{s['peak_alloc_mb']}MB" if "peak_alloc_mb" in s else f"{s['peak_rss_mb']}MB rss" if "peak_rss_mb" in s else ""
+        print(f"{key:<34} {s['p50_ms']:>7.1f}ms {s['p90_ms']:>7.1f}ms {s['p95_ms']:>7.1f}ms "
+              f"{s['max_ms']:>7.1f}ms {s['ops_per_s'] or 0:>8.2f} {mem:>10}")
+    print(f"\nR available: {report['r_available']}   process peak RSS: {report['process_peak_rss_mb']} MB")
+
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"Results written to {args.json}")
+
+    if args.compare:
+        regressions = compare(report, json.loads(args.compare.read_text(encoding="utf-8")), args.tolerance)
+        if regressions:
+            print("\nREGRESSIONS:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"\nNo regressions against {args.compare} (tolerance {args.tolerance:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+/**
+ * Compact GeoJSON (.vgeo) decoder
+ * Reads the quantised, delta-encoded sidecars written by compact_geojson.py
+ * with typed array views and rebuilds a regular FeatureCollection.
+ * fetchGeoLayer() falls back to the plain .geojson when no sidecar is served.
+ */
+
+function decodeCompactGeoJSON(buffer) {
+    const view = new DataView(buffer);
+    const magic = String.fromCharCode(view.getUint8(0), view.getUint8(1), view.getUint8(2), view.getUint8(3));
+    if (magic !== 'VGEO') {
+        throw new Error('Not a VGEO file');
+    }
+    const version = view.getUint32(4, true);
+    if (version !== 1) {
+        throw new Error(`Unsupported VGEO version ${version}`);
+    }
+    const headerLen = view.getUint32(8, true);
+    const header = JSON.parse(new TextDecoder('utf-8').decode(new Uint8Array(buffer, 12, headerLen)));
+    const counts = header.counts;
+
+    // Typed arrays are views in platform byte order; every browser we target is little-endian
+    let offset = 12 + headerLen;
+    function take(ArrayType, n) {
+        const arr = new ArrayType(buffer, offset, n);
+        offset += n * ArrayType.BYTES_PER_ELEMENT;
+        return arr;
+    }
+
+    const partOffsets = take(Int32Array, counts.features + 1);
+    const ringOffsets = take(Int32Array, counts.parts + 1);
+    const vertexOffsets = take(Int32Array, counts.rings + 1);
+    const ringStarts = take(Int32Array, counts.rings * 2);
+    const deltas = take(header.delta_type === 'int16' ? Int16Array : Int32Array, counts.deltas * 2);
+
+    const scale = header.scale;
+    const ox = header.origin[0];
+    const oy = header.origin[1];
+    const features = new Array(counts.features);
+    let d = 0;
+
+    for (let f = 0; f < counts.features; f++) {
+        const polygons = [];
+        for (let p = partOffsets[f]; p < partOffsets[f + 1]; p++) {
+            const rings = [];
+            for (let r = ringOffsets[p]; r < ringOffsets[p + 1]; r++) {
+                const n = vertexOffsets[r + 1] - vertexOffsets[r];
+                const ring = new Array(n);
+                if (n > 0) {
+                    let x = ringStarts[2 * r] + ox;
+                    let y = ringStarts[2 * r + 1] + oy;
+                    ring[0] = [x / scale, y / scale];
+                    for (let v = 1; v < n; v++) {
+                        x += deltas[d];
+                        y += deltas[d + 1];
+                        d += 2;
+                        ring[v] = [x / scale, y / scale];
+                    }
+                }
+                rings.push(ring);
+            }
+            polygons.push(rings);
+        }
+        features[f] = {
+            type: 'Feature',
+            properties: header.properties[f],
+            geometry: { type: 'MultiPolygon', coordinates: polygons }
+        };
+    }
+
+    return { type: 'FeatureCollection', features: features };
+}
+
+async function fetchGeoLayer(name, cacheBust) {
+    const qs = cacheBust ? `?_=${cacheBust}` : '';
+    try {
+        const res = await fetch(`/geojson/${name}.vgeo${qs}`, { cache: 'no-store' });
+        if (res.ok) {
+            return decodeCompactGeoJSON(await res.arrayBuffer());
+        }
+    } catch (err) {
+        console.warn(`[WARN] Compact ${name} layer unavailable, using GeoJSON:`, err);
+    }
+    const res = await fetch(`/geojson/${name}.geojson${qs}`, { cache: 'no-store' });
+    if (!res.ok) {
+        throw new Error(`GeoJSON ${name} not found or server error`);
+    }
+    return res.json();
+}
@@ -0,0 +1,219 @@
+"""
+Compact binary sidecar for the GeoJSON layers (*.vgeo).
+
+Coordinates are quantised to fixed-precision integers and delta-encoded per ring,
+then written as little-endian typed arrays the browser can view directly
+(see compact-geojson.js). Layout:
+
+    b"VGEO" | uint32 format version | uint32 header length | header JSON (space padded to 4 bytes)
+    Int32  part_offsets[features + 1]   feature i owns parts part_offsets[i]..part_offsets[i+1]
+    Int32  ring_offsets[parts + 1]      part j owns rings ring_offsets[j]..ring_offsets[j+1]
+    Int32  vertex_offsets[rings + 1]    ring k owns vertices vertex_offsets[k]..vertex_offsets[k+1]
+    Int32  ring_starts[rings * 2]       first vertex of each ring, quantised, relative to origin
+    Int16/Int32 deltas[deltas * 2]      remaining vertices as deltas from the previous one
+
+The header holds the feature properties, scale, origin and the delta array type
+('int16' when every delta fits, else 'int32'). Every Polygon is stored as a
+single-part MultiPolygon.
+"""
+
+import json
+import os
+import struct
+import sys
+from array import array
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from geometry import iter_polygons
+
+MAGIC = b"VGEO"
+FORMAT_VERSION = 1
+DEFAULT_DECIMALS = 5  # ~1 m, plenty for web display
+
+
+def _le(arr: array) -> bytes:
+    if sys.byteorder == "big":
+        arr = array(arr.typecode, arr)
+        arr.byteswap()
+    return arr.tobytes()
+
+
+class _Sections:
+    """One feature's quantised geometry: ring layout, absolute ring starts and packed deltas."""
+
+    __slots__ = ("scale", "part_rings", "ring_lengths", "starts", "min_x", "min_y", "deltas16", "deltas32", "n_deltas")
+
+    def __init__(self, geometry: Dict[str, Any], scale: int):
+        self.scale = scale
+        self.part_rings: List[int] = []
+        self.ring_lengths: List[int] = []
+        self.starts: List[Optional[Tuple[int, int]]] = []
+        self.min_x = self.min_y = None
+        deltas = array("i")
+        for polygon in iter_polygons(geometry):
+            for ring in polygon:
+                px = py = None
+                for pt in ring:
+                    qx, qy = int(round(pt[0] * scale)), int(round(pt[1] * scale))
+                    if px is None:
+                        self.starts.append((qx, qy))
+                    else:
+                        deltas.append(qx - px)
+                        deltas.append(qy - py)
+                    px, py = qx, qy
+                    self.min_x = qx if self.min_x is None or qx < self.min_x else self.min_x
+                    self.min_y = qy if self.min_y is None or qy < self.min_y else self.min_y
+                if px is None:
+                    self.starts.append(None)
+                self.ring_lengths.append(len(ring))
+            self.part_rings.append(len(polygon))
+        self.n_deltas = len(deltas) // 2
+        self.deltas32 = _le(deltas)
+        fits16 = all(-32768 <= d <= 32767 for d in deltas)
+        self.deltas16 = _le(array("h", deltas)) if fits16 else None
+
+
+def _sections(features: List[Dict[str, Any]], scale: int, cache: Optional[Dict[int, Tuple[Any, "_Sections"]]]):
+    """Per-feature sections, reused from `cache` (geometry object -> sections) when the geometry is unchanged."""
+    out = []
+    fresh: Dict[int, Tuple[Any, _Sections]] = {}
+    for feature in features:
+        geometry = feature.get("geometry") or {}
+        hit = cache.get(id(geometry)) if cache is not None else None
+        sections = hit[1] if hit and hit[0] is geometry and hit[1].scale == scale else _Sections(geometry, scale)
+        fresh[id(geometry)] = (geometry, sections)  # keeps the geometry alive, so its id stays unique
+        out.append(sections)
+    if cache is not None:
+        cache.clear()
+        cache.update(fresh)
+    return out
+
+
+def encode(data: Dict[str, Any], decimals: int = DEFAULT_DECIMALS,
+           cache: Optional[Dict[int, Tuple[Any, _Sections]]] = None) -> bytes:
+    """
+    Encode a Polygon/MultiPolygon FeatureCollection into the VGEO byte layout.
+    With a `cache` dict (one per layer, kept by the caller), features whose geometry
+    object is the same as last time reuse their quantised sections, so a save that
+    only changed properties just rebuilds the offset tables and the header.
+    """
+    scale = 10 ** decimals
+    features = data.get("features", [])
+    sections = _sections(features, scale, cache)
+
+    part_offsets = array("i", [0])
+    ring_offsets = array("i", [0])
+    vertex_offsets = array("i", [0])
+    for sec in sections:
+        for rings in sec.part_rings:
+            ring_offsets.append(ring_offsets[-1] + rings)
+        for n in sec.ring_lengths:
+            vertex_offsets.append(vertex_offsets[-1] + n)
+        part_offsets.append(len(ring_offsets) - 1)
+
+    min_x = min((sec.min_x for sec in sections if sec.min_x is not None), default=None) or 0
+    min_y = min((sec.min_y for sec in sections if sec.min_y is not None), default=None) or 0
+    ring_starts = array("i")
+    for sec in sections:
+        for start in sec.starts:
+            ring_starts.extend((start[0] - min_x, start[1] - min_y) if start else (0, 0))
+
+    delta_type = "int16" if all(sec.deltas16 is not None for sec in sections) else "int32"
+    deltas = b"".join(sec.deltas16 if delta_type == "int16" else sec.deltas32 for sec in sections)
+
+    header = json.dumps({
+        "type": "FeatureCollection",
+        "scale": scale,
+        "origin": [min_x, min_y],
+        "delta_type": delta_type,
+        "counts": {
+            "features": len(features),
+            "parts": len(ring_offsets) - 1,
+            "rings": len(vertex_offsets) - 1,
+            "vertices": vertex_offsets[-1],
+            "deltas": sum(sec.n_deltas for sec in sections),
+        },
+        "properties": [feature.get("properties") or {} for feature in features],
+    }, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    header += b" " * (-len(header) % 4)
+
+    return b"".join([
+        MAGIC,
+        struct.pack("<II", FORMAT_VERSION, len(header)),
+        header,
+        _le(part_offsets), _le(ring_offsets), _le(vertex_offsets), _le(ring_starts), deltas,
+    ])
+
+
+def decode(blob: bytes) -> Dict[str, Any]:
+    """Decode VGEO bytes back into a GeoJSON FeatureCollection (MultiPolygon geometries)."""
+    if blob[:4] != MAGIC:
+        raise ValueError("not a VGEO file")
+    version, header_len = struct.unpack_from("<II", blob, 4)
+    if version != FORMAT_VERSION:
+        raise ValueError(f"unsupported VGEO version {version}")
+    header = json.loads(blob[12:12 + header_len].decode("utf-8"))
+    counts = header["counts"]
+    offset = 12 + header_len
+
+    def take(typecode: str, n: int) -> array:
+        nonlocal offset
+        arr = array(typecode)
+        arr.frombytes(blob[offset:offset + n * arr.itemsize])
+        if sys.byteorder == "big":
+            arr.byteswap()
+        offset += n * arr.itemsize
+        return arr
+
+    part_offsets = take("i", counts["features"] + 1)
+    ring_offsets = take("i", counts["parts"] + 1)
+    vertex_offsets = take("i", counts["rings"] + 1)
+    ring_starts = take("i", counts["rings"] * 2)
+    deltas = take("h" if header["delta_type"] == "int16" else "i", counts["deltas"] * 2)
+
+    scale = header["scale"]
+    ox, oy = header["origin"]
+    features = []
+    d = 0
+    for f in range(counts["features"]):
+        polygons = []
+        for p in range(part_offsets[f], part_offsets[f + 1]):
+            rings = []
+            for r in range(ring_offsets[p], ring_offsets[p + 1]):
+                n = vertex_offsets[r + 1] - vertex_offsets[r]
+                if n == 0:
+                    rings.append([])
+                    continue
+                x, y = ring_starts[2 * r] + ox, ring_starts[2 * r + 1] + oy
+                ring = [[x / scale, y / scale]]
+                for _ in range(n - 1):
+                    x += deltas[d]
+                    y += deltas[d + 1]
+                    d += 2
+                    ring.append([x / scale, y / scale])
+                rings.append(ring)
+            polygons.append(rings)
+        features.append({
+            "type": "Feature",
+            "properties": header["properties"][f],
+            "geometry": {"type": "MultiPolygon", "coordinates": polygons},
+        })
+    return {"type": "FeatureCollection", "features": features}
+
+
+# Quantised sections per sidecar path (see encode): a save re-encodes only new geometry
+_section_caches: Dict[str, Dict[int, Tuple[Any, _Sections]]] = {}
+
+
+def save_compact(filepath: Path, data: Dict[str, Any], decimals: int = DEFAULT_DECIMALS) -> bool:
+    """Write the .vgeo sidecar next to a GeoJSON layer; returns False on error."""
+    try:
+        cache = _section_caches.setdefault(os.path.abspath(filepath), {})
+        tmp = filepath.with_name(filepath.name + ".tmp")
+        tmp.write_bytes(encode(data, decimals, cache))
+        tmp.replace(filepath)
+        return True
+    except Exception as e:
+        print(f"Error saving {filepath.name}: {e}")
+        return False
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Stand-in for the R renderer and the post-render scripts, for load testing without R.
+
+app.py runs this instead of the real pipeline scripts when VDB_FAKE_RENDER_SECONDS
+is set:
+
+    python fake_renderer.py generate_map_from_swaps.R 8
+    python fake_renderer.py add_logo_to_pdfs.py 8
+
+For generate_map_from_swaps.R it takes the given number of seconds, reads the
+current assignments like the R script does, writes .progress after every region
+and district, and prints the same [SPAN] lines, so /progress polling and pipeline
+metrics behave as in production. Every other script takes a twentieth of that time.
+Output maps are left untouched.
+
+VDB_FAKE_RENDER_FAIL_RATE (0..1) makes that fraction of map runs exit with status 1.
+"""
+
+import json
+import os
+import random
+import sys
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+MAP_SCRIPT = "generate_map_from_swaps.R"
+POST_SCRIPT_FRACTION = 0.05
+# Share of the run spent per stage; what is left is split over region and district maps
+FIXED_STAGES = [("r_libraries", 0.10), ("r_load_shapefile", 0.10), ("r_prepare", 0.05)]
+NATIONAL_MAPS = ["districts_png", "districts_pdf", "thanas_pdf", "thanas_png"]
+NATIONAL_SHARE = 0.05
+REGION_SHARE = 0.25
+TOTAL_REGIONS = 10
+TOTAL_DISTRICTS = 64
+
+
+def emit_span(stage: str, seconds: float, map_name: Optional[str] = None) -> None:
+    fields = {"stage": stage, "ms": round(seconds * 1000, 1)}
+    if map_name is not None:
+        fields["map"] = map_name
+    print(f"[SPAN] {json.dumps(fields)}", flush=True)
+
+
+def stage(name: str, seconds: float, map_name: Optional[str] = None) -> None:
+    time.sleep(seconds)
+    emit_span(name, seconds, map_name)
+
+
+def write_progress(regions: int, districts: int, status: str = "generating") -> None:
+    Path(".progress").write_text(json.dumps({
+        "regions": regions, "districts": districts,
+        "total_regions": TOTAL_REGIONS, "total_districts": TOTAL_DISTRICTS, "status": status,
+    }), encoding="utf-8")
+
+
+def load_assignments() -> Tuple[List[str], List[str]]:
+    regions, districts = set(), set()
+    with open("region_swapped_data.csv", encoding="utf-8") as f:
+        for line in f.readlines()[1:]:
+            parts = line.strip().split(",")
+            if len(parts) >= 3:
+                regions.add(parts[0].strip())
+                districts.add(parts[1].strip())
+    return sorted(regions), sorted(districts)
+
+
+def fake_map_run(seconds: float) -> int:
+    for name, share in FIXED_STAGES:
+        stage(name, seconds * share)
+    regions, districts = load_assignments()
+
+    for map_name in NATIONAL_MAPS:
+        stage("render_national", seconds * NATIONAL_SHARE, map_name)
+
+    district_share = 1 - sum(s for _, s in FIXED_STAGES) - NATIONAL_SHARE * len(NATIONAL_MAPS) - REGION_SHARE
+    for n, region in enumerate(regions, 1):
+        stage("render_region", seconds * REGION_SHARE / max(len(regions), 1), region)
+        write_progress(n, 0)
+        print(f"✓ [{n}/{len(regions)}] {region} region map", flush=True)
+    for n, district in enumerate(districts, 1):
+        stage("render_district", seconds * district_share / max(len(districts), 1), district)
+        write_progress(TOTAL_REGIONS, n)
+
+    if random.random() < float(os.environ.get("VDB_FAKE_RENDER_FAIL_RATE", "0") or 0):
+        print("✗ Injected failure (VDB_FAKE_RENDER_FAIL_RATE)", flush=True)
+        return 1
+    emit_span("r_logo", 0.0)
+    return 0
+
+
+def main() -> int:
+    if len(sys.argv) != 3:
+        print(__doc__)
+        return 2
+    script_name, seconds = sys.argv[1], float(sys.argv[2])
+    if script_name == MAP_SCRIPT:
+        return fake_map_run(seconds)
+    time.sleep(seconds * POST_SCRIPT_FRACTION)
+    print(f"✓ {script_name} (fake, {seconds * POST_SCRIPT_FRACTION:.2f}s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,32 +6,183 @@ GeoJSON property names used in this project:
   districts.geojson -> {'region': ..., 'district': ...}  (all lowercase)
   thanas.geojson    -> {'region': ..., 'district': ..., 'thana': ...}  (all lowercase)
   regions.geojson   -> {'region': ...}  (all lowercase)
+
+Compact mode (--compact / compact=True) also writes a quantised, delta-encoded
+binary sidecar (<layer>.vgeo) next to each layer; see compact_geojson.py.
+Every update also refreshes geojson/anchors.json (label points, centroids and
+bboxes per feature; see anchors.py).
 """
 
 import json
 import csv
+import os
+import sys
 from pathlib import Path
-from typing import Dict, List, Any
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from anchors import ANCHORS_NAME, build_anchors, seed_from_file
+from compact_geojson import save_compact
+from geometry_store import ID_FIELDS, save_store, store_path
+from region_stats import compute_stats
+
+
+# ── JSON backend ─────────────────────────────────────────────────────────────
+# Pluggable (loads, dumps) pairs working on bytes. orjson is preferred when
+# installed (several times faster on multi-MB layers); the stdlib is the
+# fallback. GEOJSON_JSON_BACKEND=json|orjson forces a choice.
+def _stdlib_loads(raw: bytes) -> Any:
+    return json.loads(raw)
+
+
+def _stdlib_dumps(data: Any) -> bytes:
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+JSON_BACKENDS: Dict[str, Tuple[Callable[[bytes], Any], Callable[[Any], bytes]]] = {
+    "json": (_stdlib_loads, _stdlib_dumps),
+}
+try:
+    import orjson
+    JSON_BACKENDS["orjson"] = (orjson.loads, orjson.dumps)
+except ImportError:
+    pass
+
+JSON_BACKEND = ""
+json_loads = _stdlib_loads
+json_dumps = _stdlib_dumps
+
+
+def set_json_backend(name: str) -> str:
+    """Switch the serialiser used by load_geojson/save_geojson; unknown names fall back to stdlib."""
+    global JSON_BACKEND, json_loads, json_dumps
+    if name not in JSON_BACKENDS:
+        name = "json"
+    JSON_BACKEND = name
+    json_loads, json_dumps = JSON_BACKENDS[name]
+    return name
+
+
+set_json_backend(os.environ.get("GEOJSON_JSON_BACKEND") or ("orjson" if "orjson" in JSON_BACKENDS else "json"))
+
+
+# Parsed layers kept resident between calls, keyed by path and validated by
+# (mtime_ns, size) so an external rewrite (e.g. the R pass) is picked up.
+_resident: Dict[str, Tuple[Tuple[int, int], Dict[str, Any]]] = {}
+
+# Serialised polygon coordinates keyed by id() of the polygon list (the list is
+# kept alongside so the id cannot be reused). Geometry never changes between
+# saves, so only the small properties are re-serialised; regions.geojson reuses
+# the district polygons' bytes since it references the same lists.
+_polygon_json: Dict[int, Tuple[list, bytes]] = {}
+
+# Region MultiPolygons from the last rebuild with the district geometries they
+# were built from. A region whose membership is unchanged gets the very same
+# geometry dict back, so the identity-keyed .geom/.vgeo caches keep hitting.
+_region_geometry: Dict[str, Tuple[List[Dict[str, Any]], Dict[str, Any]]] = {}
+
+
+def _resident_key(filepath: Path) -> str:
+    return os.path.abspath(filepath)
+
+
+def _file_signature(filepath: Path) -> Tuple[int, int]:
+    st = filepath.stat()
+    return st.st_mtime_ns, st.st_size
 
 
 def load_geojson(filepath: Path) -> Dict[str, Any]:
-    """Load GeoJSON file, return empty FeatureCollection if missing/corrupt."""
+    """
+    Load GeoJSON file, return empty FeatureCollection if missing/corrupt.
+    Unchanged files are served from the resident copy instead of being re-parsed;
+    callers may update the returned object in place and pass it to save_geojson.
+    """
     if filepath.exists():
         try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            key = _resident_key(filepath)
+            signature = _file_signature(filepath)
+            cached = _resident.get(key)
+            if cached and cached[0] == signature:
+                return cached[1]
+            data = json_loads(filepath.read_bytes())
+            if cached:
+                # Layer was rewritten externally; its old polygons are garbage now
+                _polygon_json.clear()
+            _resident[key] = (signature, data)
+            return data
         except Exception as e:
+            _resident.pop(_resident_key(filepath), None)
             print(f"Warning: Could not load {filepath.name}: {e}")
     return {"type": "FeatureCollection", "features": []}
 
 
+def _polygon_bytes(polygon: list) -> bytes:
+    cached = _polygon_json.get(id(polygon))
+    if cached is not None and cached[0] is polygon:
+        return cached[1]
+    raw = json_dumps(polygon)
+    _polygon_json[id(polygon)] = (polygon, raw)
+    return raw
+
+
+def _geometry_bytes(geometry: Optional[Dict[str, Any]]) -> bytes:
+    if not geometry:
+        return b"null"
+    geom_type = geometry.get("type")
+    coords = geometry.get("coordinates")
+    if geom_type == "Polygon":
+        return b'{"type":"Polygon","coordinates":' + _polygon_bytes(coords) + b"}"
+    if geom_type == "MultiPolygon":
+        return (b'{"type":"MultiPolygon","coordinates":['
+                + b",".join(_polygon_bytes(polygon) for polygon in coords) + b"]}")
+    return json_dumps(geometry)
+
+
+def _feature_bytes(feature: Dict[str, Any]) -> bytes:
+    extra = b"".join(b"," + json_dumps(k) + b":" + json_dumps(v) for k, v in feature.items()
+                     if k not in ("type", "properties", "geometry"))
+    return (b'{"type":"Feature","properties":' + json_dumps(feature.get("properties") or {})
+            + b',"geometry":' + _geometry_bytes(feature.get("geometry")) + extra + b"}")
+
+
+def iter_feature_collection(data: Dict[str, Any]) -> Iterator[bytes]:
+    """Serialise a FeatureCollection piece by piece, one feature per chunk, reusing cached polygon bytes."""
+    members = b"".join(json_dumps(k) + b":" + json_dumps(v) + b"," for k, v in data.items()
+                       if k not in ("type", "features"))
+    yield b'{"type":"FeatureCollection",' + members + b'"features":['
+    for n, feature in enumerate(data.get("features", [])):
+        yield (b"," if n else b"") + _feature_bytes(feature)
+    yield b"]}"
+
+
+def dump_feature_collection(data: Dict[str, Any]) -> bytes:
+    """Serialise a whole FeatureCollection to bytes (save_geojson streams instead)."""
+    return b"".join(iter_feature_collection(data))
+
+
 def save_geojson(filepath: Path, data: Dict[str, Any]) -> bool:
-    """Save GeoJSON file compactly (no indent for smaller file size)."""
+    """
+    Save GeoJSON file compactly (no indent for smaller file size).
+    FeatureCollections are streamed feature by feature into a temp file that then
+    replaces the layer, so the whole document is never held in memory and readers
+    never see a half-written file.
+    """
+    tmp = filepath.with_name(filepath.name + ".tmp")
     try:
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False)
+        with open(tmp, 'wb') as f:
+            if data.get("type") == "FeatureCollection":
+                for chunk in iter_feature_collection(data):
+                    f.write(chunk)
+            else:
+                f.write(json_dumps(data))
+        os.replace(tmp, filepath)
+        _resident[_resident_key(filepath)] = (_file_signature(filepath), data)
         return True
     except Exception as e:
+        _resident.pop(_resident_key(filepath), None)
+        try:
+            tmp.unlink()
+        except OSError:
+            pass
         print(f"Error saving {filepath.name}: {e}")
         return False
 
@@ -127,7 +278,9 @@ def rebuild_regions_geojson(geojson: Dict, district_to_region: Dict[str, str]) -
     Rebuild regions.geojson by grouping district features under their new regions.
     Instead of dissolving polygons (needs shapely/geopandas), we create one
     MultiPolygon feature per region from the district geometries.
-    This works without any external dependencies.
+    This works without any external dependencies. The district polygon lists are
+    shared, not copied, so saving reuses their cached JSON bytes, and a region
+    whose districts are unchanged keeps its previous geometry dict.
     """
     from collections import defaultdict
 
@@ -147,7 +300,14 @@ def rebuild_regions_geojson(geojson: Dict, district_to_region: Dict[str, str]) -
         return geojson  # Nothing to rebuild
 
     new_features = []
+    reused: Dict[str, Tuple[List[Dict[str, Any]], Dict[str, Any]]] = {}
     for region, geometries in sorted(region_geometries.items()):
+        cached = _region_geometry.get(region)
+        if cached and len(cached[0]) == len(geometries) and all(a is b for a, b in zip(cached[0], geometries)):
+            reused[region] = cached
+            new_features.append({"type": "Feature", "properties": {"region": region}, "geometry": cached[1]})
+            continue
+
         # Collect all polygon rings into one MultiPolygon
         all_polygons = []
         for geom in geometries:
@@ -159,25 +319,74 @@ def rebuild_regions_geojson(geojson: Dict, district_to_region: Dict[str, str]) -
                 all_polygons.extend(coords)
 
         if all_polygons:
+            geometry = {"type": "MultiPolygon", "coordinates": all_polygons}
+            reused[region] = (geometries, geometry)
             new_features.append({
                 "type": "Feature",
                 "properties": {"region": region},
-                "geometry": {
-                    "type": "MultiPolygon",
-                    "coordinates": all_polygons
-                }
+                "geometry": geometry
             })
 
+    _region_geometry.clear()
+    _region_geometry.update(reused)
+
     return {
         "type": "FeatureCollection",
         "features": new_features
     }
 
 
-def generate_geojson_from_csv(base_dir: Path) -> bool:
+def write_stats(base_dir: Path, thanas_geo: Optional[Dict] = None,
+                thana_to_info: Optional[Dict[tuple, str]] = None) -> Optional[Dict[str, Any]]:
+    """
+    Compute per-region/per-district stats and save them to geojson/stats.json.
+    Missing inputs are loaded from disk. Returns the stats dict, or None on failure.
+    """
+    if thanas_geo is None:
+        thanas_geo = load_geojson(base_dir / "geojson" / "thanas.geojson")
+    if thana_to_info is None:
+        _, thana_to_info = load_csv_mappings(base_dir / "region_swapped_data.csv")
+
+    original_csv = base_dir / "region_swapped_data_original.csv"
+    original = load_csv_mappings(original_csv)[1] if original_csv.exists() else None
+
+    stats = compute_stats(thanas_geo.get("features", []), thana_to_info, original)
+    if not save_geojson(base_dir / "geojson" / "stats.json", stats):
+        return None
+    return stats
+
+
+def write_anchors(geojson_dir: Path, layers: Dict[str, Dict]) -> Optional[int]:
+    """
+    Save geojson/anchors.json (bbox, area, centroid, label point per feature) for the
+    given {layer name -> FeatureCollection}. Anchors are cached by geometry, so only
+    new geometry (regions whose membership changed) is computed. Returns the number
+    computed, or None on failure.
+    """
+    path = geojson_dir / ANCHORS_NAME
+    seed_from_file(path)
+    doc, computed = build_anchors({name: geo.get("features", []) for name, geo in layers.items()}, ID_FIELDS)
+    if not save_geojson(path, doc):
+        return None
+    return computed
+
+
+def save_layer(filepath: Path, data: Dict[str, Any], compact: bool = False) -> bool:
+    """Save a GeoJSON layer, its memory-mapped .geom store and, in compact mode, its .vgeo sidecar."""
+    if not save_geojson(filepath, data):
+        return False
+    if not save_store(store_path(filepath), data):
+        print(f"[WARN] Could not save geometry store for {filepath.name}")
+    if compact and not save_compact(filepath.with_suffix(".vgeo"), data):
+        print(f"[WARN] Could not save compact sidecar for {filepath.name}")
+    return True
+
+
+def generate_geojson_from_csv(base_dir: Path, compact: bool = False) -> bool:
     """
     Update all GeoJSON files based on current CSV data.
     This is the main entry point called from app.py.
+    With compact=True, .vgeo sidecars are written alongside each layer.
     Returns True if successful.
     """
     try:
@@ -198,7 +407,7 @@ def generate_geojson_from_csv(base_dir: Path) -> bool:
 
         if districts_geo["features"]:
             n = update_districts_geojson(districts_geo, district_to_region)
-            if save_geojson(districts_path, districts_geo):
+            if save_layer(districts_path, districts_geo, compact):
                 print(f"[OK] districts.geojson updated ({n} features)")
             else:
                 print("[WARN] Could not save districts.geojson")
@@ -211,24 +420,42 @@ def generate_geojson_from_csv(base_dir: Path) -> bool:
 
         if thanas_geo["features"]:
             n = update_thanas_geojson(thanas_geo, thana_to_info, district_to_region)
-            if save_geojson(thanas_path, thanas_geo):
+            if save_layer(thanas_path, thanas_geo, compact):
                 print(f"[OK] thanas.geojson updated ({n} features)")
             else:
                 print("[WARN] Could not save thanas.geojson")
         else:
             print("[WARN] thanas.geojson is empty or missing — cannot update")
 
-        # ── 3. Rebuild regions.geojson from updated districts ────────────────
+        # ── 3. Refresh per-region/district stats (cached by assignment) ─────
+        if thanas_geo["features"]:
+            stats = write_stats(base_dir, thanas_geo, thana_to_info)
+            if stats:
+                print(f"[OK] stats.json updated (version {stats['version']})")
+            else:
+                print("[WARN] Could not save stats.json")
+
+        # ── 4. Rebuild regions.geojson from updated districts ────────────────
         regions_path = geojson_dir / "regions.geojson"
         if districts_geo["features"]:
             regions_geo = rebuild_regions_geojson(districts_geo, district_to_region)
-            if save_geojson(regions_path, regions_geo):
+            if save_layer(regions_path, regions_geo, compact):
                 print(f"[OK] regions.geojson rebuilt ({len(regions_geo['features'])} regions)")
             else:
                 print("[WARN] Could not save regions.geojson")
         else:
             print("[WARN] Skipping regions.geojson rebuild — no district data")
 
+        # ── 5. Label anchors and extents for the map pages ──────────────────
+        layers = {"thanas": thanas_geo, "districts": districts_geo}
+        if districts_geo["features"]:
+            layers["regions"] = regions_geo
+        computed = write_anchors(geojson_dir, {k: v for k, v in layers.items() if v.get("features")})
+        if computed is not None:
+            print(f"[OK] anchors.json updated ({computed} anchors recomputed)")
+        else:
+            print("[WARN] Could not save anchors.json")
+
         print("[OK] GeoJSON update complete!")
         return True
 
@@ -242,5 +469,5 @@ def generate_geojson_from_csv(base_dir: Path) -> bool:
 if __name__ == "__main__":
     base_dir = Path(__file__).resolve().parent
     print(f"Running GeoJSON generator from: {base_dir}")
-    success = generate_geojson_from_csv(base_dir)
+    success = generate_geojson_from_csv(base_dir, compact="--compact" in sys.argv)
     exit(0 if success else 1)
@@ -0,0 +1,124 @@
+"""
+Small pure-Python geometry helpers for the GeoJSON layers (no shapely/GEOS needed).
+
+Coordinates are plain GeoJSON [lon, lat] pairs. Only Polygon and MultiPolygon
+geometries are handled since that is all the district/thana/region layers contain.
+"""
+
+import math
+from typing import Any, Dict, Iterator, List, Sequence, Tuple
+
+BBox = Tuple[float, float, float, float]  # (min_lon, min_lat, max_lon, max_lat)
+
+
+def iter_polygons(geometry: Dict[str, Any]) -> Iterator[List]:
+    """Yield each polygon (list of rings) of a Polygon/MultiPolygon geometry."""
+    if not geometry:
+        return
+    geom_type = geometry.get("type", "")
+    coords = geometry.get("coordinates", [])
+    if geom_type == "Polygon":
+        yield coords
+    elif geom_type == "MultiPolygon":
+        yield from coords
+
+
+def ring_bbox(ring: Sequence[Sequence[float]]) -> BBox:
+    """Bounding box of a single ring."""
+    xs = [pt[0] for pt in ring]
+    ys = [pt[1] for pt in ring]
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+def merge_bbox(a: BBox, b: BBox) -> BBox:
+    """Smallest bbox covering both a and b."""
+    return min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3])
+
+
+def geometry_bbox(geometry: Dict[str, Any]) -> BBox:
+    """Bounding box of a Polygon/MultiPolygon (outer rings only)."""
+    bbox = None
+    for polygon in iter_polygons(geometry):
+        if polygon:
+            rb = ring_bbox(polygon[0])
+            bbox = rb if bbox is None else merge_bbox(bbox, rb)
+    if bbox is None:
+        raise ValueError("geometry has no polygon rings")
+    return bbox
+
+
+def bbox_contains(bbox: BBox, x: float, y: float) -> bool:
+    return bbox[0] <= x <= bbox[2] and bbox[1] <= y <= bbox[3]
+
+
+def bbox_intersects(a: BBox, b: BBox) -> bool:
+    return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+
+
+def point_in_ring(x: float, y: float, xs: Sequence[float], ys: Sequence[float]) -> bool:
+    """
+    Even-odd ray casting test against a ring given as separate x/y sequences.
+    Splitting the ring up front avoids indexing [lon, lat] pairs in the hot loop.
+    """
+    inside = False
+    n = len(xs)
+    j = n - 1
+    for i in range(n):
+        yi = ys[i]
+        yj = ys[j]
+        if (yi > y) != (yj > y):
+            if x < (xs[j] - xs[i]) * (y - yi) / (yj - yi) + xs[i]:
+                inside = not inside
+        j = i
+    return inside
+
+
+def split_ring(ring: Sequence[Sequence[float]]) -> Tuple[Tuple[float, ...], Tuple[float, ...]]:
+    """Turn [[lon, lat], ...] into ((lon, ...), (lat, ...))."""
+    return tuple(pt[0] for pt in ring), tuple(pt[1] for pt in ring)
+
+
+def point_in_polygon(x: float, y: float, polygon: Sequence) -> bool:
+    """True if the point is inside the outer ring and outside every hole."""
+    if not polygon:
+        return False
+    if not point_in_ring(x, y, *split_ring(polygon[0])):
+        return False
+    return not any(point_in_ring(x, y, *split_ring(hole)) for hole in polygon[1:])
+
+
+# Local equirectangular scale factors; plenty accurate at Bangladesh's extent.
+KM_PER_DEG_LAT = 110.574
+KM_PER_DEG_LON_EQUATOR = 111.320
+
+
+def ring_area_km2(ring: Sequence[Sequence[float]]) -> float:
+    """Unsigned area of a ring in km², using a local equirectangular projection."""
+    n = len(ring)
+    if n < 3:
+        return 0.0
+    mean_lat = sum(pt[1] for pt in ring) / n
+    kx = KM_PER_DEG_LON_EQUATOR * math.cos(math.radians(mean_lat))
+    twice_area = 0.0
+    for i in range(n):
+        x1, y1 = ring[i - 1][0], ring[i - 1][1]
+        x2, y2 = ring[i][0], ring[i][1]
+        twice_area += x1 * y2 - x2 * y1
+    return abs(twice_area) / 2.0 * kx * KM_PER_DEG_LAT
+
+
+def segment_length_km(a: Sequence[float], b: Sequence[float]) -> float:
+    """Length of a short segment between two [lon, lat] points in km."""
+    kx = KM_PER_DEG_LON_EQUATOR * math.cos(math.radians((a[1] + b[1]) / 2.0))
+    return math.hypot((b[0] - a[0]) * kx, (b[1] - a[1]) * KM_PER_DEG_LAT)
+
+
+def polygon_area_km2(polygon: Sequence) -> float:
+    """Outer ring area minus hole areas."""
+    if not polygon:
+        return 0.0
+    return ring_area_km2(polygon[0]) - sum(ring_area_km2(hole) for hole in polygon[1:])
+
+
+def geometry_area_km2(geometry: Dict[str, Any]) -> float:
+    return sum(polygon_area_km2(polygon) for polygon in iter_polygons(geometry))
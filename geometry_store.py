@@ -0,0 +1,260 @@
+"""
+Memory-mapped binary geometry store for the GeoJSON layers (*.geom).
+
+The generator writes geojson/<layer>.geom next to each layer. Readers mmap the file
+and view the coordinate and offset tables in place (memoryview casts, no parsing),
+so every gunicorn worker and tool shares one page-cached copy instead of holding
+its own nested lists of floats. Layout (little-endian, sections 8-byte aligned):
+
+    b"VGST" | uint32 format version | uint32 header length | header JSON (space padded)
+    Int32    part_offsets[features + 1]   feature i owns parts part_offsets[i]..part_offsets[i+1]
+    Int32    ring_offsets[parts + 1]      part j owns rings ring_offsets[j]..ring_offsets[j+1]
+    Int32    vertex_offsets[rings + 1]    ring k owns vertices vertex_offsets[k]..vertex_offsets[k+1]
+    Float64  part_bboxes[parts * 4]       (min_lon, min_lat, max_lon, max_lat) of each outer ring
+    Float32  coords[vertices * 2]         lon, lat interleaved (float32 is ~1 m at this longitude)
+
+The header holds the feature properties and an id -> feature index map (ids are
+built from the layer's ID_FIELDS, e.g. "Jessore/Abhaynagar" for thanas), so a
+feature is found in O(1) by index or id. Polygons are stored as one-part MultiPolygons.
+"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from geometry import BBox, iter_polygons, ring_bbox
+
+MAGIC = b"VGST"
+FORMAT_VERSION = 1
+STORE_SUFFIX = ".geom"
+ID_FIELDS = {
+    "thanas": ("district", "thana"),
+    "districts": ("district",),
+    "regions": ("region",),
+}
+
+
+def store_path(layer_path: Path) -> Path:
+    return layer_path.with_suffix(STORE_SUFFIX)
+
+
+def feature_id(properties: Dict[str, Any], id_fields: Sequence[str]) -> str:
+    return "/".join(str(properties.get(field, "")) for field in id_fields)
+
+
+def _le(arr: array) -> bytes:
+    if sys.byteorder == "big":
+        arr = array(arr.typecode, arr)
+        arr.byteswap()
+    return arr.tobytes()
+
+
+def _pad8(blob: bytes, fill: bytes = b"\0") -> bytes:
+    return blob + fill * (-len(blob) % 8)
+
+
+def _geometry_tables(features: List[Dict[str, Any]]) -> Tuple[Dict[str, int], bytes]:
+    """Counts and the packed offset/bbox/coordinate sections for a list of features."""
+    part_offsets = array("i", [0])
+    ring_offsets = array("i", [0])
+    vertex_offsets = array("i", [0])
+    part_bboxes = array("d")
+    coords = array("f")
+
+    for feature in features:
+        for polygon in iter_polygons(feature.get("geometry") or {}):
+            part_bboxes.extend(ring_bbox(polygon[0]) if polygon and polygon[0] else (0.0, 0.0, 0.0, 0.0))
+            for ring in polygon:
+                coords.extend(c for pt in ring for c in (pt[0], pt[1]))
+                vertex_offsets.append(vertex_offsets[-1] + len(ring))
+            ring_offsets.append(len(vertex_offsets) - 1)
+        part_offsets.append(len(ring_offsets) - 1)
+
+    counts = {"features": len(features), "parts": len(ring_offsets) - 1,
+              "rings": len(vertex_offsets) - 1, "vertices": vertex_offsets[-1]}
+    body = b"".join([_pad8(_le(part_offsets)), _pad8(_le(ring_offsets)), _pad8(_le(vertex_offsets)),
+                     _le(part_bboxes), _le(coords)])
+    return counts, body
+
+
+def encode(data: Dict[str, Any], id_fields: Sequence[str] = (),
+           tables: Optional[Tuple[Dict[str, int], bytes]] = None) -> bytes:
+    """Encode a Polygon/MultiPolygon FeatureCollection into the store layout."""
+    features = data.get("features", [])
+    counts, body = tables or _geometry_tables(features)
+    properties = [feature.get("properties") or {} for feature in features]
+    ids: Dict[str, int] = {}
+    if id_fields:
+        for n, props in enumerate(properties):
+            ids.setdefault(feature_id(props, id_fields), n)
+
+    header = json.dumps({"counts": counts, "id_fields": list(id_fields), "ids": ids, "properties": properties},
+                        ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    header += b" " * (-(12 + len(header)) % 8)
+    return b"".join([MAGIC, struct.pack("<II", FORMAT_VERSION, len(header)), header, body])
+
+
+# Packed geometry sections per store path, kept with the geometry objects they were
+# built from: saves only change properties, so the tables are reused as long as the
+# generator's resident layer still holds the very same geometry dicts
+_tables_cache: Dict[str, Tuple[List[Any], Tuple[Dict[str, int], bytes]]] = {}
+
+
+def save_store(filepath: Path, data: Dict[str, Any], id_fields: Optional[Sequence[str]] = None) -> bool:
+    """Write a layer's .geom file atomically (readers keep their old mapping); returns False on error."""
+    if id_fields is None:
+        id_fields = ID_FIELDS.get(filepath.stem, ())
+    try:
+        features = data.get("features", [])
+        geometries = [feature.get("geometry") for feature in features]
+        key = os.path.abspath(filepath)
+        cached = _tables_cache.get(key)
+        if cached and len(cached[0]) == len(geometries) and all(a is b for a, b in zip(cached[0], geometries)):
+            tables = cached[1]
+        else:
+            tables = _geometry_tables(features)
+            _tables_cache[key] = (geometries, tables)
+        tmp = filepath.with_name(filepath.name + ".tmp")
+        tmp.write_bytes(encode(data, id_fields, tables))
+        os.replace(tmp, filepath)
+        return True
+    except Exception as e:
+        print(f"Error saving {filepath.name}: {e}")
+        return False
+
+
+class GeometryStore:
+    """Read-only, zero-copy view of a .geom file."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        with open(path, "rb") as f:
+            st = os.fstat(f.fileno())
+            self.signature = (st.st_mtime_ns, st.st_size)
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:4] != MAGIC:
+            self._mm.close()
+            raise ValueError(f"{path.name} is not a geometry store")
+        version, header_len = struct.unpack_from("<II", self._mm, 4)
+        if version != FORMAT_VERSION:
+            self._mm.close()
+            raise ValueError(f"unsupported geometry store version {version}")
+        header = json.loads(self._mm[12:12 + header_len].decode("utf-8"))
+        counts = header["counts"]
+        self.properties: List[Dict[str, Any]] = header["properties"]
+        self.id_fields: Tuple[str, ...] = tuple(header["id_fields"])
+        self._ids: Dict[str, int] = header["ids"]
+
+        view = memoryview(self._mm)
+        offset = 12 + header_len
+
+        def take(fmt: str, n: int, itemsize: int, align: bool = True):
+            nonlocal offset
+            size = n * itemsize
+            if sys.byteorder == "little":
+                part = view[offset:offset + size].cast(fmt)
+            else:
+                part = array(fmt, view[offset:offset + size].tobytes())
+                part.byteswap()
+            offset += size + (-size % 8 if align else 0)
+            return part
+
+        self.part_offsets = take("i", counts["features"] + 1, 4)
+        self.ring_offsets = take("i", counts["parts"] + 1, 4)
+        self.vertex_offsets = take("i", counts["rings"] + 1, 4)
+        self.part_bboxes = take("d", counts["parts"] * 4, 8)
+        self.coords = take("f", counts["vertices"] * 2, 4, align=False)
+        self._views = [self.part_offsets, self.ring_offsets, self.vertex_offsets, self.part_bboxes, self.coords]
+
+    def __len__(self) -> int:
+        return len(self.properties)
+
+    def __enter__(self) -> "GeometryStore":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        for v in self._views:
+            if isinstance(v, memoryview):
+                v.release()
+        self._views = []
+        try:
+            self._mm.close()
+        except BufferError:
+            pass  # ring views handed out are still alive; the map goes when they do
+
+    def index_of(self, fid: str) -> Optional[int]:
+        """Feature index for an id (see ID_FIELDS), or None."""
+        return self._ids.get(fid)
+
+    def parts(self, feature_idx: int) -> range:
+        return range(self.part_offsets[feature_idx], self.part_offsets[feature_idx + 1])
+
+    def part_bbox(self, part_idx: int) -> BBox:
+        b = self.part_bboxes
+        return b[4 * part_idx], b[4 * part_idx + 1], b[4 * part_idx + 2], b[4 * part_idx + 3]
+
+    def feature_bbox(self, feature_idx: int) -> Optional[BBox]:
+        boxes = [self.part_bbox(p) for p in self.parts(feature_idx)]
+        if not boxes:
+            return None
+        return (min(b[0] for b in boxes), min(b[1] for b in boxes),
+                max(b[2] for b in boxes), max(b[3] for b in boxes))
+
+    def rings_xy(self, part_idx: int) -> Iterator[Tuple[Sequence[float], Sequence[float]]]:
+        """(xs, ys) of each ring of a part, outer ring first, as strided views into the map."""
+        for r in range(self.ring_offsets[part_idx], self.ring_offsets[part_idx + 1]):
+            a, b = self.vertex_offsets[r], self.vertex_offsets[r + 1]
+            yield self.coords[2 * a:2 * b:2], self.coords[2 * a + 1:2 * b:2]
+
+    def geometry(self, feature_idx: int) -> Dict[str, Any]:
+        """Materialise one feature's geometry as a GeoJSON MultiPolygon."""
+        polygons = []
+        for p in self.parts(feature_idx):
+            polygons.append([[[x, y] for x, y in zip(xs, ys)] for xs, ys in self.rings_xy(p)])
+        return {"type": "MultiPolygon", "coordinates": polygons}
+
+    def feature(self, feature_idx: int) -> Dict[str, Any]:
+        return {"type": "Feature", "properties": self.properties[feature_idx],
+                "geometry": self.geometry(feature_idx)}
+
+
+_open_stores: Dict[str, GeometryStore] = {}
+
+
+def open_layer_store(layer_path: Path) -> Optional[GeometryStore]:
+    """
+    The store next to a GeoJSON layer, if it is at least as new as the layer (the R
+    pass rewrites only the GeoJSON, which makes the store stale); otherwise None.
+    """
+    path = store_path(layer_path)
+    try:
+        if path.stat().st_mtime_ns < layer_path.stat().st_mtime_ns:
+            return None
+        return open_store(path)
+    except (OSError, ValueError):
+        return None
+
+
+def open_store(path: Path) -> Optional[GeometryStore]:
+    """Shared GeometryStore for a .geom file, re-opened when the file is replaced; None if missing."""
+    key = os.path.abspath(path)
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return None
+    cached = _open_stores.get(key)
+    if cached is not None and cached.signature == (st.st_mtime_ns, st.st_size):
+        return cached
+    store = GeometryStore(path)
+    # The previous mapping is left to the garbage collector: views handed out
+    # earlier (e.g. to a spatial index still in use) must stay valid
+    _open_stores[key] = store
+    return store
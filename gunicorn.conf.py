@@ -0,0 +1,18 @@
+# Gunicorn settings (gunicorn -c gunicorn.conf.py app:app).
+#
+# One process (free tier memory) with a pool of threads: a save, an export or a long
+# /debug/logs?follow=1 stream occupies one thread while GeoJSON, PDF and /progress
+# reads keep being served by the others. Map rendering runs in subprocesses started
+# from a background thread, so it does not hold a request thread either.
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '10000')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", "1"))
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "gthread")
+threads = int(os.environ.get("GUNICORN_THREADS", "16"))
+# Idle keep-alive connections hold a thread in gthread workers; keep them short
+keepalive = 5
+timeout = 180
+graceful_timeout = 30
+loglevel = os.environ.get("GUNICORN_LOG_LEVEL", "info")
+accesslog = "-"
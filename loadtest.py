@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Locust-style load test: concurrent sessions log in, fetch GeoJSON, save with /generate
+and poll /progress, each user looping over weighted tasks with a think time between them.
+
+With --spawn it starts gunicorn on a temporary copy of the project (the real CSV and
+outputs are never written) with VDB_FAKE_RENDER_SECONDS set, so fake_renderer.py
+stands in for R and the logo scripts:
+
+    python loadtest.py --spawn --users 20 --duration 60 --render-seconds 8
+    python loadtest.py --host http://localhost:10000 --users 10 --duration 30
+
+Reported per request name: count, failures, p50/p95/p99/max latency and requests/s.
+GeoJSON reads are split into [idle] and [render] by the pipeline state the users last
+saw on /progress, which shows read latency under write pressure. From
+/metrics/pipeline it also reports how many renders the saves turned into (saves that
+arrive while a render runs are coalesced into one follow-up run).
+"""
+
+import argparse
+import http.cookiejar
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+BASE_DIR = Path(__file__).resolve().parent
+COPY_GLOBS = ["*.py", "*.R", "*.csv", "*.html", "*.js", "zaytoon-logo.png"]
+COPY_DIRS = ["geojson", "outputs"]
+USERNAME, PASSWORD = "admin", "zaytoon123"
+GEOJSON_LAYERS = ["thanas.geojson", "districts.geojson", "regions.geojson"]
+
+
+class Stats:
+    """Latency samples and failures per request name, shared by all users."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples: Dict[str, List[float]] = {}
+        self.failures: Dict[str, int] = {}
+        self.counters: Dict[str, int] = {}
+
+    def record(self, name: str, seconds: float, ok: bool) -> None:
+        with self.lock:
+            self.samples.setdefault(name, []).append(seconds)
+            if not ok:
+                self.failures[name] = self.failures.get(name, 0) + 1
+
+    def count(self, name: str) -> None:
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + 1
+
+    def report(self, elapsed: float) -> Dict[str, Any]:
+        rows = {}
+        with self.lock:
+            for name in sorted(self.samples):
+                ms = sorted(s * 1000 for s in self.samples[name])
+                pick = lambda p: round(ms[min(len(ms) - 1, int(len(ms) * p))], 1)
+                rows[name] = {"count": len(ms), "failures": self.failures.get(name, 0),
+                              "p50_ms": pick(0.50), "p95_ms": pick(0.95), "p99_ms": pick(0.99),
+                              "max_ms": round(ms[-1], 1), "rps": round(len(ms) / elapsed, 2)}
+            return {"requests": rows, "counters": dict(self.counters)}
+
+
+class User(threading.Thread):
+    """One browser session: logs in, then runs weighted tasks until stopped."""
+
+    def __init__(self, host: str, stats: Stats, stop: threading.Event, state: Dict[str, bool],
+                 wait: Tuple[float, float], weights: Dict[str, int], seed: int):
+        super().__init__(daemon=True)
+        self.host = host.rstrip("/")
+        self.stats = stats
+        self.stop = stop
+        self.state = state
+        self.wait = wait
+        self.tasks = [name for name, weight in weights.items() for _ in range(weight)]
+        self.rng = random.Random(seed)
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+        self.rows: List[Dict[str, str]] = []
+
+    def request(self, name: str, path: str, payload: Any = None) -> Optional[bytes]:
+        data = json.dumps(payload).encode("utf-8") if payload is not None else None
+        req = urllib.request.Request(self.host + path, data=data,
+                                     headers={"Content-Type": "application/json"} if data else {})
+        start = time.perf_counter()
+        try:
+            with self.opener.open(req, timeout=120) as resp:
+                body = resp.read()
+            self.stats.record(name, time.perf_counter() - start, True)
+            return body
+        except (urllib.error.URLError, OSError):
+            self.stats.record(name, time.perf_counter() - start, False)
+            return None
+
+    def login(self) -> bool:
+        if self.request("POST /login", "/login", {"username": USERNAME, "password": PASSWORD}) is None:
+            return False
+        body = self.request("GET /region_swapped_data.csv", "/region_swapped_data.csv")
+        if body is None:
+            return False
+        for line in body.decode("utf-8").splitlines()[1:]:
+            parts = [p.strip() for p in line.split(",")]
+            if len(parts) >= 3:
+                self.rows.append({"region": parts[0], "district": parts[1], "thana": parts[2]})
+        return bool(self.rows)
+
+    def task_geojson(self) -> None:
+        phase = "render" if self.state.get("rendering") else "idle"
+        layer = self.rng.choice(GEOJSON_LAYERS)
+        self.request(f"GET /geojson [{phase}]", f"/geojson/{layer}")
+
+    def task_progress(self) -> None:
+        body = self.request("GET /progress", "/progress")
+        if body:
+            self.state["rendering"] = json.loads(body).get("status") == "generating"
+
+    def task_save(self) -> None:
+        # Move one thana to another region, as a drag on the map does
+        regions = sorted({r["region"] for r in self.rows})
+        row = self.rng.choice(self.rows)
+        row["region"] = self.rng.choice([r for r in regions if r != row["region"]] or regions)
+        body = self.request("POST /generate", "/generate", self.rows)
+        if body:
+            result = json.loads(body)
+            self.stats.count("saves")
+            if "queued" in result.get("message", ""):
+                self.stats.count("saves_queued")
+            elif result.get("background"):
+                self.stats.count("saves_started_render")
+
+    def task_stats(self) -> None:
+        self.request("GET /api/stats", "/api/stats")
+
+    def task_export(self) -> None:
+        self.request("GET /api/export-csv", "/api/export-csv")
+
+    def task_districts(self) -> None:
+        self.request("GET /districts/list", "/districts/list")
+
+    def run(self) -> None:
+        if not self.login():
+            return
+        while not self.stop.is_set():
+            getattr(self, f"task_{self.rng.choice(self.tasks)}")()
+            self.stop.wait(self.rng.uniform(*self.wait))
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def make_workdir() -> Path:
+    work = Path(tempfile.mkdtemp(prefix="vdb_loadtest_"))
+    for pattern in COPY_GLOBS:
+        for path in BASE_DIR.glob(pattern):
+            shutil.copy2(path, work / path.name)
+    for name in COPY_DIRS:
+        if (BASE_DIR / name).exists():
+            shutil.copytree(BASE_DIR / name, work / name, ignore=shutil.ignore_patterns("tiles", "thumbs"))
+    return work
+
+
+def spawn_server(work: Path, port: int, render_seconds: float, gunicorn_args: List[str]) -> subprocess.Popen:
+    env = dict(os.environ, VDB_FAKE_RENDER_SECONDS=str(render_seconds))
+    # Production settings (gunicorn.conf.py); --gunicorn-arg=--worker-class=sync compares with sync
+    cmd = [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app:app",
+           "--bind", f"127.0.0.1:{port}", "--access-logfile", "/dev/null", *gunicorn_args]
+    proc = subprocess.Popen(cmd, cwd=work, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=2).read()
+            return proc
+        except (urllib.error.URLError, OSError):
+            if proc.poll() is not None:
+                raise RuntimeError("gunicorn exited during startup")
+            time.sleep(0.3)
+    proc.kill()
+    raise RuntimeError("server did not become healthy within 60s")
+
+
+def pipeline_runs(host: str, since: float) -> List[Dict[str, Any]]:
+    try:
+        with urllib.request.urlopen(host.rstrip("/") + "/metrics/pipeline", timeout=10) as resp:
+            data = json.loads(resp.read())
+    except (urllib.error.URLError, OSError, ValueError):
+        return []
+    # started_at is an ISO timestamp in the server's local time (same box with --spawn)
+    since_iso = datetime.fromtimestamp(since).isoformat(timespec="seconds")
+    runs = data.get("history", []) + ([data["current"]] if data.get("current") else [])
+    return [run for run in runs if run.get("started_at", "") >= since_iso]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="http://127.0.0.1:10000")
+    parser.add_argument("--spawn", action="store_true", help="start gunicorn with the fake renderer on a project copy")
+    parser.add_argument("--render-seconds", type=float, default=8.0, help="fake render duration with --spawn")
+    parser.add_argument("--gunicorn-arg", action="append", default=[], help="extra gunicorn argument (repeatable)")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--spawn-rate", type=float, default=5.0, help="users started per second")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds after the last user started")
+    parser.add_argument("--wait", type=float, nargs=2, default=(0.5, 2.0), metavar=("MIN", "MAX"))
+    parser.add_argument("--weights", default="geojson=5,progress=3,save=1,stats=1,districts=1,export=1",
+                        help="task weights, e.g. geojson=5,progress=3,save=1")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", type=Path, help="write the report to this file")
+    args = parser.parse_args()
+
+    weights = {k: int(v) for k, v in (item.split("=") for item in args.weights.split(","))}
+    server = work = None
+    host = args.host
+    if args.spawn:
+        work = make_workdir()
+        port = free_port()
+        host = f"http://127.0.0.1:{port}"
+        server = spawn_server(work, port, args.render_seconds, args.gunicorn_arg)
+        print(f"✓ gunicorn on {host} (fake render {args.render_seconds:g}s, project copy {work})")
+
+    stats = Stats()
+    stop = threading.Event()
+    state = {"rendering": False}
+    users: List[User] = []
+    started = time.time()
+    try:
+        for n in range(args.users):
+            user = User(host, stats, stop, state, tuple(args.wait), weights, args.seed + n)
+            user.start()
+            users.append(user)
+            time.sleep(1 / args.spawn_rate)
+        print(f"✓ {len(users)} users running, holding for {args.duration:g}s")
+        time.sleep(args.duration)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        for user in users:
+            user.join(timeout=130)
+        elapsed = time.time() - started
+        runs = pipeline_runs(host, started)
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+        if work is not None:
+            shutil.rmtree(work, ignore_errors=True)
+
+    report = stats.report(elapsed)
+    report["elapsed_s"] = round(elapsed, 1)
+    report["users"] = args.users
+    report["pipeline_runs"] = len(runs)
+    report["pipeline_run_seconds"] = [round(r.get("elapsed_ms", 0) / 1000, 1) for r in runs]
+    saves = report["counters"].get("saves", 0)
+    report["saves_per_run"] = round(saves / len(runs), 2) if runs else None
+
+    print(f"\n{'name':<34} {'reqs':>6} {'fails':>6} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8} {'req/s':>7}")
+    for name, r in report["requests"].items():
+        print(f"{name:<34} {r['count']:>6} {r['failures']:>6} {r['p50_ms']:>6.0f}ms {r['p95_ms']:>6.0f}ms "
+              f"{r['p99_ms']:>6.0f}ms {r['max_ms']:>6.0f}ms {r['rps']:>7.2f}")
+    print(f"\nSaves: {saves} ({report['counters'].get('saves_queued', 0)} queued behind a running render), "
+          f"pipeline runs: {len(runs)}, saves per run: {report['saves_per_run']}")
+
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"Report written to {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
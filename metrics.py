@@ -0,0 +1,488 @@
+"""
+In-process metrics for the map pipeline and the web app, exported in Prometheus text format.
+
+A PipelineRun collects spans (stage, optional map name, duration, bytes written,
+peak RSS) for one background generation; finished runs are kept in a rolling
+history (PIPELINE_HISTORY, default 20) and folded into cumulative per-stage
+totals. The R script reports its own stages on stdout as
+
+    [SPAN] {"stage": "render_region", "map": "Dhaka", "ms": 1234.5, "bytes": 123}
+
+which run_measured() turns into spans as the lines arrive.
+
+RequestMetricsMiddleware wraps the WSGI app and keeps per-route latency histograms,
+response byte counts and status codes. With SLOW_REQUEST_MS set, a sampler thread
+also records folded stack samples of requests that run past the threshold.
+"""
+
+import json
+import os
+import subprocess
+import sys
+import threading
+import traceback
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+SPAN_PREFIX = "[SPAN] "
+PIPELINE_HISTORY = int(os.environ.get("PIPELINE_HISTORY", 20))
+
+_lock = threading.Lock()
+_history: Deque[Dict[str, Any]] = deque(maxlen=PIPELINE_HISTORY)
+_current: Optional["PipelineRun"] = None
+_runs_total: Dict[str, int] = {}
+_stage_totals: Dict[str, Dict[str, float]] = {}
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SLOW_REQUEST_KEEP = 20
+_request_stats: Dict[Tuple[str, str], Dict[str, Any]] = {}
+_request_status: Dict[Tuple[str, str, int], int] = {}
+_slow_requests: Deque[Dict[str, Any]] = deque(maxlen=SLOW_REQUEST_KEEP)
+
+
+def self_rss_bytes() -> Optional[int]:
+    """Peak RSS of this process so far."""
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class PipelineRun:
+    """Spans of one background generation run."""
+
+    def __init__(self, assignment_version: Optional[str] = None):
+        self.started = time.time()
+        self.started_at = datetime.now().isoformat(timespec="seconds")
+        self.assignment_version = assignment_version
+        self.spans: List[Dict[str, Any]] = []
+        self.stage: Optional[str] = None
+        self.status = "running"
+
+    def add_span(self, stage: str, duration_ms: float, map_name: Optional[str] = None,
+                 bytes_written: Optional[int] = None, peak_rss_bytes: Optional[int] = None,
+                 **fields: Any) -> Dict[str, Any]:
+        span = {"stage": stage, "ms": round(duration_ms, 1)}
+        if map_name is not None:
+            span["map"] = map_name
+        if bytes_written is not None:
+            span["bytes"] = int(bytes_written)
+        if peak_rss_bytes is not None:
+            span["peak_rss_bytes"] = int(peak_rss_bytes)
+        span.update(fields)
+        with _lock:
+            self.spans.append(span)
+        return span
+
+    @contextmanager
+    def span(self, stage: str, **fields: Any) -> Iterator[Dict[str, Any]]:
+        """Time a block; the yielded dict may be filled with bytes/peak_rss_bytes/extra fields."""
+        self.stage = stage
+        extra: Dict[str, Any] = {}
+        start = time.perf_counter()
+        try:
+            yield extra
+        finally:
+            other = {k: v for k, v in extra.items() if k not in ("bytes", "peak_rss_bytes")}
+            self.add_span(stage, (time.perf_counter() - start) * 1000,
+                          bytes_written=extra.get("bytes"),
+                          peak_rss_bytes=extra.get("peak_rss_bytes"), **fields, **other)
+            self.stage = None
+
+    def summary(self) -> Dict[str, Any]:
+        """Per-stage totals plus the spans, for /progress and the history."""
+        with _lock:
+            spans = list(self.spans)
+        stages: Dict[str, Dict[str, Any]] = {}
+        for span in spans:
+            s = stages.setdefault(span["stage"], {"count": 0, "ms": 0.0, "bytes": 0})
+            s["count"] += 1
+            s["ms"] = round(s["ms"] + span["ms"], 1)
+            s["bytes"] += span.get("bytes", 0)
+        return {
+            "started_at": self.started_at,
+            "elapsed_ms": round((time.time() - self.started) * 1000, 1),
+            "assignment_version": self.assignment_version,
+            "status": self.status,
+            "current_stage": self.stage,
+            "stages": stages,
+            "spans": spans,
+        }
+
+
+def start_run(assignment_version: Optional[str] = None) -> PipelineRun:
+    global _current
+    run = PipelineRun(assignment_version)
+    with _lock:
+        _current = run
+    return run
+
+
+def finish_run(run: PipelineRun, status: str) -> Dict[str, Any]:
+    """Close a run, fold it into the cumulative totals and push it onto the history."""
+    global _current
+    run.status = status
+    summary = run.summary()
+    with _lock:
+        _runs_total[status] = _runs_total.get(status, 0) + 1
+        for stage, s in summary["stages"].items():
+            t = _stage_totals.setdefault(stage, {"count": 0, "seconds": 0.0, "bytes": 0, "last_seconds": 0.0})
+            t["count"] += s["count"]
+            t["seconds"] += s["ms"] / 1000
+            t["bytes"] += s["bytes"]
+            t["last_seconds"] = s["ms"] / 1000
+        for span in summary["spans"]:
+            if "peak_rss_bytes" in span:
+                _stage_totals[span["stage"]]["peak_rss_bytes"] = span["peak_rss_bytes"]
+        _history.append(summary)
+        if _current is run:
+            _current = None
+    return summary
+
+
+def current_run() -> Optional[Dict[str, Any]]:
+    with _lock:
+        run = _current
+    return run.summary() if run else None
+
+
+def history() -> List[Dict[str, Any]]:
+    """Finished run summaries, oldest first (copies; callers may modify them)."""
+    with _lock:
+        return [dict(run, spans=list(run["spans"])) for run in _history]
+
+
+def parse_span_line(line: str) -> Optional[Dict[str, Any]]:
+    if not line.startswith(SPAN_PREFIX):
+        return None
+    try:
+        return json.loads(line[len(SPAN_PREFIX):])
+    except ValueError:
+        return None
+
+
+def _vm_hwm_bytes(pid: int) -> Optional[int]:
+    """Peak RSS of a running process from /proc (Linux); None if unavailable."""
+    try:
+        with open(f"/proc/{pid}/status", "r") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def run_measured(cmd: List[str], cwd: str, timeout: float,
+                 on_line: Optional[Callable[[str, float], None]] = None) -> Tuple[int, str, Optional[int], Optional[float]]:
+    """
+    Run a command, streaming its merged stdout/stderr lines to on_line(line, seconds_since_start).
+
+    Returns (returncode, last ~4 KB of output, sampled peak RSS of the child in bytes or None,
+    seconds until the first output line or None). Raises subprocess.TimeoutExpired
+    after killing the child if it runs longer than `timeout`.
+    """
+    start = time.perf_counter()
+    proc = subprocess.Popen(cmd, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                            text=True, encoding="utf-8", errors="replace", bufsize=1)
+    timed_out = threading.Event()
+
+    def kill() -> None:
+        timed_out.set()
+        proc.kill()
+
+    timer = threading.Timer(timeout, kill)
+    timer.start()
+
+    # The child's own high-water mark: wait4()'s ru_maxrss also counts the pre-exec
+    # copy of this (much larger) web process, so sample /proc while it runs
+    hwm = [0]
+    done = threading.Event()
+
+    def sample_rss() -> None:
+        while True:
+            value = _vm_hwm_bytes(proc.pid)
+            if value:
+                hwm[0] = max(hwm[0], value)
+            if done.wait(0.1):
+                break
+
+    sampler = threading.Thread(target=sample_rss, daemon=True)
+    sampler.start()
+    tail: Deque[str] = deque(maxlen=200)
+    first_output = None
+    peak_rss = None
+    try:
+        for line in proc.stdout:
+            elapsed = time.perf_counter() - start
+            if first_output is None:
+                first_output = elapsed
+            tail.append(line)
+            if on_line is not None:
+                on_line(line.rstrip("\n"), elapsed)
+    except BaseException:
+        proc.kill()
+        raise
+    finally:
+        proc.stdout.close()
+        last = _vm_hwm_bytes(proc.pid)
+        if last:
+            hwm[0] = max(hwm[0], last)
+        proc.wait()
+        done.set()
+        timer.cancel()
+        if hwm[0]:
+            peak_rss = hwm[0]
+
+    if timed_out.is_set():
+        raise subprocess.TimeoutExpired(cmd, timeout)
+    return proc.returncode, "".join(tail)[-4000:], peak_rss, first_output
+
+
+def observe_request(route: str, method: str, status: int, seconds: float, nbytes: int) -> None:
+    """Record one finished request."""
+    with _lock:
+        stats = _request_stats.get((route, method))
+        if stats is None:
+            stats = _request_stats[(route, method)] = {
+                "buckets": [0] * len(LATENCY_BUCKETS), "count": 0, "sum": 0.0, "bytes": 0}
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                stats["buckets"][i] += 1
+                break
+        stats["count"] += 1
+        stats["sum"] += seconds
+        stats["bytes"] += nbytes
+        key = (route, method, status)
+        _request_status[key] = _request_status.get(key, 0) + 1
+
+
+class SlowRequestSampler:
+    """
+    Samples the stacks of in-flight requests once they pass threshold_ms.
+
+    Samples are folded ("outer;...;inner" -> count) per request and kept for the
+    last SLOW_REQUEST_KEEP slow requests.
+    """
+
+    def __init__(self, threshold_ms: float, interval: float = 0.01):
+        self.threshold = threshold_ms / 1000
+        self.interval = interval
+        self._inflight: Dict[int, Dict[str, Any]] = {}
+        self._inflight_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="slow-request-sampler", daemon=True)
+        self._thread.start()
+
+    def begin(self, method: str, path: str) -> Dict[str, Any]:
+        entry = {"thread": threading.get_ident(), "method": method, "path": path,
+                 "start": time.perf_counter(), "samples": {}}
+        with self._inflight_lock:
+            self._inflight[id(entry)] = entry
+        return entry
+
+    def end(self, entry: Dict[str, Any], route: str, status: int) -> None:
+        with self._inflight_lock:
+            self._inflight.pop(id(entry), None)
+            samples = dict(entry["samples"])
+        seconds = time.perf_counter() - entry["start"]
+        if seconds < self.threshold:
+            return
+        top = sorted(samples.items(), key=lambda kv: kv[1], reverse=True)[:20]
+        with _lock:
+            _slow_requests.append({
+                "at": datetime.now().isoformat(timespec="seconds"),
+                "method": entry["method"], "path": entry["path"], "route": route, "status": status,
+                "ms": round(seconds * 1000, 1), "sample_interval_ms": self.interval * 1000,
+                "stacks": [{"stack": stack, "samples": n} for stack, n in top],
+            })
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.interval)
+            now = time.perf_counter()
+            with self._inflight_lock:
+                due = [e for e in self._inflight.values() if now - e["start"] >= self.threshold]
+            if not due:
+                continue
+            frames = sys._current_frames()
+            for entry in due:
+                frame = frames.get(entry["thread"])
+                if frame is None:
+                    continue
+                stack = ";".join(f"{os.path.basename(f.filename)}:{f.name}:{f.lineno}"
+                                 for f in traceback.extract_stack(frame))
+                with self._inflight_lock:
+                    entry["samples"][stack] = entry["samples"].get(stack, 0) + 1
+
+
+class _MeteredBody:
+    """Response iterable that counts bytes and reports when the server closes it."""
+
+    def __init__(self, body: Any, on_close: Callable[[int], None]):
+        self._body = body
+        self._on_close = on_close
+        self._bytes = 0
+
+    def __iter__(self) -> Iterator[bytes]:
+        for chunk in self._body:
+            self._bytes += len(chunk)
+            yield chunk
+
+    def close(self) -> None:
+        try:
+            if hasattr(self._body, "close"):
+                self._body.close()
+        finally:
+            self._on_close(self._bytes)
+
+
+class RequestMetricsMiddleware:
+    """
+    WSGI middleware recording latency (until the response is fully sent), bytes and
+    status per route. The route label is environ["vdb.route"] (set by the app from
+    the matched URL rule) so label cardinality stays bounded. File responses keep
+    the server's wsgi.file_wrapper (sendfile) path: they are timed to the start of
+    the response and counted by Content-Length.
+    """
+
+    def __init__(self, wsgi_app: Callable, slow_request_ms: Optional[float] = None):
+        self.wsgi_app = wsgi_app
+        self.sampler = SlowRequestSampler(slow_request_ms) if slow_request_ms else None
+
+    def __call__(self, environ: Dict[str, Any], start_response: Callable) -> Any:
+        start = time.perf_counter()
+        method = environ.get("REQUEST_METHOD", "GET")
+        entry = self.sampler.begin(method, environ.get("PATH_INFO", "")) if self.sampler else None
+        meta = {"status": 500, "length": 0}
+
+        def metered_start_response(status: str, headers: List[Tuple[str, str]], exc_info: Any = None) -> Any:
+            meta["status"] = int(status.split(" ", 1)[0])
+            for name, value in headers:
+                if name.lower() == "content-length":
+                    meta["length"] = int(value)
+            return start_response(status, headers, exc_info)
+
+        def finish(nbytes: int) -> None:
+            route = environ.get("vdb.route", "unmatched")
+            observe_request(route, method, meta["status"], time.perf_counter() - start, nbytes)
+            if entry is not None:
+                self.sampler.end(entry, route, meta["status"])
+
+        try:
+            body = self.wsgi_app(environ, metered_start_response)
+        except BaseException:
+            finish(0)
+            raise
+        file_wrapper = environ.get("wsgi.file_wrapper")
+        if isinstance(file_wrapper, type) and isinstance(body, file_wrapper):
+            finish(meta["length"])
+            return body
+        return _MeteredBody(body, finish)
+
+
+def slow_requests() -> List[Dict[str, Any]]:
+    with _lock:
+        return list(_slow_requests)
+
+
+def _labels(**labels: Any) -> str:
+    parts = []
+    for key, value in labels.items():
+        escaped = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'{key}="{escaped}"')
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def render_prometheus() -> str:
+    """Prometheus text exposition of the pipeline and request metrics."""
+    with _lock:
+        runs_total = dict(_runs_total)
+        stage_totals = {k: dict(v) for k, v in _stage_totals.items()}
+        running = 1 if _current is not None else 0
+
+    lines = [
+        "# HELP vdb_pipeline_running Whether a map generation run is in progress.",
+        "# TYPE vdb_pipeline_running gauge",
+        f"vdb_pipeline_running {running}",
+        "# HELP vdb_pipeline_runs_total Finished map generation runs by status.",
+        "# TYPE vdb_pipeline_runs_total counter",
+    ]
+    for status, count in sorted(runs_total.items()):
+        lines.append(f"vdb_pipeline_runs_total{_labels(status=status)} {count}")
+
+    lines += [
+        "# HELP vdb_pipeline_stage_seconds Time spent per pipeline stage.",
+        "# TYPE vdb_pipeline_stage_seconds summary",
+    ]
+    for stage, t in sorted(stage_totals.items()):
+        lines.append(f"vdb_pipeline_stage_seconds_sum{_labels(stage=stage)} {t['seconds']:.3f}")
+        lines.append(f"vdb_pipeline_stage_seconds_count{_labels(stage=stage)} {t['count']}")
+
+    lines += [
+        "# HELP vdb_pipeline_stage_last_seconds Duration of each stage in the last finished run.",
+        "# TYPE vdb_pipeline_stage_last_seconds gauge",
+    ]
+    for stage, t in sorted(stage_totals.items()):
+        lines.append(f"vdb_pipeline_stage_last_seconds{_labels(stage=stage)} {t['last_seconds']:.3f}")
+
+    lines += [
+        "# HELP vdb_pipeline_stage_bytes_total Bytes written by each pipeline stage.",
+        "# TYPE vdb_pipeline_stage_bytes_total counter",
+    ]
+    for stage, t in sorted(stage_totals.items()):
+        lines.append(f"vdb_pipeline_stage_bytes_total{_labels(stage=stage)} {t['bytes']}")
+
+    lines += [
+        "# HELP vdb_pipeline_stage_peak_rss_bytes Peak RSS of the stage's subprocess in its last run.",
+        "# TYPE vdb_pipeline_stage_peak_rss_bytes gauge",
+    ]
+    for stage, t in sorted(stage_totals.items()):
+        if "peak_rss_bytes" in t:
+            lines.append(f"vdb_pipeline_stage_peak_rss_bytes{_labels(stage=stage)} {t['peak_rss_bytes']}")
+
+    with _lock:
+        request_stats = {k: {**v, "buckets": list(v["buckets"])} for k, v in _request_stats.items()}
+        request_status = dict(_request_status)
+
+    lines += [
+        "# HELP vdb_http_request_duration_seconds Request latency by route, until the response is sent.",
+        "# TYPE vdb_http_request_duration_seconds histogram",
+    ]
+    for (route, method), st in sorted(request_stats.items()):
+        cumulative = 0
+        for bound, n in zip(LATENCY_BUCKETS, st["buckets"]):
+            cumulative += n
+            lines.append(f"vdb_http_request_duration_seconds_bucket{_labels(route=route, method=method, le=bound)} {cumulative}")
+        lines.append(f"vdb_http_request_duration_seconds_bucket{_labels(route=route, method=method, le='+Inf')} {st['count']}")
+        lines.append(f"vdb_http_request_duration_seconds_sum{_labels(route=route, method=method)} {st['sum']:.6f}")
+        lines.append(f"vdb_http_request_duration_seconds_count{_labels(route=route, method=method)} {st['count']}")
+
+    lines += [
+        "# HELP vdb_http_response_bytes_total Response body bytes by route.",
+        "# TYPE vdb_http_response_bytes_total counter",
+    ]
+    for (route, method), st in sorted(request_stats.items()):
+        lines.append(f"vdb_http_response_bytes_total{_labels(route=route, method=method)} {st['bytes']}")
+
+    lines += [
+        "# HELP vdb_http_requests_total Requests by route and status code.",
+        "# TYPE vdb_http_requests_total counter",
+    ]
+    for (route, method, status), n in sorted(request_status.items()):
+        lines.append(f"vdb_http_requests_total{_labels(route=route, method=method, status=status)} {n}")
+
+    rss = self_rss_bytes()
+    if rss is not None:
+        lines += [
+            "# HELP vdb_process_peak_rss_bytes Peak RSS of the web process.",
+            "# TYPE vdb_process_peak_rss_bytes gauge",
+            f"vdb_process_peak_rss_bytes {rss}",
+        ]
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Canonical district/thana names: one index for spelling lookups, typeahead and bulk checks.
+
+Canonical names are the spellings of region_swapped_data_original.csv, which the
+app, the generator and the R scripts all join on. Every other spelling is an alias
+of a canonical thana:
+    District_Thana_Mapping.csv   "IN CODE" names (the bangladesh package / GeoJSON) -> "IN CSV" names
+    districsts_thana_list.csv    and the thanas.geojson properties (the map's spellings)
+    DISTRICT_ALIASES / THANA_ALIASES   hand-kept fixes (the R case_when lists, the app's old thana corrections)
+Names are compared by name_key() (lowercase, letters and digits only, the same
+squish the check_*.R scripts use), so "Bhola hat", "Bholahat" and "BHOLAHAT" are one key.
+Map names no alias reaches become canonical themselves.
+
+Lookups are dict hits. search() is prefix-first over a sorted key list (bisect;
+every word of a name is also a prefix entry, so "matlab" finds "Uttarmatlab" and
+"Matlab Uttar") and falls back to trigram similarity for typos; both stay well
+under a millisecond for ~550 thanas. check_rows() reports every unmatched row of a
+file in one pass, with suggestions.
+
+    python name_index.py                       check region_swapped_data.csv
+    python name_index.py FILE.csv              check another District/Thana CSV
+    python name_index.py --search "sibgan"     try the typeahead
+"""
+
+import argparse
+import bisect
+import csv
+import re
+import sys
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from geojson_generator import load_geojson
+
+# District spelling fixes between the bangladesh package and the CSVs (generate_geojson.R)
+DISTRICT_ALIASES = {
+    "Brahamanbaria": "Brahmanbaria",
+    "Jhalokati": "Jhalakati",
+    "Khagrachhari": "Khagrachari",
+    "Nawabganj": "Chapainawabganj",
+    "Netrakona": "Netrokona",
+}
+# (district or "" for any district, alias, canonical thana)
+THANA_ALIASES = [
+    ("Jessore", "Jessore Sadar", "Kotwali"),
+    ("", "Dualatpur", "Daulatpur"),
+    ("", "Nowabganj", "Nawabganj"),
+]
+# Files whose changes rebuild the index. thanas.geojson is read too but left out:
+# every save rewrites it, and a save never changes a thana's name.
+SOURCE_FILES = ["region_swapped_data_original.csv", "District_Thana_Mapping.csv",
+                "districsts_thana_list.csv"]
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+
+def name_key(name: str) -> str:
+    """Comparison key: lowercase with everything but letters and digits removed."""
+    return _NON_ALNUM.sub("", (name or "").lower())
+
+
+def _trigrams(key: str) -> Set[str]:
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class NameIndex:
+    """Canonical thanas with their aliases; see the module docstring."""
+
+    def __init__(self) -> None:
+        self.thanas: List[Tuple[str, str]] = []          # canonical (district, thana)
+        self.aliases: List[Set[str]] = []                 # other spellings seen per thana
+        self.districts: Dict[str, str] = {}               # district key -> canonical district
+        self._exact: Dict[Tuple[str, str], int] = {}      # (district key, thana key) -> thana
+        self._by_thana: Dict[str, List[int]] = defaultdict(list)  # canonical thana key -> thanas
+        self._prefix: List[Tuple[str, int]] = []
+        self._trigram_postings: Dict[str, Set[Tuple[str, int]]] = defaultdict(set)
+        self._trigram_counts: Dict[Tuple[str, int], int] = {}
+
+    # ── building ──────────────────────────────────────────────────────────
+    def add_district(self, name: str, canonical: Optional[str] = None) -> str:
+        canonical = canonical or self.districts.get(name_key(name)) or name.strip()
+        self.districts.setdefault(name_key(name), canonical)
+        self.districts.setdefault(name_key(canonical), canonical)
+        return self.districts[name_key(name)]
+
+    def add_thana(self, district: str, thana: str) -> Optional[int]:
+        """Register a canonical thana (no-op if the key already names one); returns its position."""
+        district, thana = self.add_district(district), thana.strip()
+        if not thana:
+            return None
+        key = (name_key(district), name_key(thana))
+        if key not in self._exact:
+            self._exact[key] = len(self.thanas)
+            self._by_thana[key[1]].append(len(self.thanas))
+            self.thanas.append((district, thana))
+            self.aliases.append(set())
+        return self._exact[key]
+
+    def add_alias(self, district: str, alias: str, target: int) -> None:
+        alias = alias.strip()
+        if not alias:
+            return
+        key = (name_key(self.add_district(district)), name_key(alias))
+        if self._exact.setdefault(key, target) == target and alias != self.thanas[target][1]:
+            self.aliases[target].add(alias)
+
+    def finish(self) -> "NameIndex":
+        """Build the prefix and trigram tables once all names are in."""
+        entries = set()
+        for n, (district, thana) in enumerate(self.thanas):
+            for name in {thana} | self.aliases[n]:
+                words = [w for w in re.split(r"[\s\-/()]+", name) if w]
+                for i in range(len(words)):
+                    entries.add((name_key("".join(words[i:])), n))
+                key = name_key(name)
+                entries.add((key, n))
+                grams = _trigrams(key)
+                self._trigram_counts[(key, n)] = len(grams)
+                for gram in grams:
+                    self._trigram_postings[gram].add((key, n))
+        self._prefix = sorted(e for e in entries if e[0])
+        return self
+
+    # ── lookups ───────────────────────────────────────────────────────────
+    def canonical_district(self, name: str) -> Optional[str]:
+        return self.districts.get(name_key(name))
+
+    def resolve(self, district: str, thana: str) -> Optional[Tuple[str, str]]:
+        """Canonical (district, thana) for any known spelling of the pair, or None."""
+        dkey = name_key(self.canonical_district(district) or district)
+        n = self._exact.get((dkey, name_key(thana)))
+        return self.thanas[n] if n is not None else None
+
+    def canonical_thana(self, thana: str, district: str = "") -> str:
+        """
+        Canonical spelling of a thana name. Prefers the thana in `district`; a thana
+        moved to another district keeps its own name, matched against canonical
+        names only (an alias holds only in its own district: Khilkhet is an alias of
+        Kotwali in Dhaka, not in Gazipur). Unknown names are returned unchanged.
+        """
+        resolved = self.resolve(district, thana)
+        if resolved:
+            return resolved[1]
+        origin = self.moved_from(thana)
+        return origin[1] if origin else thana.strip()
+
+    def moved_from(self, thana: str) -> Optional[Tuple[str, str]]:
+        """Canonical (district, thana) of the first thana whose canonical name matches, or None."""
+        matches = self._by_thana.get(name_key(thana))
+        return self.thanas[matches[0]] if matches else None
+
+    def record(self, n: int, score: float = 1.0) -> Dict[str, Any]:
+        district, thana = self.thanas[n]
+        return {"district": district, "thana": thana, "aliases": sorted(self.aliases[n]), "score": round(score, 3)}
+
+    def search(self, query: str, district: str = "", limit: int = 10) -> List[Dict[str, Any]]:
+        """Typeahead: prefix matches first (whole names, then later words), then fuzzy ones."""
+        key = name_key(query)
+        if not key or limit <= 0:
+            return []
+        dkey = name_key(self.canonical_district(district) or district) if district else ""
+
+        def in_district(n: int) -> bool:
+            return not dkey or name_key(self.thanas[n][0]) == dkey
+
+        found: Dict[int, float] = {}
+        start = bisect.bisect_left(self._prefix, (key, -1))
+        for entry_key, n in self._prefix[start:]:
+            if not entry_key.startswith(key):
+                break
+            if n not in found and in_district(n):
+                # Whole-name prefixes rank above matches on a later word, shorter names first
+                full = any(name_key(name).startswith(key) for name in {self.thanas[n][1]} | self.aliases[n])
+                found[n] = (1.0 if full else 0.9) - len(entry_key) / 1000
+        if len(found) < limit:
+            grams = _trigrams(key)
+            shared: Dict[Tuple[str, int], int] = defaultdict(int)
+            for gram in grams:
+                for entry in self._trigram_postings.get(gram, ()):
+                    shared[entry] += 1
+            fuzzy: Dict[int, float] = {}
+            for (entry_key, n), common in shared.items():
+                if n in found or not in_district(n):
+                    continue
+                # Jaccard similarity of trigram sets, scaled to rank below every prefix hit
+                score = 0.8 * common / (len(grams) + self._trigram_counts[(entry_key, n)] - common)
+                if score >= 0.24 and score > fuzzy.get(n, 0.0):
+                    fuzzy[n] = score
+            found.update(fuzzy)
+        ranked = sorted(found.items(), key=lambda item: (-item[1], self.thanas[item[0]]))
+        return [self.record(n, score) for n, score in ranked[:limit]]
+
+    def check_rows(self, rows: Iterable[Tuple[str, str]], suggestions: int = 3) -> Dict[str, Any]:
+        """
+        Match (district, thana) rows in one pass. Returns counts, the rows that
+        needed an alias (with their canonical names), the rows naming a known thana
+        under another known district (moved thanas, as in region_swapped_data.csv)
+        and the unmatched rows with the closest canonical thanas.
+        """
+        total = 0
+        renamed: List[Dict[str, Any]] = []
+        moved: List[Dict[str, Any]] = []
+        unmatched: List[Dict[str, Any]] = []
+        for line, (district, thana) in enumerate(rows, start=1):
+            total += 1
+            resolved = self.resolve(district, thana)
+            origin = self.moved_from(thana) if resolved is None and self.canonical_district(district) else None
+            if origin:
+                moved.append({"row": line, "district": district, "thana": thana,
+                              "canonical_thana": origin[1], "original_district": origin[0]})
+            elif resolved is None:
+                unmatched.append({"row": line, "district": district, "thana": thana,
+                                  "known_district": self.canonical_district(district) is not None,
+                                  "suggestions": self.search(thana, limit=suggestions)})
+            elif resolved != (district.strip(), thana.strip()):
+                renamed.append({"row": line, "district": district, "thana": thana,
+                                "canonical_district": resolved[0], "canonical_thana": resolved[1]})
+        return {"rows": total, "matched": total - len(unmatched), "renamed": renamed,
+                "moved": moved, "unmatched": unmatched}
+
+
+def build_index(base_dir: Path) -> NameIndex:
+    """Build the index from the CSVs and thanas.geojson in base_dir (missing files are skipped)."""
+    index = NameIndex()
+    for alias, canonical in DISTRICT_ALIASES.items():
+        index.add_district(alias, canonical)
+
+    def read_csv(name: str) -> List[Dict[str, str]]:
+        path = base_dir / name
+        if not path.exists():
+            return []
+        with open(path, "r", encoding="utf-8-sig", newline="") as f:
+            return list(csv.DictReader(f))
+
+    # 1. Canonical spellings
+    for row in read_csv("region_swapped_data_original.csv"):
+        index.add_thana(row.get("District", ""), row.get("Thana", ""))
+
+    # 2. Hand-kept aliases, first so the mapping table's rows land on them ("" = every district)
+    for district, alias, canonical in THANA_ALIASES:
+        for n, (d, t) in enumerate(index.thanas):
+            if t == canonical and (not district or name_key(d) == name_key(index.add_district(district))):
+                index.add_alias(d, alias, n)
+
+    # 3. Mapping table: "IN CODE" names are aliases of "IN CSV" names
+    for row in read_csv("District_Thana_Mapping.csv"):
+        code_district, code_thana = row.get("District (IN CODE)", ""), row.get("Thana (IN CODE)", "")
+        csv_district, csv_thana = row.get("District (IN CSV)", ""), row.get("Upazila / Thana (IN CSV)", "")
+        if not code_district.strip() or not csv_district.strip():
+            continue
+        # The table's own "IN CSV" spellings drift too (Narshingdi), so keep whichever side is known
+        district = index.canonical_district(csv_district) or index.canonical_district(code_district) or csv_district
+        index.add_district(csv_district, index.add_district(district))
+        index.add_district(code_district, district)
+        resolved = index.resolve(district, csv_thana) or index.resolve(district, code_thana)
+        target = index.add_thana(*(resolved or (district, csv_thana)))
+        if target is not None:
+            index.add_alias(district, csv_thana, target)
+            index.add_alias(district, code_thana, target)
+
+    # 4. Map spellings: already known by key or alias, else canonical in their own right
+    map_names = [(row.get("district", ""), row.get("thana", "")) for row in read_csv("districsts_thana_list.csv")]
+    features = load_geojson(base_dir / "geojson" / "thanas.geojson").get("features", [])
+    map_names += [((f.get("properties") or {}).get("district", ""), (f.get("properties") or {}).get("thana", ""))
+                  for f in features]
+    for district, thana in map_names:
+        if thana and index.resolve(district, thana) is None:
+            index.add_thana(district, thana)
+    return index.finish()
+
+
+_lock = threading.Lock()
+_cached: Dict[Path, Tuple[Tuple, NameIndex]] = {}
+
+
+def load_name_index(base_dir: Path) -> NameIndex:
+    """The index for base_dir, rebuilt only when one of its source files changes."""
+    signature = []
+    for name in SOURCE_FILES:
+        try:
+            signature.append((base_dir / name).stat().st_mtime_ns)
+        except OSError:
+            signature.append(None)
+    with _lock:
+        cached = _cached.get(base_dir)
+        if cached is None or cached[0] != tuple(signature):
+            cached = _cached[base_dir] = (tuple(signature), build_index(base_dir))
+        return cached[1]
+
+
+def read_name_rows(lines: Iterable[str]) -> List[Tuple[str, str]]:
+    """(district, thana) pairs from a CSV with District and Thana (or Upazila) columns."""
+    reader = csv.reader(lines)
+    header = [h.strip().lower() for h in next(reader, [])]
+    district_col = next((i for i, h in enumerate(header) if h.startswith("district")), None)
+    thana_col = next((i for i, h in enumerate(header) if h.startswith(("thana", "upazila"))), None)
+    if district_col is None or thana_col is None:
+        raise ValueError("CSV needs District and Thana columns")
+    return [(row[district_col], row[thana_col]) for row in reader if len(row) > max(district_col, thana_col)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check district/thana names against the canonical index")
+    parser.add_argument("csv", nargs="?", default="region_swapped_data.csv", help="CSV with District and Thana columns")
+    parser.add_argument("--search", help="run a typeahead query instead")
+    args = parser.parse_args()
+    base_dir = Path(__file__).resolve().parent
+
+    started = time.perf_counter()
+    index = load_name_index(base_dir)
+    print(f"✓ Index: {len(index.thanas)} thanas, {sum(map(len, index.aliases))} aliases, "
+          f"{len(set(index.districts.values()))} districts ({(time.perf_counter() - started) * 1000:.0f} ms)")
+
+    if args.search:
+        started = time.perf_counter()
+        results = index.search(args.search)
+        print(f"  {len(results)} results in {(time.perf_counter() - started) * 1000:.2f} ms")
+        for r in results:
+            print(f"  {r['score']:.2f}  {r['thana']} ({r['district']})" + (f"  aka {', '.join(r['aliases'])}" if r["aliases"] else ""))
+        return
+
+    path = Path(args.csv)
+    with open(path if path.is_absolute() else base_dir / path, "r", encoding="utf-8-sig", newline="") as f:
+        report = index.check_rows(read_name_rows(f))
+    print(f"✓ {report['matched']}/{report['rows']} rows matched, {len(report['renamed'])} via an alias, "
+          f"{len(report['moved'])} moved from another district")
+    for r in report["renamed"]:
+        print(f"  ~ row {r['row']}: {r['thana']} ({r['district']}) -> {r['canonical_thana']} ({r['canonical_district']})")
+    for r in report["moved"]:
+        print(f"  → row {r['row']}: {r['canonical_thana']} ({r['original_district']} -> {r['district']})")
+    for r in report["unmatched"]:
+        hint = ", ".join(f"{s['thana']} ({s['district']})" for s in r["suggestions"]) or "no suggestions"
+        print(f"  ✗ row {r['row']}: {r['thana']} ({r['district']}) — did you mean: {hint}")
+    sys.exit(1 if report["unmatched"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Manifest of rendered map outputs (outputs/manifest.json).
+
+Published by the render pipeline when a run finishes so listing endpoints can
+serve it from memory instead of globbing and stat()ing outputs/ per request.
+Each entry records name, size, SHA-256, the assignment version it was rendered
+for and its render time; comparing an entry's assignment_version with the current
+one tells clients exactly which maps are stale.
+"""
+
+import hashlib
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+
+MANIFEST_NAME = "manifest.json"
+OUTPUT_PATTERNS = ("*.pdf", "*.png", "districts/*.pdf")
+
+
+def file_sha256(path: Path, chunk_size: int = 1024 * 1024) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def iter_output_files(output_dir: Path) -> Iterator[Path]:
+    for pattern in OUTPUT_PATTERNS:
+        yield from sorted(output_dir.glob(pattern))
+
+
+def load_manifest(output_dir: Path) -> Optional[Dict[str, Any]]:
+    path = output_dir / MANIFEST_NAME
+    if not path.exists():
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def build_manifest(output_dir: Path, assignment_version: Optional[str],
+                   previous: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Describe every output file. Files whose size and mtime match the previous
+    manifest keep their hash and assignment version (they were not re-rendered);
+    everything else is hashed and stamped with assignment_version.
+    """
+    old_entries = {e["name"]: e for e in (previous or {}).get("files", [])}
+    files = []
+    for path in iter_output_files(output_dir):
+        st = path.stat()
+        name = path.relative_to(output_dir).as_posix()
+        old = old_entries.get(name)
+        if old and old.get("size") == st.st_size and old.get("mtime_ns") == st.st_mtime_ns:
+            files.append(old)
+            continue
+        files.append({
+            "name": name,
+            "size": st.st_size,
+            "sha256": file_sha256(path),
+            "mtime_ns": st.st_mtime_ns,
+            "rendered_at": datetime.fromtimestamp(st.st_mtime).isoformat(timespec="seconds"),
+            "assignment_version": assignment_version,
+        })
+
+    etag = hashlib.sha1("".join(f"{f['name']}:{f['sha256']}:{f['assignment_version']};"
+                                for f in files).encode("utf-8")).hexdigest()[:16]
+    return {
+        "assignment_version": assignment_version,
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+        "etag": etag,
+        "count": len(files),
+        "files": files,
+    }
+
+
+def write_manifest(output_dir: Path, assignment_version: Optional[str]) -> Dict[str, Any]:
+    """Rebuild the manifest (reusing unchanged entries) and replace it atomically."""
+    manifest = build_manifest(output_dir, assignment_version, load_manifest(output_dir))
+    tmp = output_dir / (MANIFEST_NAME + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False)
+    os.replace(tmp, output_dir / MANIFEST_NAME)
+    return manifest
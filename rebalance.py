@@ -0,0 +1,376 @@
+"""
+Region rebalancing: propose thana moves that bring regions (or districts) to target sizes.
+
+The thanas form a graph (region_stats.thana_adjacency: thanas sharing a boundary
+edge are neighbours). Each thana carries a weight (1 for "count", its area for
+"area", or a user-supplied figure for "weight") and each group has a target; the
+objective is the sum over groups of ((load - target) / target)².
+
+Local search moves one boundary thana at a time into a neighbouring group. A
+candidate move only touches two group loads, so its objective change is O(1) and
+all candidates of a thana are scored in O(degree). Contiguity is kept at both
+levels: a thana can only join a group it borders, and only leaves its group if its
+same-group and same-district (same-region when balancing districts) neighbours
+stay connected (checked among those neighbours first, with a BFS through the group
+only when that local test fails). A thana moved to another region joins the
+neighbouring district it shares most boundary with. The result is a diff against
+the current assignment; nothing is saved.
+"""
+
+import csv
+import random
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from geojson_generator import load_csv_mappings, load_geojson
+from region_stats import ThanaKey, resolve_current_assignment, thana_adjacency
+from spatial_index import geometry_signature
+
+METRICS = ("count", "area", "weight")
+LEVELS = ("region", "district")
+DEFAULT_ITERATIONS = 20000
+MIN_GAIN = 1e-12
+
+
+class Partition:
+    """
+    Thana -> group assignment with incrementally maintained group loads.
+
+    `linked_of` optionally assigns each thana to a second grouping that must stay
+    contiguous too: the districts when balancing regions, the regions when balancing
+    districts. A moved thana takes the linked group of its neighbour in the new
+    group it shares most boundary with (the district it joins, or that district's
+    region), so the linked group it joins stays connected as well.
+    """
+
+    def __init__(self, neighbours: List[Dict[int, float]], weights: Sequence[float],
+                 group_of: List[int], targets: Sequence[float],
+                 linked_of: Optional[List[int]] = None):
+        self.neighbours = neighbours
+        self.weights = list(weights)
+        self.group_of = list(group_of)
+        self.targets = [max(t, 1e-9) for t in targets]
+        self.loads = [0.0] * len(self.targets)
+        self.sizes = [0] * len(self.targets)
+        for unit, group in enumerate(self.group_of):
+            self.loads[group] += self.weights[unit]
+            self.sizes[group] += 1
+        self.linked_of = list(linked_of) if linked_of is not None else None
+        self.linked_sizes: Dict[int, int] = {}
+        for linked in self.linked_of or ():
+            self.linked_sizes[linked] = self.linked_sizes.get(linked, 0) + 1
+
+    def _cost(self, group: int, load: float) -> float:
+        return ((load - self.targets[group]) / self.targets[group]) ** 2
+
+    def objective(self) -> float:
+        return sum(self._cost(g, load) for g, load in enumerate(self.loads))
+
+    def move_delta(self, unit: int, to_group: int) -> float:
+        """Objective change of moving `unit` to `to_group` (O(1))."""
+        a, w = self.group_of[unit], self.weights[unit]
+        return (self._cost(a, self.loads[a] - w) - self._cost(a, self.loads[a])
+                + self._cost(to_group, self.loads[to_group] + w) - self._cost(to_group, self.loads[to_group]))
+
+    def best_move(self, unit: int) -> Optional[Tuple[float, int]]:
+        """(delta, group) of the best neighbouring group for `unit`, or None (O(degree))."""
+        own = self.group_of[unit]
+        border: Dict[int, float] = {}
+        for v, length in self.neighbours[unit].items():
+            g = self.group_of[v]
+            if g != own:
+                border[g] = border.get(g, 0.0) + length
+        best = None
+        for g, length in border.items():
+            # Longer shared boundary breaks ties, which keeps groups compact
+            candidate = (self.move_delta(unit, g), -length, g)
+            if best is None or candidate < best:
+                best = candidate
+        return (best[0], best[2]) if best else None
+
+    def can_leave(self, unit: int) -> bool:
+        """Whether `unit` may leave its group: neither its group nor its linked group empties or splits."""
+        if self.sizes[self.group_of[unit]] <= 1:
+            return False
+        if self.linked_of is not None and self.linked_sizes[self.linked_of[unit]] <= 1:
+            return False
+        return self.stays_connected(unit)
+
+    def stays_connected(self, unit: int) -> bool:
+        """Whether `unit`'s same-group (and same-linked-group) neighbours remain connected without it."""
+        if not self._neighbours_connected(unit, self.group_of):
+            return False
+        return self.linked_of is None or self._neighbours_connected(unit, self.linked_of)
+
+    def _neighbours_connected(self, unit: int, member_of: List[int]) -> bool:
+        """Checked among the neighbours first, with a BFS through the group only when that fails."""
+        group = member_of[unit]
+        same = [v for v in self.neighbours[unit] if member_of[v] == group]
+        if len(same) <= 1:
+            return True
+        if self._connected(same, set(same), unit, member_of):
+            return True
+        return self._connected(same, None, unit, member_of)
+
+    def _connected(self, nodes: List[int], within: Optional[set], removed: int, member_of: List[int]) -> bool:
+        """BFS from nodes[0] inside `within` (or the whole group) until every node is reached."""
+        group = member_of[removed]
+        wanted = set(nodes)
+        wanted.discard(nodes[0])
+        seen = {nodes[0], removed}
+        queue = deque([nodes[0]])
+        while queue and wanted:
+            for v in self.neighbours[queue.popleft()]:
+                if v in seen or member_of[v] != group or (within is not None and v not in within):
+                    continue
+                seen.add(v)
+                wanted.discard(v)
+                queue.append(v)
+        return not wanted
+
+    def linked_target(self, unit: int, to_group: int) -> Optional[int]:
+        """The linked group `unit` would belong to in `to_group`."""
+        if self.linked_of is None:
+            return None
+        inside = [(length, v) for v, length in self.neighbours[unit].items() if self.group_of[v] == to_group]
+        return self.linked_of[max(inside)[1]] if inside else self.linked_of[unit]
+
+    def apply(self, unit: int, to_group: int) -> None:
+        if self.linked_of is not None:
+            linked = self.linked_target(unit, to_group)
+            self.linked_sizes[self.linked_of[unit]] -= 1
+            self.linked_sizes[linked] = self.linked_sizes.get(linked, 0) + 1
+            self.linked_of[unit] = linked
+        a, w = self.group_of[unit], self.weights[unit]
+        self.loads[a] -= w
+        self.sizes[a] -= 1
+        self.loads[to_group] += w
+        self.sizes[to_group] += 1
+        self.group_of[unit] = to_group
+
+
+def local_search(partition: Partition, iterations: int = DEFAULT_ITERATIONS,
+                 max_moves: Optional[int] = None, seed: int = 0,
+                 time_limit: float = 10.0) -> Dict[str, int]:
+    """
+    Improve `partition` in place with first-improvement sweeps over the thanas in
+    random order, until a sweep finds nothing, `iterations` candidates have been
+    evaluated or `time_limit` seconds pass. With `max_moves`, at most that many
+    thanas end up moved and each step takes the best move of a full sweep instead,
+    so a small budget goes to the moves that help most.
+    """
+    if max_moves is not None:
+        return _steepest_search(partition, iterations, max_moves, time_limit)
+    rng = random.Random(seed)
+    order = [u for u in range(len(partition.group_of)) if partition.neighbours[u]]
+    evaluated = applied = 0
+    deadline = time.perf_counter() + time_limit
+    improved = True
+    while improved and evaluated < iterations and time.perf_counter() < deadline:
+        improved = False
+        rng.shuffle(order)
+        for unit in order:
+            if evaluated >= iterations:
+                break
+            evaluated += 1
+            move = partition.best_move(unit)
+            if move is None or move[0] > -MIN_GAIN:
+                continue
+            if not partition.can_leave(unit):
+                continue
+            partition.apply(unit, move[1])
+            applied += 1
+            improved = True
+    return {"iterations": evaluated, "moves_applied": applied}
+
+
+def _steepest_search(partition: Partition, iterations: int, max_moves: int, time_limit: float) -> Dict[str, int]:
+    start = list(partition.group_of)
+    changed = set()
+    order = [u for u in range(len(start)) if partition.neighbours[u]]
+    evaluated = applied = 0
+    deadline = time.perf_counter() + time_limit
+    while evaluated < iterations and time.perf_counter() < deadline:
+        candidates = []
+        for unit in order:
+            evaluated += 1
+            if partition.sizes[partition.group_of[unit]] <= 1:
+                continue
+            move = partition.best_move(unit)
+            if move is None or move[0] > -MIN_GAIN:
+                continue
+            if unit not in changed and len(changed) >= max_moves:
+                continue
+            candidates.append((move[0], unit, move[1]))
+        candidates.sort()
+        chosen = next(((unit, group) for _, unit, group in candidates if partition.can_leave(unit)), None)
+        if chosen is None:
+            break
+        unit, group = chosen
+        partition.apply(unit, group)
+        applied += 1
+        if group == start[unit]:
+            changed.discard(unit)
+        else:
+            changed.add(unit)
+    return {"iterations": evaluated, "moves_applied": applied}
+
+
+_graph_lock = threading.Lock()
+_graph_cache: Dict[str, Tuple[List[ThanaKey], List[float], List[Dict[int, float]]]] = {}
+
+
+def thana_graph(features: List[Dict[str, Any]]) -> Tuple[List[ThanaKey], List[float], List[Dict[int, float]]]:
+    """thana_adjacency() for the current geometry, computed once per geometry signature."""
+    signature = geometry_signature(features)
+    with _graph_lock:
+        graph = _graph_cache.get(signature)
+        if graph is None:
+            _graph_cache.clear()
+            graph = _graph_cache[signature] = thana_adjacency(features)
+        return graph
+
+
+def placements(features: List[Dict[str, Any]], keys: List[ThanaKey],
+               assignment: Dict[ThanaKey, Tuple[str, str]]) -> List[Tuple[str, str]]:
+    """Current (region, district) of each graph node."""
+    # Thanas missing from the CSV keep the region written into their feature (as in compute_stats)
+    feature_region = {}
+    for feature in features:
+        props = feature.get("properties") or {}
+        feature_region[(props.get("district", ""), props.get("thana", ""))] = props.get("region", "")
+    return [assignment.get(key, (feature_region.get(key, ""), key[0])) for key in keys]
+
+
+def district_regions(placed: List[Tuple[str, str]]) -> Dict[str, str]:
+    """{district -> region} from node placements (a district's first thana decides)."""
+    district_region: Dict[str, str] = {}
+    for region, district in placed:
+        district_region.setdefault(district, region)
+    return district_region
+
+
+def resolve_targets(groups: List[str], loads: List[float], targets: Optional[Dict[str, float]]) -> List[float]:
+    """Explicit targets where given; the rest share what is left of the total equally."""
+    targets = targets or {}
+    unknown = set(targets) - set(groups)
+    if unknown:
+        raise ValueError(f"Unknown group(s) in targets: {', '.join(sorted(unknown))}")
+    total = sum(loads)
+    fixed = {g: float(t) for g, t in targets.items()}
+    if any(t <= 0 for t in fixed.values()):
+        raise ValueError("Targets must be positive")
+    rest = [g for g in groups if g not in fixed]
+    share = (total - sum(fixed.values())) / len(rest) if rest else 0.0
+    if rest and share <= 0:
+        raise ValueError("Explicit targets leave nothing for the other groups")
+    return [fixed.get(g, share) for g in groups]
+
+
+def propose(features: List[Dict[str, Any]], assignment: Dict[ThanaKey, Tuple[str, str]],
+            metric: str = "count", level: str = "region", targets: Optional[Dict[str, float]] = None,
+            weights: Optional[Dict[ThanaKey, float]] = None, iterations: int = DEFAULT_ITERATIONS,
+            max_moves: Optional[int] = None, seed: int = 0) -> Dict[str, Any]:
+    """
+    Propose thana moves balancing `metric` across regions or districts.
+
+    features:   thana features (original 'district'/'thana' properties)
+    assignment: {(district, thana) -> (region, district)} as from resolve_current_assignment
+    weights:    per-thana figures for metric="weight" (missing thanas weigh 0)
+    """
+    if metric not in METRICS:
+        raise ValueError(f"metric must be one of {', '.join(METRICS)}")
+    if level not in LEVELS:
+        raise ValueError(f"level must be one of {', '.join(LEVELS)}")
+    if metric == "weight" and not weights:
+        raise ValueError("metric 'weight' needs per-thana weights")
+    started = time.perf_counter()
+
+    keys, areas, neighbours = thana_graph(features)
+    placed = placements(features, keys, assignment)
+
+    names = sorted({p[0] if level == "region" else p[1] for p in placed})
+    group_index = {name: n for n, name in enumerate(names)}
+    group_of = [group_index[p[0] if level == "region" else p[1]] for p in placed]
+    if metric == "count":
+        unit_weights = [1.0] * len(keys)
+    elif metric == "area":
+        unit_weights = areas
+    else:
+        # Weights may name a moved thana by its original or its current district
+        unit_weights = [float(weights.get(key, weights.get((placed[n][1], key[1]), 0.0)))
+                        for n, key in enumerate(keys)]
+
+    loads = [0.0] * len(names)
+    for unit, group in enumerate(group_of):
+        loads[group] += unit_weights[unit]
+    # The other level must stay contiguous too: districts when balancing regions
+    # (a moved thana joins a neighbouring district), regions when balancing districts
+    linked_names = sorted({p[1] if level == "region" else p[0] for p in placed})
+    linked_index = {name: n for n, name in enumerate(linked_names)}
+    linked_of = [linked_index[p[1] if level == "region" else p[0]] for p in placed]
+    partition = Partition(neighbours, unit_weights, group_of, resolve_targets(names, loads, targets), linked_of)
+    before = partition.objective()
+    search = local_search(partition, iterations, max_moves, seed)
+
+    moves = []
+    for unit, key in enumerate(keys):
+        if partition.group_of[unit] == group_of[unit]:
+            continue
+        from_region, from_district = placed[unit]
+        target = names[partition.group_of[unit]]
+        linked = linked_names[partition.linked_of[unit]]
+        to_region, to_district = (target, linked) if level == "region" else (linked, target)
+        moves.append({"district": key[0], "thana": key[1],
+                      "from_region": from_region, "from_district": from_district,
+                      "to_region": to_region, "to_district": to_district})
+
+    groups = {name: {"target": round(partition.targets[g], 2), "before": round(loads[g], 2),
+                     "after": round(partition.loads[g], 2)} for g, name in enumerate(names)}
+    return dict(search, metric=metric, level=level, objective_before=round(before, 6),
+                objective_after=round(partition.objective(), 6), moves=moves, groups=groups,
+                elapsed_ms=round((time.perf_counter() - started) * 1000, 1))
+
+
+def read_weights_csv(lines: Iterable[str], weight_col: Optional[str] = None) -> Dict[ThanaKey, float]:
+    """{(district, thana) -> weight} from a CSV with District, Thana and a weight column."""
+    reader = csv.reader(lines)
+    header = [h.strip() for h in next(reader, [])]
+    lowered = [h.lower() for h in header]
+    try:
+        district_col, thana_col = lowered.index("district"), lowered.index("thana")
+    except ValueError:
+        raise ValueError("Weights CSV needs District and Thana columns")
+    wanted = (weight_col or "weight").lower()
+    if wanted not in lowered:
+        raise ValueError(f"Weights CSV has no '{weight_col or 'Weight'}' column")
+    value_col = lowered.index(wanted)
+
+    weights: Dict[ThanaKey, float] = {}
+    for line_no, row in enumerate(reader, start=2):
+        if len(row) <= max(district_col, thana_col, value_col) or not row[value_col].strip():
+            continue
+        try:
+            weights[(row[district_col].strip(), row[thana_col].strip())] = float(row[value_col])
+        except ValueError:
+            raise ValueError(f"Line {line_no}: '{row[value_col]}' is not a number")
+    return weights
+
+
+def load_current(base_dir: Path) -> Tuple[List[Dict[str, Any]], Dict[ThanaKey, Tuple[str, str]]]:
+    """Thana features and the saved {(district, thana) -> (region, district)} assignment."""
+    features = load_geojson(base_dir / "geojson" / "thanas.geojson").get("features", [])
+    if not features:
+        raise FileNotFoundError("thanas.geojson not found")
+    _, current = load_csv_mappings(base_dir / "region_swapped_data.csv")
+    original_csv = base_dir / "region_swapped_data_original.csv"
+    original = load_csv_mappings(original_csv)[1] if original_csv.exists() else current
+    return features, resolve_current_assignment(current, original)
+
+
+def propose_for_csv(base_dir: Path, **options: Any) -> Dict[str, Any]:
+    """propose() for thanas.geojson and the saved assignment in region_swapped_data.csv."""
+    return propose(*load_current(base_dir), **options)
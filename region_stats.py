@@ -0,0 +1,259 @@
+"""
+Per-region and per-district aggregate statistics for the current assignment.
+
+Figures: thana count, area (km²), perimeter (km), Polsby-Popper compactness
+(4πA/P², 1.0 for a circle) and the number of thanas moved from the original CSV.
+
+Thana geometry never changes, so each thana's area and boundary edges are
+computed once and kept in a module-level cache. A group's perimeter is the total
+length of edges that appear an odd number of times among its members (edges shared
+by two member thanas cancel out). Group results are cached by membership, so after
+a move only the regions/districts that gained or lost a thana are recomputed.
+"""
+
+import hashlib
+import math
+import threading
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from geometry import geometry_area_km2, iter_polygons, segment_length_km
+
+# Vertices are rounded to ~1 cm before matching shared edges between thanas.
+EDGE_PRECISION = 7
+
+ThanaKey = Tuple[str, str]  # (district, thana) as they appear in thanas.geojson
+
+
+class _ThanaMetrics:
+    __slots__ = ("area_km2", "edges")
+
+    def __init__(self, area_km2: float, edges: Dict[Tuple, float]):
+        self.area_km2 = area_km2
+        self.edges = edges
+
+
+_lock = threading.Lock()
+_thana_cache: Dict[Tuple, _ThanaMetrics] = {}
+_group_cache: Dict[Tuple[str, str, FrozenSet], Dict[str, Any]] = {}
+_stats_by_version: Dict[str, Dict[str, Any]] = {}
+_MAX_CACHED_VERSIONS = 8
+_MAX_CACHED_GROUPS = 2000
+
+
+def assignment_version(thana_to_info: Dict[Tuple[str, str], str]) -> str:
+    """Short stable hash of a {(district, thana) -> region} assignment."""
+    digest = hashlib.sha1()
+    for (district, thana), region in sorted(thana_to_info.items()):
+        digest.update(f"{region}\x1f{district}\x1f{thana}\x1e".encode("utf-8"))
+    return digest.hexdigest()[:12]
+
+
+def _geometry_fingerprint(geometry: Dict[str, Any]) -> Tuple:
+    """
+    Cheap identity for a thana geometry: vertex count plus the second and middle
+    vertex of the first and last outer rings. (A ring's first and last vertex are
+    the same point, and neighbouring thanas can start at the same vertex with the
+    same count, e.g. Motijheel and Sutrapur.)
+    """
+    polygons = list(iter_polygons(geometry))
+    count = sum(len(ring) for polygon in polygons for ring in polygon)
+
+    def sample(polygon: List) -> Tuple:
+        ring = polygon[0] if polygon else []
+        return tuple(tuple(pt) for pt in ring[1:2] + ring[len(ring) // 2:len(ring) // 2 + 1])
+
+    return (count, sample(polygons[0]), sample(polygons[-1])) if polygons else (count,)
+
+
+def _compute_thana_metrics(geometry: Dict[str, Any]) -> _ThanaMetrics:
+    edges: Dict[Tuple, float] = {}
+    for polygon in iter_polygons(geometry):
+        for ring in polygon:
+            for i in range(1, len(ring)):
+                a = (round(ring[i - 1][0], EDGE_PRECISION), round(ring[i - 1][1], EDGE_PRECISION))
+                b = (round(ring[i][0], EDGE_PRECISION), round(ring[i][1], EDGE_PRECISION))
+                if a == b:
+                    continue
+                key = (a, b) if a < b else (b, a)
+                if key in edges:
+                    # Edge repeated inside one thana (e.g. touching parts) -> interior
+                    del edges[key]
+                else:
+                    edges[key] = segment_length_km(a, b)
+    return _ThanaMetrics(geometry_area_km2(geometry), edges)
+
+
+def _thana_metrics(geometry: Dict[str, Any]) -> Tuple[Tuple, _ThanaMetrics]:
+    key = _geometry_fingerprint(geometry)
+    metrics = _thana_cache.get(key)
+    if metrics is None:
+        metrics = _compute_thana_metrics(geometry)
+        _thana_cache[key] = metrics
+    return key, metrics
+
+
+def export_thana_metrics() -> List[Tuple[Tuple, float, Dict[Tuple, float]]]:
+    """Cached per-thana (fingerprint, area, boundary edges) as plain tuples, for startup_cache."""
+    with _lock:
+        return [(key, m.area_km2, m.edges) for key, m in _thana_cache.items()]
+
+
+def import_thana_metrics(entries: Iterable[Tuple[Tuple, float, Dict[Tuple, float]]]) -> int:
+    """Seed the per-thana cache from export_thana_metrics() output; returns the number of entries."""
+    count = 0
+    with _lock:
+        for key, area_km2, edges in entries:
+            _thana_cache[tuple(key)] = _ThanaMetrics(area_km2, edges)
+            count += 1
+    return count
+
+
+def thana_adjacency(features: Iterable[Dict[str, Any]]) -> Tuple[List[ThanaKey], List[float], List[Dict[int, float]]]:
+    """
+    Thana adjacency graph from the cached boundary edges: thanas sharing an edge are
+    neighbours. Returns the (district, thana) keys in feature order, each thana's area
+    (km²) and, per thana, {neighbour position -> shared boundary length in km}.
+    Duplicated features of one thana are merged into a single node.
+    """
+    keys: List[ThanaKey] = []
+    areas: List[float] = []
+    position: Dict[ThanaKey, int] = {}
+    owners: Dict[Tuple, Tuple[float, List[int]]] = {}
+    with _lock:
+        for feature in features:
+            props = feature.get("properties") or {}
+            key = (props.get("district", ""), props.get("thana", ""))
+            _, metrics = _thana_metrics(feature.get("geometry") or {})
+            n = position.get(key)
+            if n is None:
+                n = position[key] = len(keys)
+                keys.append(key)
+                areas.append(metrics.area_km2)
+            for edge, length in metrics.edges.items():
+                entry = owners.setdefault(edge, (length, []))
+                if n not in entry[1]:
+                    entry[1].append(n)
+
+    neighbours: List[Dict[int, float]] = [{} for _ in keys]
+    for length, nodes in owners.values():
+        for i in range(len(nodes)):
+            for j in range(i + 1, len(nodes)):
+                a, b = nodes[i], nodes[j]
+                neighbours[a][b] = neighbours[a].get(b, 0.0) + length
+                neighbours[b][a] = neighbours[b].get(a, 0.0) + length
+    return keys, areas, neighbours
+
+
+def _group_metrics(members: List[_ThanaMetrics]) -> Dict[str, Any]:
+    area = sum(m.area_km2 for m in members)
+    edge_counts: Counter = Counter()
+    lengths: Dict[Tuple, float] = {}
+    for m in members:
+        edge_counts.update(m.edges.keys())
+        lengths.update(m.edges)
+    perimeter = sum(lengths[e] for e, n in edge_counts.items() if n % 2 == 1)
+    compactness = (4 * math.pi * area / perimeter ** 2) if perimeter else 0.0
+    return {
+        "area_km2": round(area, 2),
+        "perimeter_km": round(perimeter, 2),
+        "compactness": round(compactness, 4),
+    }
+
+
+def resolve_current_assignment(current: Dict[ThanaKey, str],
+                               original: Dict[ThanaKey, str]) -> Dict[ThanaKey, Tuple[str, str]]:
+    """
+    Map each original (district, thana) to its current (region, district).
+
+    A moved thana shows up as a (district, thana) row that is in the current CSV
+    but not in the original; it is matched back to the original row with the same
+    thana name that disappeared from the current CSV.
+    """
+    resolved: Dict[ThanaKey, Tuple[str, str]] = {}
+    for key, region in current.items():
+        if key in original:
+            resolved[key] = (region, key[0])
+
+    vanished: Dict[str, List[ThanaKey]] = defaultdict(list)
+    for key in original:
+        if key not in current:
+            vanished[key[1]].append(key)
+    for (district, thana), region in current.items():
+        if (district, thana) not in original and vanished.get(thana):
+            resolved[vanished[thana].pop(0)] = (region, district)
+    return resolved
+
+
+def moved_thanas(current: Dict[ThanaKey, str], original: Dict[ThanaKey, str]) -> List[ThanaKey]:
+    """Current (district, thana) rows whose district or region differs from the original."""
+    return [key for key, region in current.items()
+            if key not in original or original[key] != region]
+
+
+def compute_stats(features: Iterable[Dict[str, Any]], current: Dict[ThanaKey, str],
+                  original: Optional[Dict[ThanaKey, str]] = None) -> Dict[str, Any]:
+    """
+    Build the stats document for the current assignment.
+
+    features: thana features (geometry + 'district'/'thana' properties)
+    current:  {(district, thana) -> region} from region_swapped_data.csv
+    original: same for region_swapped_data_original.csv (moves are counted against it)
+    """
+    version = assignment_version(current)
+    with _lock:
+        cached = _stats_by_version.get(version)
+        if cached is not None:
+            return cached
+
+        resolved = resolve_current_assignment(current, original or current)
+        # Groups hold geometry fingerprints, which also drops duplicated features
+        by_region: Dict[str, set] = defaultdict(set)
+        by_district: Dict[str, set] = defaultdict(set)
+        metrics_by_key: Dict[Tuple, _ThanaMetrics] = {}
+
+        for feature in features:
+            props = feature.get("properties") or {}
+            key = (props.get("district", ""), props.get("thana", ""))
+            region, district = resolved.get(key, (props.get("region", ""), key[0]))
+            fingerprint, metrics = _thana_metrics(feature.get("geometry") or {})
+            metrics_by_key[fingerprint] = metrics
+            by_region[region].add(fingerprint)
+            by_district[district].add(fingerprint)
+
+        moved = Counter()
+        moved_by_district = Counter()
+        for district, thana in moved_thanas(current, original or current):
+            moved[current[(district, thana)]] += 1
+            moved_by_district[district] += 1
+
+        if len(_group_cache) > _MAX_CACHED_GROUPS:
+            _group_cache.clear()
+
+        def summarise(groups: Dict[str, set], level: str, moved_counts: Counter) -> Dict[str, Any]:
+            out = {}
+            for name, members in sorted(groups.items()):
+                cache_key = (level, name, frozenset(members))
+                figures = _group_cache.get(cache_key)
+                if figures is None:
+                    figures = _group_metrics([metrics_by_key[m] for m in members])
+                    _group_cache[cache_key] = figures
+                out[name] = dict(figures, thana_count=len(members), moved_thanas=moved_counts.get(name, 0))
+            return out
+
+        stats = {
+            "version": version,
+            "generated_at": datetime.now().isoformat(timespec="seconds"),
+            "totals": {
+                "thanas": len(metrics_by_key),
+                "moved_thanas": sum(moved.values()),
+            },
+            "regions": summarise(by_region, "region", moved),
+            "districts": summarise(by_district, "district", moved_by_district),
+        }
+
+        _stats_by_version[version] = stats
+        while len(_stats_by_version) > _MAX_CACHED_VERSIONS:
+            _stats_by_version.pop(next(iter(_stats_by_version)))
+        return stats
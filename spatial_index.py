@@ -0,0 +1,287 @@
+"""
+In-process spatial index over the thana polygons in geojson/thanas.geojson.
+
+Answers "which thana / district / region contains this coordinate" without a GIS:
+every polygon gets a precomputed bounding box and split x/y rings, and a uniform
+grid maps each cell to the polygons whose bbox touches it. A lookup is then a
+cell hit, a couple of bbox checks and one ray-casting test.
+"""
+
+import csv
+import hashlib
+import io
+import itertools
+import math
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from geojson_generator import load_geojson
+from geometry_store import GeometryStore, open_layer_store
+from geometry import (BBox, bbox_contains, bbox_intersects, iter_polygons, merge_bbox, point_in_ring,
+                      ring_bbox, split_ring)
+
+# Roughly 5.5 km cells; Bangladesh fits in ~100 x 120 cells.
+DEFAULT_CELL_SIZE = 0.05
+
+
+class ThanaIndex:
+    """Grid index of thana polygons. Build once, query many times."""
+
+    def __init__(self, features: List[Dict[str, Any]], cell_size: float = DEFAULT_CELL_SIZE):
+        self.cell_size = cell_size
+        self.properties: List[Dict[str, Any]] = []
+        self.feature_bboxes: List[BBox] = []
+        self._geometries = [feature.get("geometry") for feature in features]
+        # One entry per polygon part: (feature_idx, bbox, outer_ring_xy, [hole_xy, ...])
+        self._parts: List[Tuple[int, BBox, Tuple, List[Tuple]]] = []
+
+        for feature in features:
+            geometry = feature.get("geometry") or {}
+            feature_idx = len(self.properties)
+            feature_bbox = None
+            for polygon in iter_polygons(geometry):
+                if not polygon or len(polygon[0]) < 3:
+                    continue
+                bbox = ring_bbox(polygon[0])
+                self._parts.append((feature_idx, bbox, split_ring(polygon[0]),
+                                    [split_ring(hole) for hole in polygon[1:]]))
+                feature_bbox = bbox if feature_bbox is None else merge_bbox(feature_bbox, bbox)
+            self.properties.append(dict(feature.get("properties") or {}))
+            self.feature_bboxes.append(feature_bbox or (math.inf, math.inf, -math.inf, -math.inf))
+
+        self._build_grid()
+
+    @classmethod
+    def from_store(cls, store: GeometryStore, cell_size: float = DEFAULT_CELL_SIZE) -> "ThanaIndex":
+        """Index over a memory-mapped geometry store; rings are views into the map, not copies."""
+        index = cls.__new__(cls)
+        index.cell_size = cell_size
+        index.properties = [dict(p) for p in store.properties]
+        index.feature_bboxes = []
+        index._geometries = []  # never matches in refresh_properties(); the store is rewritten on save
+        index._parts = []
+        for feature_idx in range(len(store)):
+            feature_bbox = None
+            for part_idx in store.parts(feature_idx):
+                rings = list(store.rings_xy(part_idx))
+                if not rings or len(rings[0][0]) < 3:
+                    continue
+                bbox = store.part_bbox(part_idx)
+                index._parts.append((feature_idx, bbox, rings[0], rings[1:]))
+                feature_bbox = bbox if feature_bbox is None else merge_bbox(feature_bbox, bbox)
+            index.feature_bboxes.append(feature_bbox or (math.inf, math.inf, -math.inf, -math.inf))
+        index._build_grid()
+        return index
+
+    def _build_grid(self) -> None:
+        if self._parts:
+            self.bbox: BBox = (min(p[1][0] for p in self._parts), min(p[1][1] for p in self._parts),
+                               max(p[1][2] for p in self._parts), max(p[1][3] for p in self._parts))
+        else:
+            self.bbox = (0.0, 0.0, 0.0, 0.0)
+
+        self._cols = max(1, int(math.ceil((self.bbox[2] - self.bbox[0]) / self.cell_size)) + 1)
+        self._rows = max(1, int(math.ceil((self.bbox[3] - self.bbox[1]) / self.cell_size)) + 1)
+        self._grid: Dict[int, List[int]] = {}
+        for part_idx, (_, bbox, _, _) in enumerate(self._parts):
+            c0, r0 = self._cell(bbox[0], bbox[1])
+            c1, r1 = self._cell(bbox[2], bbox[3])
+            for r in range(r0, r1 + 1):
+                for c in range(c0, c1 + 1):
+                    self._grid.setdefault(r * self._cols + c, []).append(part_idx)
+
+    def __len__(self) -> int:
+        return len(self.properties)
+
+    def to_state(self) -> Dict[str, Any]:
+        """Derived grid and polygon parts as plain data (for startup_cache); no geometry or properties."""
+        return {"cell_size": self.cell_size, "bbox": self.bbox, "cols": self._cols, "rows": self._rows,
+                "grid": self._grid, "parts": self._parts, "feature_bboxes": self.feature_bboxes}
+
+    @classmethod
+    def from_state(cls, features: List[Dict[str, Any]], state: Dict[str, Any]) -> "ThanaIndex":
+        """Rebuild an index from to_state() output and the features it was built from."""
+        index = cls.__new__(cls)
+        index.cell_size = state["cell_size"]
+        index.bbox = tuple(state["bbox"])
+        index._cols, index._rows = state["cols"], state["rows"]
+        index._grid = state["grid"]
+        index._parts = state["parts"]
+        index.feature_bboxes = state["feature_bboxes"]
+        index._geometries = [feature.get("geometry") for feature in features]
+        index.properties = [dict(feature.get("properties") or {}) for feature in features]
+        return index
+
+    def refresh_properties(self, features: List[Dict[str, Any]]) -> bool:
+        """
+        Swap in new properties when the geometry objects are the very same ones the
+        index was built from (the generator keeps layers resident between saves).
+        Returns False if the geometry changed and the index must be rebuilt.
+        """
+        if len(features) != len(self._geometries):
+            return False
+        if any(f.get("geometry") is not g for f, g in zip(features, self._geometries)):
+            return False
+        self.properties = [dict(f.get("properties") or {}) for f in features]
+        return True
+
+    def _cell(self, x: float, y: float) -> Tuple[int, int]:
+        c = int((x - self.bbox[0]) / self.cell_size)
+        r = int((y - self.bbox[1]) / self.cell_size)
+        return min(max(c, 0), self._cols - 1), min(max(r, 0), self._rows - 1)
+
+    def locate(self, lon: float, lat: float) -> Optional[int]:
+        """Index of the thana feature containing (lon, lat), or None."""
+        if not bbox_contains(self.bbox, lon, lat):
+            return None
+        c, r = self._cell(lon, lat)
+        for part_idx in self._grid.get(r * self._cols + c, ()):
+            feature_idx, bbox, outer, holes = self._parts[part_idx]
+            if not bbox_contains(bbox, lon, lat):
+                continue
+            if not point_in_ring(lon, lat, *outer):
+                continue
+            if any(point_in_ring(lon, lat, *hole) for hole in holes):
+                continue
+            return feature_idx
+        return None
+
+    def locate_many(self, points: Sequence[Tuple[float, float]]) -> List[Optional[int]]:
+        """Batch version of locate(); points are (lon, lat) pairs."""
+        locate = self.locate
+        return [locate(lon, lat) for lon, lat in points]
+
+    def query_bbox(self, bbox: BBox) -> List[int]:
+        """Indices of thana features whose bounding box intersects bbox."""
+        return [i for i, fb in enumerate(self.feature_bboxes) if bbox_intersects(fb, bbox)]
+
+    def assignment(self, feature_idx: Optional[int]) -> Optional[Dict[str, Any]]:
+        """Region/district/thana properties of a located feature."""
+        if feature_idx is None:
+            return None
+        props = self.properties[feature_idx]
+        return {
+            "thana": props.get("thana"),
+            "district": props.get("district"),
+            "region": props.get("region"),
+        }
+
+
+LAT_COLUMNS = ("lat", "latitude", "y")
+LON_COLUMNS = ("lon", "lng", "long", "longitude", "x")
+ANNOTATION_COLUMNS = ("Thana", "District", "Region")
+
+
+def _find_column(header: List[str], wanted: Optional[str], candidates: Sequence[str]) -> int:
+    lowered = [h.strip().lower() for h in header]
+    names = (wanted.strip().lower(),) if wanted else candidates
+    for name in names:
+        if name in lowered:
+            return lowered.index(name)
+    raise ValueError(f"CSV has no {'/'.join(names)} column (header: {header})")
+
+
+def annotate_csv(lines: Iterable[str], index: ThanaIndex, chunk_size: int = 5000,
+                 lat_col: Optional[str] = None, lon_col: Optional[str] = None) -> Iterator[str]:
+    """
+    Stream a lat/lon CSV back with Thana, District and Region columns appended.
+
+    Rows are located one at a time with index.locate() and the output is yielded
+    as CSV text every chunk_size rows. Chunking bounds memory however large the
+    upload is; it is not batched evaluation and adds no throughput. Rows with
+    missing or unparsable coordinates (or outside every thana) get blank columns.
+    Raises ValueError up front if the lat/lon columns cannot be found.
+    """
+    reader = csv.reader(lines)
+    header = next(reader, None)
+    if not header:
+        raise ValueError("CSV is empty")
+    lat_idx = _find_column(header, lat_col, LAT_COLUMNS)
+    lon_idx = _find_column(header, lon_col, LON_COLUMNS)
+    return _annotate_rows(reader, header, index, chunk_size, lat_idx, lon_idx)
+
+
+def _annotate_rows(reader, header: List[str], index: ThanaIndex, chunk_size: int,
+                   lat_idx: int, lon_idx: int) -> Iterator[str]:
+    buf = io.StringIO()
+    writer = csv.writer(buf, lineterminator="\n")
+    writer.writerow(list(header) + list(ANNOTATION_COLUMNS))
+    blank = ["", "", ""]
+    lookup = index.properties
+    locate = index.locate
+
+    # Chunks bound the buffered output; each row is still located on its own
+    while True:
+        rows = list(itertools.islice(reader, chunk_size))
+        if not rows:
+            break
+        for row in rows:
+            try:
+                feature_idx = locate(float(row[lon_idx]), float(row[lat_idx]))
+            except (IndexError, ValueError):
+                feature_idx = None
+            if feature_idx is None:
+                writer.writerow(row + blank)
+            else:
+                props = lookup[feature_idx]
+                writer.writerow(row + [props.get("thana", ""), props.get("district", ""), props.get("region", "")])
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+
+    tail = buf.getvalue()
+    if tail:
+        yield tail
+
+
+def geometry_signature(features: List[Dict[str, Any]]) -> str:
+    """Hash of every ring's length and first vertex; changes whenever the thana geometry does."""
+    digest = hashlib.sha1()
+    for feature in features:
+        for polygon in iter_polygons(feature.get("geometry") or {}):
+            for ring in polygon:
+                digest.update(repr((len(ring), ring[0] if ring else None)).encode("utf-8"))
+        digest.update(b"\x1e")
+    return digest.hexdigest()[:16]
+
+
+_index_lock = threading.Lock()
+_index_cache: Dict[Path, Tuple[Tuple, ThanaIndex]] = {}
+
+
+def load_thana_index(thanas_path: Path) -> Optional[ThanaIndex]:
+    """
+    Return a ThanaIndex for thanas.geojson, refreshed only when the file changes.
+    Built from the memory-mapped thanas.geom when that is current, else from the GeoJSON.
+    Returns None if the file does not exist.
+    """
+    try:
+        mtime = thanas_path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+    store = open_layer_store(thanas_path)
+    signature = (mtime, store.signature if store else None)
+
+    with _index_lock:
+        cached = _index_cache.get(thanas_path)
+        if cached and cached[0] == signature:
+            return cached[1]
+        if store is not None:
+            index = ThanaIndex.from_store(store)
+        else:
+            # Shares the generator's resident copy, so after a save only the
+            # properties changed and the grid can be kept as is
+            features = load_geojson(thanas_path).get("features", [])
+            if cached and cached[1].refresh_properties(features):
+                index = cached[1]
+            else:
+                index = ThanaIndex(features)
+        _index_cache[thanas_path] = (signature, index)
+        return index
+
+
+def install_thana_index(thanas_path: Path, index: ThanaIndex) -> None:
+    """Use a prebuilt GeoJSON-based index (e.g. from the startup snapshot) for the current thanas.geojson."""
+    with _index_lock:
+        _index_cache[thanas_path] = ((thanas_path.stat().st_mtime_ns, None), index)
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Startup snapshot: derived data that is slow to rebuild on a cold start, in one binary file.
+
+.cache/startup.snapshot (marshal format) holds the per-thana area and boundary edges
+used by region_stats (about 0.35 s to compute, 0.05 s to load; the shared edges are the
+thanas' adjacency) and the spatial index grid over the thana polygons. Both are only
+valid for the geometry they were built from: the index is checked against
+spatial_index.geometry_signature() and the thana metrics are keyed by their own
+geometry fingerprint, so a snapshot survives saves (which only change properties).
+
+warm() is what app.py runs in a background thread at start-up: parse the GeoJSON
+layers into the generator's resident cache, restore (or build and write) the
+snapshot, and read stats.json and the output manifest, returning timings per step.
+
+    python startup_cache.py            build the snapshot (Dockerfile, after geojson_generator.py)
+    python startup_cache.py --profile  also show the slowest imports of `import app`
+"""
+
+import argparse
+import marshal
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+from geojson_generator import load_geojson
+from geometry_store import open_layer_store
+from region_stats import export_thana_metrics, import_thana_metrics
+from spatial_index import ThanaIndex, geometry_signature, install_thana_index, load_thana_index
+
+SNAPSHOT_VERSION = 2
+CACHE_DIRNAME = ".cache"
+SNAPSHOT_NAME = "startup.snapshot"
+LAYERS = ["thanas.geojson", "districts.geojson", "regions.geojson"]
+
+
+def snapshot_path(base_dir: Path) -> Path:
+    return base_dir / CACHE_DIRNAME / SNAPSHOT_NAME
+
+
+def _header() -> Dict[str, Any]:
+    # marshal's format is only stable within one Python minor version
+    return {"version": SNAPSHOT_VERSION, "python": list(sys.version_info[:2])}
+
+
+def build_snapshot(base_dir: Path) -> Optional[Path]:
+    """Compute thana metrics and the spatial index for the current geometry and write the snapshot."""
+    from geojson_generator import write_stats
+
+    thanas_path = base_dir / "geojson" / "thanas.geojson"
+    features = load_geojson(thanas_path).get("features", [])
+    if not features:
+        return None
+    write_stats(base_dir, {"features": features})  # fills region_stats' per-thana cache
+    index = ThanaIndex(features)
+    data = dict(_header(), geometry=geometry_signature(features),
+                thana_metrics=export_thana_metrics(), thana_index=index.to_state())
+
+    path = snapshot_path(base_dir)
+    path.parent.mkdir(exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_bytes(marshal.dumps(data))
+    os.replace(tmp, path)
+    install_thana_index(thanas_path, index)
+    return path
+
+
+def load_snapshot(base_dir: Path) -> Dict[str, Any]:
+    """Seed the in-process caches from the snapshot. Returns what was restored."""
+    path = snapshot_path(base_dir)
+    result = {"current": False, "thana_metrics": 0, "thana_index": False}
+    try:
+        data = marshal.loads(path.read_bytes())
+    except (OSError, EOFError, ValueError, TypeError):
+        return result
+    if not isinstance(data, dict) or {k: data.get(k) for k in _header()} != _header():
+        return result
+
+    result["thana_metrics"] = import_thana_metrics(data.get("thana_metrics", []))
+    thanas_path = base_dir / "geojson" / "thanas.geojson"
+    features = load_geojson(thanas_path).get("features", [])
+    result["current"] = bool(features) and data.get("geometry") == geometry_signature(features)
+    # A current thanas.geom makes load_thana_index() build from the mmap instead
+    if result["current"] and open_layer_store(thanas_path) is None:
+        install_thana_index(thanas_path, ThanaIndex.from_state(features, data["thana_index"]))
+        result["thana_index"] = True
+    return result
+
+
+def warm(base_dir: Path, extra_steps: Optional[Dict[str, Callable[[], Any]]] = None) -> Dict[str, Any]:
+    """Load everything the first requests would otherwise load; returns per-step milliseconds."""
+    profile: Dict[str, Any] = {"steps_ms": {}}
+
+    def step(name: str, fn: Callable[[], Any]) -> Any:
+        started = time.perf_counter()
+        try:
+            return fn()
+        except Exception as e:
+            profile.setdefault("errors", {})[name] = str(e)
+        finally:
+            profile["steps_ms"][name] = round((time.perf_counter() - started) * 1000, 1)
+
+    for layer in LAYERS:
+        step(f"load_{layer.split('.')[0]}", lambda layer=layer: load_geojson(base_dir / "geojson" / layer))
+    restored = step("snapshot_load", lambda: load_snapshot(base_dir)) or {}
+    profile["snapshot"] = "hit" if restored.get("current") else "miss"
+    if profile["snapshot"] == "miss":
+        step("snapshot_build", lambda: build_snapshot(base_dir))
+    step("thana_index", lambda: load_thana_index(base_dir / "geojson" / "thanas.geojson"))
+    for name, fn in (extra_steps or {}).items():
+        step(name, fn)
+    profile["total_ms"] = round(sum(profile["steps_ms"].values()), 1)
+    return profile
+
+
+def import_profile(base_dir: Path, top: int = 15) -> None:
+    """Print the modules with the largest cumulative import time for `import app`."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app"],
+                          cwd=base_dir, capture_output=True, text=True, timeout=120,
+                          env=dict(os.environ, WARM_ON_START="0"))
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, self_us, cumulative_us, name = [p.strip() for p in line.replace("import time:", "|").split("|")]
+        rows.append((int(cumulative_us), int(self_us), name.strip()))
+    rows.sort(reverse=True)
+    print(f"{'module':<40} {'cumulative':>11} {'self':>9}")
+    for cumulative_us, self_us, name in rows[:top]:
+        print(f"{name:<40} {cumulative_us / 1000:>9.1f}ms {self_us / 1000:>7.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the startup snapshot")
+    parser.add_argument("--profile", action="store_true", help="also print an import-time profile of app.py")
+    args = parser.parse_args()
+    base_dir = Path(__file__).resolve().parent
+
+    print("=" * 60)
+    print("Building startup snapshot")
+    print("=" * 60)
+    started = time.perf_counter()
+    path = build_snapshot(base_dir)
+    if path is None:
+        print("⚠ geojson/thanas.geojson missing or empty, snapshot skipped")
+    else:
+        print(f"✓ {path.relative_to(base_dir)} ({path.stat().st_size // 1024} KB, "
+              f"{(time.perf_counter() - started) * 1000:.0f} ms)")
+
+    if args.profile:
+        print()
+        import_profile(base_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Tests for compact_geojson: VGEO encode/decode round trip.
+"""
+
+import pytest
+
+from compact_geojson import decode, encode
+
+SQUARE_WITH_HOLE = {
+    "type": "Polygon",
+    "coordinates": [
+        [[90.0, 23.0], [90.5, 23.0], [90.5, 23.5], [90.0, 23.5], [90.0, 23.0]],
+        [[90.1, 23.1], [90.2, 23.1], [90.2, 23.2], [90.1, 23.1]],
+    ],
+}
+TWO_PARTS = {
+    "type": "MultiPolygon",
+    "coordinates": [
+        [[[88.12345, 22.54321], [88.12346, 22.54321], [88.12346, 22.54322], [88.12345, 22.54321]]],
+        [[[92.0, 26.0], [92.1, 26.0], [92.1, 26.1], [92.0, 26.0]]],
+    ],
+}
+
+
+def collection(*geometries):
+    return {"type": "FeatureCollection", "features": [
+        {"type": "Feature", "properties": {"thana": f"T{i}", "district": "Dhaka"}, "geometry": g}
+        for i, g in enumerate(geometries)]}
+
+
+def as_multipolygon(geometry):
+    coords = geometry["coordinates"]
+    return [coords] if geometry["type"] == "Polygon" else coords
+
+
+def points(polygons):
+    return [coord for polygon in polygons for ring in polygon for point in ring for coord in point]
+
+
+# TWO_PARTS alone fits int16 deltas; the 0.5° square edges need int32
+@pytest.mark.parametrize("geometries", [(TWO_PARTS,), (SQUARE_WITH_HOLE, TWO_PARTS)])
+def test_round_trip(geometries):
+    data = collection(*geometries)
+    decoded = decode(encode(data))
+    assert [f["properties"] for f in decoded["features"]] == [f["properties"] for f in data["features"]]
+    for original, feature in zip(data["features"], decoded["features"]):
+        assert feature["geometry"]["type"] == "MultiPolygon"
+        expected = as_multipolygon(original["geometry"])
+        assert [[len(ring) for ring in polygon] for polygon in feature["geometry"]["coordinates"]] == \
+            [[len(ring) for ring in polygon] for polygon in expected]
+        assert points(feature["geometry"]["coordinates"]) == pytest.approx(points(expected))
+
+
+def test_quantisation_precision():
+    decoded = decode(encode(collection(TWO_PARTS), decimals=3))
+    ring = decoded["features"][0]["geometry"]["coordinates"][0][0]
+    assert ring[0] == pytest.approx([88.123, 22.543])
+
+
+def test_cached_encode_matches_fresh_encode():
+    data = collection(SQUARE_WITH_HOLE, TWO_PARTS)
+    cache = {}
+    assert encode(data, cache=cache) == encode(data)
+    data["features"][0]["properties"]["thana"] = "Renamed"
+    data["features"].reverse()
+    assert encode(data, cache=cache) == encode(data)
+    data["features"][0]["geometry"] = {"type": "Polygon", "coordinates": [[[90.0, 23.0], [90.1, 23.0], [90.0, 23.1], [90.0, 23.0]]]}
+    assert encode(data, cache=cache) == encode(data)
+    assert encode(data, decimals=3, cache=cache) == encode(data, decimals=3)
+
+
+def test_rejects_other_bytes():
+    with pytest.raises(ValueError):
+        decode(b"{}")
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-q"]))
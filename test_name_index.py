@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Tests for name_index against the repository's own name sources.
+"""
+
+from pathlib import Path
+
+import pytest
+
+from name_index import build_index, name_key
+
+
+@pytest.fixture(scope="module")
+def index():
+    return build_index(Path(__file__).resolve().parent)
+
+
+def test_name_key():
+    assert name_key("Bhola hat") == name_key("BHOLAHAT") == "bholahat"
+    assert name_key("Cox's Bazar") == "coxsbazar"
+
+
+def test_aliases_resolve_within_their_district(index):
+    assert index.canonical_thana("Jessore Sadar", "Jessore") == "Kotwali"
+    assert index.canonical_thana("Dualatpur", "Khulna") == "Daulatpur"
+    assert index.resolve("Brahamanbaria", "Kasba") == ("Brahmanbaria", "Kashba")
+    assert index.canonical_district("Netrakona") == "Netrokona"
+
+
+def test_moved_thana_keeps_its_canonical_name(index):
+    assert index.canonical_thana("Bhairab", "Narsingdi") == "Bhairab"
+    assert index.canonical_thana("BHAIRAB", "Narsingdi") == "Bhairab"
+
+
+def test_aliases_do_not_apply_across_districts(index):
+    # Khilkhet is an alias of Kotwali in Dhaka only
+    assert index.canonical_thana("Khilkhet", "Dhaka") == "Kotwali"
+    assert index.canonical_thana("Khilkhet", "Gazipur") == "Khilkhet"
+
+
+def test_unknown_names_are_returned_unchanged(index):
+    assert index.canonical_thana(" Atlantis ", "Dhaka") == "Atlantis"
+    assert index.resolve("Dhaka", "Atlantis") is None
+
+
+def test_check_rows(index):
+    report = index.check_rows([("Brahamanbaria", "Kasba"), ("Narsingdi", "Bhairab"), ("Dhaka", "Gulshn")])
+    assert report["matched"] == 2
+    assert report["renamed"][0]["canonical_thana"] == "Kashba"
+    assert report["moved"][0]["original_district"] == "Kishoreganj"
+    assert report["unmatched"][0]["suggestions"][0]["thana"] == "Gulshan"
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+"""
+/progress regression test: polling after a finished pipeline run must not
+consume the run's spans from the metrics history.
+"""
+
+import metrics
+from app import app
+
+
+def test_progress_after_finished_run():
+    run = metrics.start_run("test")
+    run.add_span("render_region", 12.5, map_name="Dhaka")
+    metrics.finish_run(run, "ok")
+
+    client = app.test_client()
+    for _ in range(2):
+        response = client.get("/progress")
+        assert response.status_code == 200
+        assert response.get_json()["pipeline"]["recent_spans"][-1]["map"] == "Dhaka"
+
+    assert metrics.history()[-1]["spans"][-1]["map"] == "Dhaka"
+
+
+if __name__ == "__main__":
+    test_progress_after_finished_run()
+    print("✓ /progress keeps the finished run's spans")
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Tests for rebalance: incremental move deltas, contiguity checks, targets and weights CSVs.
+"""
+
+from pathlib import Path
+
+import pytest
+
+from rebalance import Partition, load_current, propose, read_weights_csv, resolve_targets
+from what_if import evaluate_scenarios
+
+BASE_DIR = Path(__file__).resolve().parent
+
+
+def path_graph(n):
+    """0 - 1 - ... - n-1, unit shared boundaries."""
+    neighbours = [{} for _ in range(n)]
+    for i in range(n - 1):
+        neighbours[i][i + 1] = neighbours[i + 1][i] = 1.0
+    return neighbours
+
+
+def test_move_delta_matches_objective_change():
+    partition = Partition(path_graph(4), [1, 1, 1, 1], [0, 0, 1, 1], [2, 2])
+    assert partition.move_delta(1, 1) == pytest.approx(0.5)
+
+    partition = Partition(path_graph(4), [3, 1, 1, 2], [0, 0, 0, 1], [3.5, 3.5])
+    for unit, group in [(2, 1), (0, 1), (3, 0)]:
+        before = partition.objective()
+        delta = partition.move_delta(unit, group)
+        partition.apply(unit, group)
+        assert partition.objective() - before == pytest.approx(delta)
+
+
+def test_stays_connected():
+    # Path: removing the middle of a group's chain splits it
+    partition = Partition(path_graph(4), [1] * 4, [0, 0, 0, 1], [2, 2])
+    assert not partition.stays_connected(1)
+    assert partition.stays_connected(0)
+    assert partition.stays_connected(2)
+
+    # Ring 0-1-2-3-0: the neighbours of 0 are still joined through 2
+    ring = path_graph(4)
+    ring[0][3] = ring[3][0] = 1.0
+    partition = Partition(ring, [1] * 4, [0, 0, 0, 0], [4])
+    assert all(partition.stays_connected(unit) for unit in range(4))
+
+
+def test_linked_groups_stay_connected():
+    # Path 0-1-2-3 in one group; districts {0, 1, 2} and {3}
+    partition = Partition(path_graph(4), [1] * 4, [0, 0, 0, 0], [4], linked_of=[0, 0, 0, 1])
+    assert partition.stays_connected(1) is False  # the group is a path as well
+    ring = path_graph(4)
+    ring[0][3] = ring[3][0] = 1.0
+    # Ring in one group, but district {0, 1, 2} is a path through 1
+    partition = Partition(ring, [1] * 4, [0, 0, 0, 0], [4], linked_of=[0, 0, 0, 1])
+    assert partition.stays_connected(0) and partition.stays_connected(2)
+    assert not partition.stays_connected(1)
+    # The last thana of a district cannot leave
+    partition = Partition(path_graph(3), [1] * 3, [0, 0, 1], [1.5, 1.5], linked_of=[0, 1, 2])
+    assert not partition.can_leave(1)
+
+
+def test_moved_thana_joins_the_neighbouring_linked_group():
+    # 0-1-2-3: groups {0, 1} and {2, 3}, linked groups 0, 1, 2, 2
+    partition = Partition(path_graph(4), [1] * 4, [0, 0, 1, 1], [2, 2], linked_of=[0, 1, 2, 2])
+    partition.apply(1, 1)
+    assert partition.linked_of == [0, 2, 2, 2]
+    assert partition.linked_sizes == {0: 1, 1: 0, 2: 3}
+
+
+@pytest.mark.parametrize("metric,level", [("count", "region"), ("area", "region"),
+                                          ("count", "district"), ("area", "district")])
+def test_proposals_keep_regions_and_districts_contiguous(metric, level):
+    features, assignment = load_current(BASE_DIR)
+    result = propose(features, assignment, metric=metric, level=level)
+    assert result["moves"] and result["objective_after"] < result["objective_before"]
+    scenario = evaluate_scenarios(features, assignment, [{"moves": result["moves"]}])["scenarios"][0]
+    assert scenario["valid"] and scenario["contiguous"]
+
+
+def test_resolve_targets():
+    groups, loads = ["A", "B", "C"], [10.0, 20.0, 30.0]
+    assert resolve_targets(groups, loads, None) == [20.0, 20.0, 20.0]
+    assert resolve_targets(groups, loads, {"A": 30}) == [30.0, 15.0, 15.0]
+    with pytest.raises(ValueError, match="Unknown group"):
+        resolve_targets(groups, loads, {"Z": 5})
+    with pytest.raises(ValueError, match="positive"):
+        resolve_targets(groups, loads, {"A": 0})
+    with pytest.raises(ValueError, match="nothing"):
+        resolve_targets(groups, loads, {"A": 60})
+
+
+def test_read_weights_csv():
+    lines = ["district,Thana,Population\n", "Dhaka, Savar ,1500.5\n", "Dhaka,Dhamrai,\n", "Gazipur,Kaliakair,900\n"]
+    assert read_weights_csv(lines, "population") == {("Dhaka", "Savar"): 1500.5, ("Gazipur", "Kaliakair"): 900.0}
+    assert read_weights_csv(["District,Thana,Weight\n", "Dhaka,Savar,2\n"]) == {("Dhaka", "Savar"): 2.0}
+
+    with pytest.raises(ValueError, match="Line 3"):
+        read_weights_csv(["District,Thana,Weight\n", "Dhaka,Savar,2\n", "Dhaka,Dhamrai,many\n"])
+    with pytest.raises(ValueError, match="District and Thana"):
+        read_weights_csv(["Zila,Upazila,Weight\n"])
+    with pytest.raises(ValueError, match="no 'Population' column"):
+        read_weights_csv(["District,Thana,Weight\n"], "Population")
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Tests for region_stats: matching moved thanas back to their original rows.
+"""
+
+from region_stats import moved_thanas, resolve_current_assignment
+
+ORIGINAL = {
+    ("Dhaka", "Savar"): "Dhaka",
+    ("Kishoreganj", "Bhairab"): "Mymensingh",
+    ("Kishoreganj", "Kuliarchar"): "Mymensingh",
+}
+
+
+def test_unchanged_assignment():
+    resolved = resolve_current_assignment(ORIGINAL, ORIGINAL)
+    assert resolved[("Kishoreganj", "Bhairab")] == ("Mymensingh", "Kishoreganj")
+    assert moved_thanas(ORIGINAL, ORIGINAL) == []
+
+
+def test_moved_thana_maps_back_to_original_row():
+    current = dict(ORIGINAL)
+    del current[("Kishoreganj", "Bhairab")]
+    current[("Narsingdi", "Bhairab")] = "Dhaka"
+
+    resolved = resolve_current_assignment(current, ORIGINAL)
+    assert resolved[("Kishoreganj", "Bhairab")] == ("Dhaka", "Narsingdi")
+    assert resolved[("Kishoreganj", "Kuliarchar")] == ("Mymensingh", "Kishoreganj")
+    assert ("Narsingdi", "Bhairab") not in resolved
+    assert moved_thanas(current, ORIGINAL) == [("Narsingdi", "Bhairab")]
+
+
+def test_region_change_without_district_change():
+    current = dict(ORIGINAL)
+    current[("Dhaka", "Savar")] = "Faridpur"
+    assert resolve_current_assignment(current, ORIGINAL)[("Dhaka", "Savar")] == ("Faridpur", "Dhaka")
+    assert moved_thanas(current, ORIGINAL) == [("Dhaka", "Savar")]
+
+
+if __name__ == "__main__":
+    test_unchanged_assignment()
+    test_moved_thana_maps_back_to_original_row()
+    test_region_change_without_district_change()
+    print("✓ region_stats tests passed")
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Tests for spatial_index: grid lookups against a brute-force point-in-polygon scan,
+bbox queries, /api/thanas/bbox and CSV annotation.
+"""
+
+import random
+from pathlib import Path
+
+import pytest
+
+from geometry import iter_polygons, point_in_polygon
+from spatial_index import ThanaIndex, annotate_csv
+from geojson_generator import load_geojson
+
+THANAS = Path(__file__).resolve().parent / "geojson" / "thanas.geojson"
+
+
+def feature(name, geometry):
+    return {"type": "Feature", "geometry": geometry,
+            "properties": {"thana": name, "district": f"D-{name}", "region": f"R-{name}"}}
+
+
+# A square with a hole, a two-part thana (one part sits in the hole) and a triangle
+SYNTHETIC = [
+    feature("Holed", {"type": "Polygon", "coordinates": [
+        [[90.0, 23.0], [90.3, 23.0], [90.3, 23.3], [90.0, 23.3], [90.0, 23.0]],
+        [[90.1, 23.1], [90.2, 23.1], [90.2, 23.2], [90.1, 23.2], [90.1, 23.1]]]}),
+    feature("Split", {"type": "MultiPolygon", "coordinates": [
+        [[[90.12, 23.12], [90.18, 23.12], [90.18, 23.18], [90.12, 23.18], [90.12, 23.12]]],
+        [[[90.4, 23.0], [90.6, 23.0], [90.6, 23.1], [90.4, 23.1], [90.4, 23.0]]]]}),
+    feature("Wedge", {"type": "Polygon", "coordinates": [
+        [[90.3, 23.3], [90.7, 23.3], [90.5, 23.6], [90.3, 23.3]]]}),
+]
+
+
+def brute_force(features, points):
+    """Feature index containing each point, by testing every polygon of every feature in order."""
+    polygons = [(i, polygon) for i, f in enumerate(features) for polygon in iter_polygons(f["geometry"])]
+    return [next((i for i, polygon in polygons if point_in_polygon(lon, lat, polygon)), None)
+            for lon, lat in points]
+
+
+def random_points(bbox, n, seed=7):
+    rng = random.Random(seed)
+    return [(rng.uniform(bbox[0], bbox[2]), rng.uniform(bbox[1], bbox[3])) for _ in range(n)]
+
+
+@pytest.mark.parametrize("cell_size", [0.05, 0.013, 1.0])
+def test_locate_matches_brute_force(cell_size):
+    index = ThanaIndex(SYNTHETIC, cell_size=cell_size)
+    points = random_points((89.9, 22.9, 90.8, 23.7), 3000)
+    assert index.locate_many(points) == brute_force(SYNTHETIC, points)
+    assert index.locate(90.15, 23.15) == 1  # in the hole of "Holed", inside "Split"
+    assert index.locate(90.25, 23.15) == 0
+    assert index.locate(10.0, 10.0) is None
+
+
+@pytest.mark.skipif(not THANAS.exists(), reason="geojson/thanas.geojson not present")
+def test_locate_matches_brute_force_on_real_thanas():
+    features = load_geojson(THANAS)["features"]
+    index = ThanaIndex(features)
+    points = random_points(index.bbox, 200)
+    assert index.locate_many(points) == brute_force(features, points)
+    assert sum(i is not None for i in index.locate_many(points)) > 50
+
+
+def test_query_bbox():
+    index = ThanaIndex(SYNTHETIC)
+    assert index.query_bbox((90.31, 23.31, 90.32, 23.32)) == [2]
+    assert index.query_bbox((90.35, 23.05, 90.45, 23.06)) == [1]  # only Split's second part
+    assert index.query_bbox((89.0, 22.0, 91.0, 24.0)) == [0, 1, 2]
+    assert index.query_bbox((80.0, 10.0, 81.0, 11.0)) == []
+    assert index.assignment(2) == {"thana": "Wedge", "district": "D-Wedge", "region": "R-Wedge"}
+
+
+def test_annotate_csv():
+    index = ThanaIndex(SYNTHETIC)
+    lines = ["id,Latitude,Longitude\n", "a,23.25,90.05\n", "b,23.15,90.15\n", "c,,90.1\n", "d,1,1\n", "e,23.4,90.5\n"]
+    out = "".join(annotate_csv(iter(lines), index, chunk_size=2)).splitlines()
+    assert out == [
+        "id,Latitude,Longitude,Thana,District,Region",
+        "a,23.25,90.05,Holed,D-Holed,R-Holed",
+        "b,23.15,90.15,Split,D-Split,R-Split",
+        "c,,90.1,,,",
+        "d,1,1,,,",
+        "e,23.4,90.5,Wedge,D-Wedge,R-Wedge",
+    ]
+    chunks = list(annotate_csv(iter(["y,x\n", "23.25,90.05\n", "23.4,90.5\n"]), index, chunk_size=1,
+                               lat_col="y", lon_col="x"))
+    # The header goes out with the first chunk; no empty trailing chunk
+    assert chunks == ["y,x,Thana,District,Region\n23.25,90.05,Holed,D-Holed,R-Holed\n",
+                      "23.4,90.5,Wedge,D-Wedge,R-Wedge\n"]
+    with pytest.raises(ValueError, match="lat"):
+        annotate_csv(iter(["id,lon\n"]), index)
+
+
+@pytest.mark.skipif(not THANAS.exists(), reason="geojson/thanas.geojson not present")
+def test_thanas_bbox_endpoint():
+    from app import app
+
+    client = app.test_client()
+    client.post("/login", json={"username": "admin", "password": "zaytoon123"})
+    response = client.get("/api/thanas/bbox?bbox=90.37,23.73,90.39,23.75")
+    assert response.status_code == 200
+    assert any(t["district"] == "Dhaka" for t in response.get_json()["thanas"])
+    assert client.get("/api/thanas/bbox?bbox=1,2,3").status_code == 400
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-q"]))
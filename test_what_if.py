@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Tests for what_if: turning a scenario's moves into an overlay on the current placements.
+"""
+
+import pytest
+
+from what_if import _Baseline, _resolve_moves
+
+# Three columns of two unit squares: district D1 (x=0), D2 (x=1), D3 (x=2);
+# regions R1 = D1 + D2, R2 = D3
+DISTRICTS = {0: ("R1", "D1"), 1: ("R1", "D2"), 2: ("R2", "D3")}
+
+
+def square(x, y):
+    return {"type": "Polygon", "coordinates": [[[x, y], [x + 1, y], [x + 1, y + 1], [x, y + 1], [x, y]]]}
+
+
+@pytest.fixture(scope="module")
+def base():
+    features = []
+    for x, (region, district) in DISTRICTS.items():
+        for y in range(2):
+            features.append({"type": "Feature", "geometry": square(90 + x, 20 + y),
+                             "properties": {"region": region, "district": district, "thana": f"T{x}{y}"}})
+    assignment = {(d, f"T{x}{y}"): (r, d) for x, (r, d) in DISTRICTS.items() for y in range(2)}
+    return _Baseline(features, assignment)
+
+
+def test_valid_move_takes_the_target_districts_region(base):
+    overlay, errors = _resolve_moves(base, [{"district": "D2", "thana": "T10", "to_district": "D3"}])
+    assert errors == []
+    assert list(overlay.values()) == [("R2", "D3")]
+    assert base.keys[next(iter(overlay))] == ("D2", "T10")
+
+
+def test_noop_moves_are_dropped(base):
+    overlay, errors = _resolve_moves(base, [{"district": "D1", "thana": "T00", "to_district": "D1"}])
+    assert overlay == {} and errors == []
+
+
+def test_new_district_needs_a_region(base):
+    move = {"district": "D1", "thana": "T00", "to_district": "D9"}
+    overlay, errors = _resolve_moves(base, [move])
+    assert overlay == {} and "unknown target district 'D9'" in errors[0]
+
+    overlay, errors = _resolve_moves(base, [dict(move, to_region="R3")])
+    assert errors == [] and list(overlay.values()) == [("R3", "D9")]
+
+
+def test_invalid_moves_are_reported(base):
+    overlay, errors = _resolve_moves(base, [{"district": "D1", "thana": "Nowhere", "to_district": "D2"}, "T00"])
+    assert overlay == {}
+    assert errors == ["move 0: unknown thana 'Nowhere' in 'D1'", "move 1: expected an object"]
+    assert _resolve_moves(base, {"district": "D1"}) == ({}, ["moves must be a list"])
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Thumbnails, previews and sprite sheets for the region and district PDF maps.
+
+Images are named by the PDF's content hash (outputs/thumbs/<sha16>_thumb.png,
+<sha16>_preview.png), so a map that was not re-rendered keeps its images and
+a changed map gets new names; clients may cache them forever. Per kind
+("region", "district") the thumbnails are also packed into one sprite sheet,
+described in outputs/thumbs/index.json, so a grid of maps loads in one request.
+
+PDF rasterisation uses PyMuPDF when installed, else the pdftoppm CLI (poppler);
+without either the stage is skipped.
+
+Run after add_logo_to_pdfs.py: python thumbnails.py
+"""
+
+import hashlib
+import json
+import math
+import shutil
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from PIL import Image
+
+from output_manifest import build_manifest, load_manifest
+
+# Fix Windows console encoding
+if sys.platform == 'win32':
+    try:
+        sys.stdout.reconfigure(encoding='utf-8')
+    except:
+        pass
+
+try:
+    import pymupdf
+    HAS_PYMUPDF = True
+except ImportError:
+    HAS_PYMUPDF = False
+
+THUMBS_DIRNAME = "thumbs"
+INDEX_NAME = "index.json"
+THUMB_WIDTH = 200
+PREVIEW_WIDTH = 900
+SPRITE_COLUMNS = 8
+KINDS = {
+    "region": "region_",
+    "district": "districts/district_",
+}
+
+
+def rasterizer() -> Optional[str]:
+    if HAS_PYMUPDF:
+        return "pymupdf"
+    if shutil.which("pdftoppm"):
+        return "pdftoppm"
+    return None
+
+
+def render_first_page(pdf_path: Path, width: int) -> Image.Image:
+    """Rasterise page 1 of a PDF to roughly `width` pixels wide."""
+    if HAS_PYMUPDF:
+        with pymupdf.open(pdf_path) as doc:
+            page = doc[0]
+            zoom = width / page.rect.width
+            pix = page.get_pixmap(matrix=pymupdf.Matrix(zoom, zoom), alpha=False)
+            return Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
+    with tempfile.TemporaryDirectory() as tmp:
+        prefix = Path(tmp) / "page"
+        subprocess.run(["pdftoppm", "-png", "-singlefile", "-f", "1", "-l", "1",
+                        "-scale-to-x", str(width), "-scale-to-y", "-1", str(pdf_path), str(prefix)],
+                       check=True, capture_output=True, timeout=60)
+        with Image.open(prefix.with_suffix(".png")) as img:
+            return img.convert("RGB")
+
+
+def map_label(name: str, prefix: str) -> str:
+    """outputs-relative name -> display name: districts/district_cox's_bazar.pdf -> Cox's Bazar"""
+    return name[len(prefix):-4].replace("_", " ").title()
+
+
+def save_png(img: Image.Image, path: Path) -> None:
+    """Save as a 256-colour PNG; flat map colours survive and files are ~2-3x smaller."""
+    img.quantize(colors=256).save(path, "PNG", optimize=True)
+
+
+def ensure_images(pdf_path: Path, sha256: str, thumbs_dir: Path) -> Dict[str, Any]:
+    """Render thumbnail and preview for one PDF unless images for this hash already exist."""
+    key = sha256[:16]
+    thumb = thumbs_dir / f"{key}_thumb.png"
+    preview = thumbs_dir / f"{key}_preview.png"
+    rendered = False
+    if not (thumb.exists() and preview.exists()):
+        img = render_first_page(pdf_path, PREVIEW_WIDTH)
+        save_png(img, preview)
+        img.thumbnail((THUMB_WIDTH, THUMB_WIDTH * 4), Image.Resampling.LANCZOS)
+        save_png(img, thumb)
+        rendered = True
+    with Image.open(thumb) as t:
+        size = t.size
+    return {"key": key, "thumb": thumb.name, "preview": preview.name, "thumb_size": size, "rendered": rendered}
+
+
+def build_sprite(items: List[Dict[str, Any]], thumbs_dir: Path) -> Dict[str, Any]:
+    """Pack thumbnails into a grid sprite named by the hash of its members."""
+    cell_w = max(i["thumb_size"][0] for i in items)
+    cell_h = max(i["thumb_size"][1] for i in items)
+    key = hashlib.sha1("".join(i["key"] for i in items).encode("utf-8")).hexdigest()[:16]
+    sprite_name = f"sprite_{key}.png"
+    columns = min(SPRITE_COLUMNS, len(items))
+    rows = int(math.ceil(len(items) / columns))
+
+    for n, item in enumerate(items):
+        item["sprite"] = {"x": (n % columns) * cell_w, "y": (n // columns) * cell_h,
+                          "w": item["thumb_size"][0], "h": item["thumb_size"][1]}
+
+    sprite_path = thumbs_dir / sprite_name
+    if not sprite_path.exists():
+        sheet = Image.new("RGB", (columns * cell_w, rows * cell_h), "white")
+        for item in items:
+            with Image.open(thumbs_dir / item["thumb"]) as t:
+                sheet.paste(t.convert("RGB"), (item["sprite"]["x"], item["sprite"]["y"]))
+        save_png(sheet, sprite_path)
+    return {"file": sprite_name, "width": columns * cell_w, "height": rows * cell_h,
+            "cell_width": cell_w, "cell_height": cell_h}
+
+
+def build_thumbnails(outputs_dir: Path) -> Dict[str, Any]:
+    """Bring outputs/thumbs up to date and rewrite its index; returns the index."""
+    thumbs_dir = outputs_dir / THUMBS_DIRNAME
+    thumbs_dir.mkdir(exist_ok=True)
+    # Hashes come from the output manifest; only files changed since it was written are re-hashed
+    files = build_manifest(outputs_dir, None, load_manifest(outputs_dir))["files"]
+
+    index: Dict[str, Any] = {"kinds": {}}
+    referenced = set()
+    rendered = 0
+    for kind, prefix in KINDS.items():
+        items = []
+        for entry in files:
+            name = entry["name"]
+            if not (name.startswith(prefix) and name.endswith(".pdf")):
+                continue
+            images = ensure_images(outputs_dir / name, entry["sha256"], thumbs_dir)
+            rendered += images.pop("rendered")
+            items.append({"name": map_label(name, prefix), "path": f"/outputs/{name}",
+                          "sha256": entry["sha256"], **images})
+        if not items:
+            continue
+        sprite = build_sprite(items, thumbs_dir)
+        referenced.update(f for i in items for f in (i["thumb"], i["preview"]))
+        referenced.add(sprite["file"])
+        for item in items:
+            del item["thumb_size"]
+        index["kinds"][kind] = {"sprite": sprite, "items": items}
+
+    # Images of maps that no longer exist in this form
+    for stale in thumbs_dir.glob("*.png"):
+        if stale.name not in referenced:
+            stale.unlink()
+
+    index["etag"] = hashlib.sha1(json.dumps(index, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+    index["rendered"] = rendered
+    tmp = thumbs_dir / (INDEX_NAME + ".tmp")
+    tmp.write_text(json.dumps(index, ensure_ascii=False), encoding="utf-8")
+    tmp.replace(thumbs_dir / INDEX_NAME)
+    return index
+
+
+def main():
+    outputs_dir = Path("outputs")
+
+    print("=" * 60)
+    print("Building map thumbnails and previews")
+    print("=" * 60)
+
+    tool = rasterizer()
+    if tool is None:
+        print("⚠ No PDF rasteriser found (pip install pymupdf, or install poppler-utils)")
+        return
+    print(f"✓ Rasteriser: {tool}")
+
+    index = build_thumbnails(outputs_dir)
+    for kind, data in index["kinds"].items():
+        print(f"  {kind}: {len(data['items'])} maps, sprite {data['sprite']['file']}")
+    print(f"\n✓ Thumbnails complete ({index['rendered']} rendered)")
+
+
+if __name__ == "__main__":
+    main()
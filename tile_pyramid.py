@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cut the national PNG maps into Deep Zoom (DZI) tile pyramids.
+
+For outputs/<stem>.png this writes:
+
+    outputs/tiles/<stem>.dzi                      DZI descriptor (TileSize, Overlap=0, Size)
+    outputs/tiles/<stem>_files/<level>/<col>_<row>.png
+    outputs/tiles/<stem>.index.json               tile -> pixel hash of the last build
+
+The source is walked in bands of one tile row; each band is cut into tiles and then
+halved into the band buffer of the level below, so apart from the decoded source
+only a couple of tile rows per level are held in memory. Tiles whose pixels hash the
+same as in the previous build are not re-encoded or rewritten, so their mtime (and
+HTTP ETag) survives a re-render that did not touch them.
+
+Run after add_logo_to_pngs.py: python tile_pyramid.py
+"""
+
+import hashlib
+import json
+import math
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from PIL import Image
+
+# Fix Windows console encoding
+if sys.platform == 'win32':
+    try:
+        sys.stdout.reconfigure(encoding='utf-8')
+    except:
+        pass
+
+TILE_SIZE = 256
+TILES_DIRNAME = "tiles"
+PYRAMID_SOURCES = [
+    "bangladesh_districts_updated_from_swaps.png",
+    "bangladesh_thanas_updated_from_swaps.png",
+]
+
+Image.MAX_IMAGE_PIXELS = None  # 600-DPI renders exceed Pillow's decompression-bomb guard
+
+
+def level_count(width: int, height: int) -> int:
+    """Number of DZI levels: level 0 is 1x1, the last level is full size."""
+    return int(math.ceil(math.log2(max(width, height, 1)))) + 1
+
+
+def dzi_xml(width: int, height: int, tile_size: int = TILE_SIZE) -> str:
+    return ('<?xml version="1.0" encoding="UTF-8"?>\n'
+            f'<Image xmlns="http://schemas.microsoft.com/deepzoom/2008" Format="png" '
+            f'Overlap="0" TileSize="{tile_size}"><Size Width="{width}" Height="{height}"/></Image>\n')
+
+
+class _PyramidWriter:
+    """Receives image bands top to bottom, one pyramid level per instance."""
+
+    def __init__(self, level: int, width: int, files_dir: Path, old_index: Dict[str, str],
+                 new_index: Dict[str, str], stats: Dict[str, int], tile_size: int,
+                 below: Optional["_PyramidWriter"]):
+        self.level = level
+        self.width = width
+        self.files_dir = files_dir
+        self.old_index = old_index
+        self.new_index = new_index
+        self.stats = stats
+        self.tile_size = tile_size
+        self.below = below
+        self.row = 0
+        self.pending: List[Image.Image] = []
+        self.pending_height = 0
+
+    def push(self, band: Image.Image) -> None:
+        """Append rows; emit a tile row whenever a full tile height is buffered."""
+        self.pending.append(band)
+        self.pending_height += band.height
+        while self.pending_height >= self.tile_size:
+            self._emit(self._take(self.tile_size))
+
+    def finish(self) -> None:
+        if self.pending_height:
+            self._emit(self._take(self.pending_height))
+        if self.below is not None:
+            self.below.finish()
+
+    def _take(self, rows: int) -> Image.Image:
+        band = Image.new(self.pending[0].mode, (self.width, rows))
+        y = 0
+        while y < rows:
+            part = self.pending[0]
+            need = rows - y
+            if part.height <= need:
+                band.paste(part, (0, y))
+                y += part.height
+                self.pending.pop(0)
+            else:
+                band.paste(part.crop((0, 0, self.width, need)), (0, y))
+                self.pending[0] = part.crop((0, need, self.width, part.height))
+                y += need
+        self.pending_height -= rows
+        return band
+
+    def _emit(self, band: Image.Image) -> None:
+        level_dir = self.files_dir / str(self.level)
+        level_dir.mkdir(parents=True, exist_ok=True)
+        for col in range(int(math.ceil(self.width / self.tile_size))):
+            x = col * self.tile_size
+            tile = band.crop((x, 0, min(x + self.tile_size, self.width), band.height))
+            key = f"{self.level}/{col}_{self.row}"
+            digest = hashlib.blake2b(tile.tobytes(), digest_size=12).hexdigest()
+            self.new_index[key] = digest
+            path = level_dir / f"{col}_{self.row}.png"
+            if self.old_index.get(key) == digest and path.exists():
+                self.stats["unchanged"] += 1
+                continue
+            tile.save(path, "PNG")
+            self.stats["written"] += 1
+        self.row += 1
+        if self.below is not None:
+            self.below.push(band.reduce(2))
+
+
+def build_pyramid(png_path: Path, tiles_dir: Path, tile_size: int = TILE_SIZE) -> Dict[str, int]:
+    """Build or refresh the pyramid for one PNG; returns tile counts."""
+    stem = png_path.stem
+    files_dir = tiles_dir / f"{stem}_files"
+    index_path = tiles_dir / f"{stem}.index.json"
+    old = {}
+    if index_path.exists():
+        try:
+            old = json.loads(index_path.read_text(encoding="utf-8"))
+        except ValueError:
+            old = {}
+
+    source_sha = hashlib.sha256(png_path.read_bytes()).hexdigest()
+    if old.get("source_sha256") == source_sha and old.get("tile_size") == tile_size \
+            and (tiles_dir / f"{stem}.dzi").exists():
+        return {"written": 0, "unchanged": len(old.get("tiles", {})), "removed": 0}
+
+    with Image.open(png_path) as img:
+        if img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGBA")
+        width, height = img.size
+        old_index = old.get("tiles", {}) if old.get("tile_size") == tile_size else {}
+        new_index: Dict[str, str] = {}
+        stats = {"written": 0, "unchanged": 0, "removed": 0}
+
+        levels = level_count(width, height)
+        writer = None
+        for level in range(levels):
+            scale = 2 ** (levels - 1 - level)
+            writer = _PyramidWriter(level, int(math.ceil(width / scale)), files_dir,
+                                    old_index, new_index, stats, tile_size, writer)
+
+        for y in range(0, height, tile_size):
+            writer.push(img.crop((0, y, width, min(y + tile_size, height))))
+        writer.finish()
+
+    # Tiles from a previous, differently sized render
+    for key in set(old_index) - set(new_index):
+        level, name = key.split("/")
+        stale = files_dir / level / f"{name}.png"
+        if stale.exists():
+            stale.unlink()
+            stats["removed"] += 1
+
+    tiles_dir.mkdir(parents=True, exist_ok=True)
+    (tiles_dir / f"{stem}.dzi").write_text(dzi_xml(width, height, tile_size), encoding="utf-8")
+    tmp = index_path.with_name(index_path.name + ".tmp")
+    tmp.write_text(json.dumps({"source_sha256": source_sha, "tile_size": tile_size,
+                               "width": width, "height": height, "tiles": new_index}), encoding="utf-8")
+    tmp.replace(index_path)
+    return stats
+
+
+def main():
+    outputs_dir = Path("outputs")
+    tiles_dir = outputs_dir / TILES_DIRNAME
+
+    print("=" * 60)
+    print("Building Deep Zoom tile pyramids")
+    print("=" * 60)
+
+    for name in PYRAMID_SOURCES:
+        png_path = outputs_dir / name
+        if not png_path.exists():
+            print(f"  {name}... skipped (not found)")
+            continue
+        print(f"  {name}...", end=" ")
+        try:
+            stats = build_pyramid(png_path, tiles_dir)
+            print(f"✓ ({stats['written']} written, {stats['unchanged']} unchanged, {stats['removed']} removed)")
+        except Exception as e:
+            print(f"✗ ({e})")
+
+    print("\n✓ Tile pyramids complete!")
+
+
+if __name__ == "__main__":
+    main()
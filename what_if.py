@@ -0,0 +1,176 @@
+"""
+What-if evaluation: score candidate move sets against the current assignment in memory.
+
+A scenario is a list of moves ({"district", "thana", "to_district"[, "to_region"]};
+the thana may be named by its original or current district). Each scenario is
+applied as an overlay on the current placements, so only the regions and districts
+it touches are recomputed: their thana count and area, their number of connected
+pieces on the thana adjacency graph (rebalance.thana_graph) and their share of the
+count/area imbalance (the rebalance objective with equal targets). Nothing is
+written and nothing is rendered; the result also lists the map files a save of
+the scenario would re-render.
+"""
+
+import time
+from collections import deque
+from typing import Any, Dict, List, Set, Tuple
+
+from rebalance import district_regions, placements, thana_graph
+from region_stats import ThanaKey
+
+# Rendered by generate_map_from_swaps.R on every run
+NATIONAL_OUTPUTS = [
+    "outputs/bangladesh_districts_updated_from_swaps.png",
+    "outputs/bangladesh_districts_updated_from_swaps.pdf",
+    "outputs/bangladesh_thanas_updated_from_swaps.png",
+    "outputs/bangladesh_thanas_updated_from_swaps.pdf",
+]
+LEVEL_INDEX = {"region": 0, "district": 1}
+
+
+def output_slug(name: str) -> str:
+    """File name part the R script uses for a region/district (tolower + spaces to underscores)."""
+    return name.lower().replace(" ", "_")
+
+
+def region_output(region: str) -> str:
+    return f"outputs/region_{output_slug(region)}.pdf"
+
+
+def district_output(district: str) -> str:
+    return f"outputs/districts/district_{output_slug(district)}.pdf"
+
+
+class _Baseline:
+    """Per-group members, counts, areas, pieces and imbalance of the current assignment."""
+
+    def __init__(self, features: List[Dict[str, Any]], assignment: Dict[ThanaKey, Tuple[str, str]]):
+        self.keys, self.areas, self.neighbours = thana_graph(features)
+        self.placed = placements(features, self.keys, assignment)
+        self.district_region = district_regions(self.placed)
+        self.position: Dict[ThanaKey, int] = {key: n for n, key in enumerate(self.keys)}
+        for n, (_, district) in enumerate(self.placed):
+            self.position.setdefault((district, self.keys[n][1]), n)
+
+        self.totals = {"count": float(len(self.keys)), "area": sum(self.areas)}
+        self.members: Dict[str, Dict[str, Set[int]]] = {}
+        self.imbalance: Dict[str, Dict[str, float]] = {}
+        for level, i in LEVEL_INDEX.items():
+            groups: Dict[str, Set[int]] = {}
+            for n, place in enumerate(self.placed):
+                groups.setdefault(place[i], set()).add(n)
+            self.members[level] = groups
+            self.imbalance[level] = {
+                "count": sum(self.cost(level, "count", len(m)) for m in groups.values()),
+                "area": sum(self.cost(level, "area", self.area(m)) for m in groups.values()),
+            }
+        self._pieces: Dict[Tuple[str, str], int] = {}
+
+    def area(self, members: Set[int]) -> float:
+        return sum(self.areas[n] for n in members)
+
+    def cost(self, level: str, metric: str, load: float) -> float:
+        """One group's term of the equal-target imbalance ((load - mean) / mean)²."""
+        mean = self.totals[metric] / len(self.members[level])
+        return ((load - mean) / mean) ** 2
+
+    def pieces(self, members: Set[int]) -> int:
+        """Connected components of a member set on the adjacency graph."""
+        seen: Set[int] = set()
+        count = 0
+        for start in members:
+            if start in seen:
+                continue
+            count += 1
+            seen.add(start)
+            queue = deque([start])
+            while queue:
+                for v in self.neighbours[queue.popleft()]:
+                    if v in members and v not in seen:
+                        seen.add(v)
+                        queue.append(v)
+        return count
+
+    def base_pieces(self, level: str, name: str) -> int:
+        cached = self._pieces.get((level, name))
+        if cached is None:
+            cached = self._pieces[(level, name)] = self.pieces(self.members[level].get(name, set()))
+        return cached
+
+
+def _resolve_moves(base: _Baseline, moves: Any) -> Tuple[Dict[int, Tuple[str, str]], List[str]]:
+    """{node -> new (region, district)} for a scenario's moves, plus any errors."""
+    overlay: Dict[int, Tuple[str, str]] = {}
+    errors: List[str] = []
+    if not isinstance(moves, list):
+        return overlay, ["moves must be a list"]
+    for i, move in enumerate(moves):
+        if not isinstance(move, dict):
+            errors.append(f"move {i}: expected an object")
+            continue
+        key = (str(move.get("district", "")).strip(), str(move.get("thana", "")).strip())
+        node = base.position.get(key)
+        to_district = str(move.get("to_district", "")).strip()
+        to_region = str(move.get("to_region", "")).strip() or base.district_region.get(to_district, "")
+        if node is None:
+            errors.append(f"move {i}: unknown thana {key[1]!r} in {key[0]!r}")
+        elif not to_district or not to_region:
+            errors.append(f"move {i}: unknown target district {to_district!r} (give to_region for a new one)")
+        else:
+            overlay[node] = (to_region, to_district)
+    # Moves back to where a thana already is are no-ops
+    return {n: p for n, p in overlay.items() if p != base.placed[n]}, errors
+
+
+def _evaluate(base: _Baseline, scenario: Dict[str, Any], index: int) -> Dict[str, Any]:
+    overlay, errors = _resolve_moves(base, scenario.get("moves"))
+    result: Dict[str, Any] = {"name": scenario.get("name") or f"scenario {index + 1}",
+                              "valid": not errors, "moves": len(overlay)}
+    if errors:
+        result["errors"] = errors
+        return result
+
+    contiguous = True
+    balance: Dict[str, Dict[str, Dict[str, float]]] = {}
+    for level, i in LEVEL_INDEX.items():
+        affected = sorted({name for n, p in overlay.items() if p[i] != base.placed[n][i]
+                           for name in (base.placed[n][i], p[i])})
+        groups: Dict[str, Any] = {}
+        imbalance = dict(base.imbalance[level])
+        for name in affected:
+            before = base.members[level].get(name, set())
+            after = {n for n in before if n not in overlay or overlay[n][i] == name}
+            after.update(n for n, p in overlay.items() if p[i] == name)
+            pieces_before, pieces_after = base.base_pieces(level, name), base.pieces(after)
+            # A piece more than before means the move set split the group (or left a thana stranded)
+            contiguous = contiguous and pieces_after <= max(pieces_before, 1)
+            groups[name] = {
+                "thanas_before": len(before), "thanas_after": len(after),
+                "area_km2_before": round(base.area(before), 2), "area_km2_after": round(base.area(after), 2),
+                "pieces_before": pieces_before, "pieces_after": pieces_after,
+            }
+            # Groups that appear or vanish change the mean, so these are exact only for fixed group sets
+            for metric, load_before, load_after in (("count", len(before), len(after)),
+                                                     ("area", base.area(before), base.area(after))):
+                imbalance[metric] += (base.cost(level, metric, load_after) if after else 0.0) \
+                    - (base.cost(level, metric, load_before) if before else 0.0)
+        result[f"{level}s"] = groups
+        balance[level] = {metric: {"before": round(base.imbalance[level][metric], 6),
+                                   "after": round(value, 6)} for metric, value in imbalance.items()}
+
+    regions, districts = sorted(result["regions"]), sorted(result["districts"])
+    outputs = (NATIONAL_OUTPUTS if overlay else []) + [region_output(r) for r in regions] \
+        + [district_output(d) for d in districts]
+    result.update(contiguous=contiguous, balance=balance,
+                  affected={"regions": regions, "districts": districts},
+                  rerender={"count": len(outputs), "outputs": outputs})
+    return result
+
+
+def evaluate_scenarios(features: List[Dict[str, Any]], assignment: Dict[ThanaKey, Tuple[str, str]],
+                       scenarios: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Evaluate each scenario independently against the current assignment."""
+    started = time.perf_counter()
+    base = _Baseline(features, assignment)
+    results = [_evaluate(base, s if isinstance(s, dict) else {"moves": s}, i) for i, s in enumerate(scenarios)]
+    return {"scenarios": results, "elapsed_ms": round((time.perf_counter() - started) * 1000, 1)}